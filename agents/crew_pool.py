@@ -0,0 +1,127 @@
+"""
+Bounded pool of pre-built Crew instances.
+
+CrewAI keeps per-run state on the Crew/Agent/Task objects, so a single shared Crew must not be used
+by concurrent requests. The pool builds `size` independent crews up front and lends each one to
+exactly one request at a time. Kickoffs run on a dedicated thread pool of the same size, so long LLM
+calls never starve FastAPI's default threadpool and up to `size` agents can be in flight at once.
+
+A Crew goes back to the pool only when its request is done with it *and* every kickoff started with
+it has returned: when a request is cancelled (e.g. a /chat/stream client disconnects), its kickoff
+keeps running on the executor thread and the Crew stays checked out until then.
+"""
+
+import os
+import time
+import asyncio
+import functools
+import contextvars
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from util import request_profile
+
+DEFAULT_POOL_SIZE = int(os.getenv("CREW_POOL_SIZE", "4"))
+# How long a replaced pool waits for its in-flight kickoffs before shutting down anyway
+RETIRE_TIMEOUT_S = 300
+RETIRE_POLL_S = 0.5
+
+# Lease of the Crew checked out by the current request (set inside acquire())
+_current_lease = contextvars.ContextVar("crew_lease", default=None)
+
+
+class _Lease:
+    """One checkout of a Crew; returns it to the pool once closed and its executor calls finished."""
+
+    def __init__(self, pool, crew):
+        self.pool = pool
+        self.crew = crew
+        self.running = 0  # executor calls still running (only changed on the event loop)
+        self.closed = False
+        self.released = False
+
+    def track(self, future):
+        loop = asyncio.get_running_loop()
+        self.running += 1
+
+        def done(_):
+            try:
+                loop.call_soon_threadsafe(self._call_done)
+            except RuntimeError:
+                pass  # event loop already closed (shutdown)
+
+        future.add_done_callback(done)
+
+    def _call_done(self):
+        self.running -= 1
+        self._release_if_idle()
+
+    def close(self):
+        self.closed = True
+        self._release_if_idle()
+
+    def _release_if_idle(self):
+        if self.closed and self.running == 0 and not self.released:
+            self.released = True
+            self.pool._idle.put_nowait(self.crew)
+
+
+class CrewPool:
+    def __init__(self, factory, size=DEFAULT_POOL_SIZE):
+        if size < 1:
+            raise ValueError("CrewPool size must be at least 1")
+        self.factory = factory
+        self.size = size
+        self._idle = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="crew")
+        for _ in range(size):
+            self._idle.put_nowait(factory())
+
+    @property
+    def in_flight(self):
+        return self.size - self._idle.qsize()
+
+    @asynccontextmanager
+    async def acquire(self):
+        """
+        Checks out one Crew for exclusive use by the current request. Calls made with
+        run_in_executor inside the block keep it checked out until they return, even if the
+        request is cancelled first.
+        """
+        with request_profile.span("crew_pool.acquire", in_flight=self.in_flight):
+            lease = _Lease(self, await self._idle.get())
+        token = _current_lease.set(lease)
+        try:
+            yield lease.crew
+        finally:
+            _current_lease.reset(token)
+            lease.close()
+
+    async def run_in_executor(self, fn, *args, **kwargs):
+        """Runs a blocking call on the pool's own threads (with the caller's context, like asyncio.to_thread)."""
+        context = contextvars.copy_context()
+        future = self._executor.submit(functools.partial(context.run, fn, *args, **kwargs))
+        lease = _current_lease.get()
+        if lease is not None:
+            lease.track(future)
+        # Cancelling the await does not stop a call that already started; the lease waits for it
+        return await asyncio.wrap_future(future)
+
+    async def kickoff(self, inputs):
+        async with self.acquire() as crew:
+            return await self.run_in_executor(request_profile.traced("crew_instance.kickoff", crew.kickoff), inputs=inputs)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def retire(self, timeout=RETIRE_TIMEOUT_S):
+        """
+        Shuts down a pool that has been replaced (e.g. after an agent config change) once the requests
+        still holding its crews have finished. Blocking; returns True if it drained before the timeout.
+        """
+        deadline = time.monotonic() + timeout
+        while self.in_flight > 0 and time.monotonic() < deadline:
+            time.sleep(RETIRE_POLL_S)
+        drained = self.in_flight == 0
+        self._executor.shutdown(wait=drained)
+        return drained
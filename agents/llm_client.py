@@ -0,0 +1,389 @@
+"""
+Process-wide LLM clients for the direct LLM calls (StandardLLM* and the single-agent fast path DirectAgent*).
+
+One client per provider endpoint is created lazily and reused for every call, backed by keep-alive
+httpx connection pools (one sync, one async), so requests no longer pay connection setup and TLS
+each time. Every call has a timeout, and 429 / 5xx responses, timeouts and connection errors are
+retried with exponential backoff and full jitter (honouring Retry-After when the provider sends it).
+Streams are only retried until their first token has been yielded.
+
+Providers:
+    mistral   the Mistral SDK (MISTRAL_API_KEY)
+    openai    any OpenAI-compatible /chat/completions endpoint (base_url + the env var named by api_key_env)
+    stub      the deterministic stub LLM with per-target latency, for local hedging tests
+
+Configuration (environment): LLM_TIMEOUT_S, LLM_MAX_RETRIES, LLM_BACKOFF_BASE_S, LLM_BACKOFF_MAX_S,
+LLM_MAX_CONNECTIONS. Model and temperature are passed per call (see load_default_agent.llm_settings).
+
+The async pools belong to the event loop that first uses them, i.e. the FastAPI server loop.
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+
+from util import metrics
+
+TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "60"))
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+BACKOFF_BASE_S = float(os.getenv("LLM_BACKOFF_BASE_S", "0.5"))
+BACKOFF_MAX_S = float(os.getenv("LLM_BACKOFF_MAX_S", "8"))
+MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+CONNECT_TIMEOUT_S = 5.0
+KEEPALIVE_EXPIRY_S = 60.0
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class ProviderHTTPError(Exception):
+    """Non-2xx reply of an OpenAI-compatible endpoint (same attributes as the Mistral SDK's SDKError)."""
+
+    def __init__(self, status_code, raw_response, body=""):
+        super().__init__(f"LLM provider returned HTTP {status_code}: {body[:200]}")
+        self.status_code = status_code
+        self.raw_response = raw_response
+
+
+def _retry_reason(error):
+    """Why `error` is worth retrying ('429', '5xx', 'timeout', 'connection') or None when it is not."""
+    import httpx
+
+    status = getattr(error, "status_code", None)
+    if status in RETRYABLE_STATUS:
+        return "429" if status == 429 else "5xx"
+    if isinstance(error, httpx.TimeoutException):
+        return "timeout"
+    if isinstance(error, httpx.TransportError):
+        return "connection"
+    return None
+
+
+def _retry_after_s(error):
+    response = getattr(error, "raw_response", None)
+    value = response.headers.get("Retry-After") if response is not None else None
+    try:
+        return min(float(value), BACKOFF_MAX_S) if value is not None else None
+    except ValueError:
+        return None
+
+
+def backoff_s(attempt, error=None):
+    """Full jitter: uniform in [0, min(max, base * 2^attempt)], at least the provider's Retry-After."""
+    delay = random.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** attempt))
+    retry_after = _retry_after_s(error) if error is not None else None
+    return max(delay, retry_after) if retry_after is not None else delay
+
+
+def _messages(prompt, system=None):
+    messages = [{"content": prompt, "role": "user"}]
+    if system:
+        messages.insert(0, {"content": system, "role": "system"})
+    return messages
+
+
+def _http_pools(max_connections, timeout_s):
+    import httpx
+
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_connections,
+        keepalive_expiry=KEEPALIVE_EXPIRY_S,
+    )
+    timeout = httpx.Timeout(timeout_s, connect=CONNECT_TIMEOUT_S)
+    return httpx.Client(limits=limits, timeout=timeout), httpx.AsyncClient(limits=limits, timeout=timeout)
+
+
+class LLMClient:
+    """
+    Retry loops shared by every provider. Subclasses implement one attempt of each call:
+    _complete_once / _acomplete_once return the answer, _stream_once / _astream_once yield tokens.
+    """
+
+    provider = None
+
+    def __init__(self, timeout_s=TIMEOUT_S, max_retries=MAX_RETRIES, max_connections=MAX_CONNECTIONS):
+        self.timeout_s = timeout_s
+        self.max_retries = max_retries
+        self.max_connections = max_connections
+        self._http = None
+        self._async_http = None
+        self._lock = threading.Lock()
+
+    def _pools(self):
+        if self._http is None:
+            with self._lock:
+                if self._http is None:
+                    self._http, self._async_http = _http_pools(self.max_connections, self.timeout_s)
+        return self._http, self._async_http
+
+    def _should_retry(self, error, attempt):
+        reason = _retry_reason(error)
+        if reason is None or attempt >= self.max_retries:
+            return False
+        metrics.LLM_RETRIES.labels(provider=self.provider, reason=reason).inc()
+        return True
+
+    def complete(self, prompt, model, temperature=None, system=None):
+        """Blocking chat completion; returns the answer text."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                with metrics.EXTERNAL_CALL_SECONDS.labels(service=self.provider, operation="chat.complete").time():
+                    return self._complete_once(_messages(prompt, system), model, temperature)
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                time.sleep(backoff_s(attempt, e))
+
+    async def acomplete(self, prompt, model, temperature=None, system=None):
+        """Chat completion awaited on the event loop (no worker thread is held while the model generates)."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                with metrics.EXTERNAL_CALL_SECONDS.labels(service=self.provider, operation="chat.complete").time():
+                    return await self._acomplete_once(_messages(prompt, system), model, temperature)
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                await asyncio.sleep(backoff_s(attempt, e))
+
+    def stream(self, prompt, model, temperature=None, system=None):
+        """Blocking token stream; retried only while no token has been yielded yet."""
+        for attempt in range(self.max_retries + 1):
+            started = False
+            try:
+                for token in self._stream_once(_messages(prompt, system), model, temperature):
+                    started = True
+                    yield token
+                return
+            except Exception as e:
+                if started or not self._should_retry(e, attempt):
+                    raise
+                time.sleep(backoff_s(attempt, e))
+
+    async def astream(self, prompt, model, temperature=None, system=None):
+        """Async token stream; retried only while no token has been yielded yet."""
+        for attempt in range(self.max_retries + 1):
+            started = False
+            try:
+                async for token in self._astream_once(_messages(prompt, system), model, temperature):
+                    started = True
+                    yield token
+                return
+            except Exception as e:
+                if started or not self._should_retry(e, attempt):
+                    raise
+                await asyncio.sleep(backoff_s(attempt, e))
+
+    def close(self):
+        if self._http is not None:
+            self._http.close()
+
+    async def aclose(self):
+        self.close()
+        if self._async_http is not None:
+            await self._async_http.aclose()
+        self._http = self._async_http = None
+
+
+class MistralClient(LLMClient):
+    provider = "mistral"
+
+    def __init__(self, api_key=None, **kwargs):
+        super().__init__(**kwargs)
+        self._api_key = api_key
+        self._mistral = None
+
+    def _client(self):
+        if self._mistral is None:
+            http, async_http = self._pools()
+            with self._lock:
+                if self._mistral is None:
+                    from mistralai import Mistral
+
+                    self._mistral = Mistral(
+                        api_key=self._api_key or os.environ["MISTRAL_API_KEY"],
+                        client=http,
+                        async_client=async_http,
+                        timeout_ms=int(self.timeout_s * 1000),
+                    )
+        return self._mistral
+
+    def _complete_once(self, messages, model, temperature):
+        response = self._client().chat.complete(
+            model=model, messages=messages, temperature=temperature, timeout_ms=int(self.timeout_s * 1000),
+        )
+        return response.choices[0].message.content
+
+    async def _acomplete_once(self, messages, model, temperature):
+        response = await self._client().chat.complete_async(
+            model=model, messages=messages, temperature=temperature, timeout_ms=int(self.timeout_s * 1000),
+        )
+        return response.choices[0].message.content
+
+    def _stream_once(self, messages, model, temperature):
+        response = self._client().chat.stream(
+            model=model, messages=messages, temperature=temperature, timeout_ms=int(self.timeout_s * 1000),
+        )
+        with response as events:
+            for event in events:
+                token = event.data.choices[0].delta.content
+                if token:
+                    yield token
+
+    async def _astream_once(self, messages, model, temperature):
+        response = await self._client().chat.stream_async(
+            model=model, messages=messages, temperature=temperature, timeout_ms=int(self.timeout_s * 1000),
+        )
+        async with response as events:
+            async for event in events:
+                token = event.data.choices[0].delta.content
+                if token:
+                    yield token
+
+    async def aclose(self):
+        await super().aclose()
+        self._mistral = None
+
+
+class OpenAICompatibleClient(LLMClient):
+    """Chat completions against an OpenAI-compatible endpoint (OpenAI, Groq, DeepInfra, Together, vLLM, ...)."""
+
+    provider = "openai"
+
+    def __init__(self, base_url, api_key_env="OPENAI_API_KEY", **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url.rstrip("/")
+        self.api_key_env = api_key_env
+
+    def _request(self, messages, model, temperature, stream):
+        body = {"model": model, "messages": messages, "stream": stream}
+        if temperature is not None:
+            body["temperature"] = temperature
+        headers = {"Authorization": f"Bearer {os.environ[self.api_key_env]}"}
+        return f"{self.base_url}/chat/completions", body, headers
+
+    @staticmethod
+    def _check(response, body_text):
+        if response.status_code >= 400:
+            raise ProviderHTTPError(response.status_code, response, body_text)
+
+    @staticmethod
+    def _delta(line):
+        # Server-sent events: "data: {...}" per chunk, "data: [DONE]" at the end
+        if not line.startswith("data:"):
+            return None
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return None
+        choices = json.loads(data).get("choices") or [{}]
+        return (choices[0].get("delta") or {}).get("content")
+
+    def _complete_once(self, messages, model, temperature):
+        url, body, headers = self._request(messages, model, temperature, stream=False)
+        response = self._pools()[0].post(url, json=body, headers=headers)
+        self._check(response, response.text)
+        return response.json()["choices"][0]["message"]["content"]
+
+    async def _acomplete_once(self, messages, model, temperature):
+        url, body, headers = self._request(messages, model, temperature, stream=False)
+        response = await self._pools()[1].post(url, json=body, headers=headers)
+        self._check(response, response.text)
+        return response.json()["choices"][0]["message"]["content"]
+
+    def _stream_once(self, messages, model, temperature):
+        url, body, headers = self._request(messages, model, temperature, stream=True)
+        with self._pools()[0].stream("POST", url, json=body, headers=headers) as response:
+            if response.status_code >= 400:
+                self._check(response, response.read().decode("utf-8", "replace"))
+            for line in response.iter_lines():
+                token = self._delta(line)
+                if token:
+                    yield token
+
+    async def _astream_once(self, messages, model, temperature):
+        url, body, headers = self._request(messages, model, temperature, stream=True)
+        async with self._pools()[1].stream("POST", url, json=body, headers=headers) as response:
+            if response.status_code >= 400:
+                self._check(response, (await response.aread()).decode("utf-8", "replace"))
+            async for line in response.aiter_lines():
+                token = self._delta(line)
+                if token:
+                    yield token
+
+
+class StubClient(LLMClient):
+    """The stub LLM as a provider, so routing and hedging can be exercised without network access."""
+
+    provider = "stub"
+
+    def __init__(self, latency_ms=None, tokens_per_sec=None, **kwargs):
+        super().__init__(**kwargs)
+        self.latency_ms = latency_ms
+        self.tokens_per_sec = tokens_per_sec
+
+    def _stub(self):
+        from agents import stub_llm
+
+        return stub_llm.StubLLM(latency_ms=self.latency_ms, tokens_per_sec=self.tokens_per_sec)
+
+    @staticmethod
+    def _prompt(messages):
+        return "\n".join(message["content"] for message in messages)
+
+    def _complete_once(self, messages, model, temperature):
+        return self._stub().complete(self._prompt(messages))
+
+    async def _acomplete_once(self, messages, model, temperature):
+        return await self._stub().acomplete(self._prompt(messages))
+
+    def _stream_once(self, messages, model, temperature):
+        yield from self._stub().stream(self._prompt(messages))
+
+    async def _astream_once(self, messages, model, temperature):
+        async for token in self._stub().astream(self._prompt(messages)):
+            yield token
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def client_for(target):
+    """
+    The shared client for a target ({"provider": ..., "base_url": ..., "api_key_env": ..., ...});
+    one client (and connection pool) per provider endpoint.
+    """
+    provider = target.get("provider", "mistral")
+    if provider == "mistral":
+        key = ("mistral",)
+    elif provider == "openai":
+        key = ("openai", target["base_url"], target.get("api_key_env", "OPENAI_API_KEY"))
+    elif provider == "stub":
+        key = ("stub", target.get("latency_ms"), target.get("tokens_per_sec"))
+    else:
+        raise ValueError(f"Unknown LLM provider '{provider}', expected mistral, openai or stub")
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                if provider == "mistral":
+                    client = MistralClient()
+                elif provider == "openai":
+                    client = OpenAICompatibleClient(key[1], api_key_env=key[2])
+                else:
+                    client = StubClient(latency_ms=key[1], tokens_per_sec=key[2])
+                _clients[key] = client
+    return client
+
+
+def default_client():
+    """The shared Mistral client."""
+    return client_for({"provider": "mistral"})
+
+
+async def aclose_all():
+    for client in list(_clients.values()):
+        await client.aclose()
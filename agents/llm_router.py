@@ -0,0 +1,270 @@
+"""
+LLM router: latency-weighted routing and hedged requests across models and providers.
+
+A route is one role of the "llm" section of the agent config (load_default_agent.llm_settings):
+the primary target plus optional fallbacks, e.g.
+
+    "standard": {
+        "provider": "mistral", "model": "mistral-small-latest",
+        "fallbacks": [{"provider": "openai", "model": "llama-3.1-8b-instant",
+                       "base_url": "https://api.groq.com/openai/v1", "api_key_env": "GROQ_API_KEY"}],
+        "routing": "latency",
+        "hedge": true, "hedge_percentile": 95
+    }
+
+routing   "ordered" (default): the configured order. "latency": the first target is drawn with a
+          weight inversely proportional to its rolling p50 time to first token (targets with too
+          few samples get the mean weight, so they keep being measured); the rest follow by p50.
+hedge     when the first token has not arrived within the first target's rolling
+          `hedge_percentile` time to first token, the next target is started as well; whichever
+          produces a token first wins and the other request is cancelled.
+
+A target that fails before its first token falls through to the next one. Time to first token is
+tracked per target over the last LLM_LATENCY_WINDOW calls; cancelled hedges count with the time
+they had waited (a lower bound), so a slow target's percentiles keep growing.
+Hedging applies to the async entry points used by the server (astream / acomplete); the blocking
+ones used by the CLI and background jobs only fall through on errors.
+
+Configuration (environment): LLM_LATENCY_WINDOW, LLM_LATENCY_MIN_SAMPLES, LLM_HEDGE_DEFAULT_DELAY_S
+(used until enough samples exist), LLM_HEDGE_MIN_DELAY_S, LLM_HEDGE_MAX_DELAY_S.
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+
+from agents import llm_client
+from util import metrics
+
+LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "200"))
+MIN_SAMPLES = int(os.getenv("LLM_LATENCY_MIN_SAMPLES", "20"))
+HEDGE_DEFAULT_DELAY_S = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_S", "2.0"))
+HEDGE_MIN_DELAY_S = float(os.getenv("LLM_HEDGE_MIN_DELAY_S", "0.2"))
+HEDGE_MAX_DELAY_S = float(os.getenv("LLM_HEDGE_MAX_DELAY_S", "10.0"))
+DEFAULT_HEDGE_PERCENTILE = 95
+
+_ROUTE_KEYS = ("fallbacks", "routing", "hedge", "hedge_percentile")
+
+
+class LatencyWindow:
+    """Rolling window of time-to-first-token samples of one target."""
+
+    def __init__(self, size=LATENCY_WINDOW):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, q):
+        with self._lock:
+            ordered = sorted(self._samples)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))]
+
+
+_windows = {}  # target key -> LatencyWindow, shared by every router so history survives config changes
+_windows_lock = threading.Lock()
+
+
+def target_key(target):
+    key = f"{target.get('provider', 'mistral')}:{target['model']}"
+    return f"{key}@{target['base_url']}" if target.get("base_url") else key
+
+
+def _window(target):
+    key = target_key(target)
+    window = _windows.get(key)
+    if window is None:
+        with _windows_lock:
+            window = _windows.setdefault(key, LatencyWindow())
+    return window
+
+
+class _Attempt:
+    """One in-flight request to a target, waiting for its first token."""
+
+    def __init__(self, target, stream):
+        self.target = target
+        self.stream = stream
+        self.started = time.perf_counter()
+        self.first = asyncio.ensure_future(stream.__anext__())
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    async def cancel(self):
+        self.first.cancel()
+        await asyncio.gather(self.first, return_exceptions=True)
+        try:
+            await self.stream.aclose()
+        except Exception:
+            pass
+
+
+class LLMRouter:
+    def __init__(self, role, settings):
+        self.role = role
+        primary = {key: value for key, value in settings.items() if key not in _ROUTE_KEYS}
+        inherited = {"temperature": primary.get("temperature")}
+        self.targets = [primary] + [{**inherited, **target} for target in settings.get("fallbacks") or []]
+        self.routing = settings.get("routing", "ordered")
+        if self.routing not in ("ordered", "latency"):
+            raise ValueError(f"Unknown LLM routing '{self.routing}', expected 'ordered' or 'latency'")
+        self.hedge = bool(settings.get("hedge")) and len(self.targets) > 1
+        self.hedge_percentile = float(settings.get("hedge_percentile", DEFAULT_HEDGE_PERCENTILE))
+
+    def order(self):
+        """Targets in the order they are tried for one request."""
+        if self.routing == "ordered" or len(self.targets) == 1:
+            return list(self.targets)
+        p50 = {id(target): _window(target).percentile(50) if len(_window(target)) >= MIN_SAMPLES else None
+               for target in self.targets}
+        measured = [1 / max(value, 1e-3) for value in p50.values() if value is not None]
+        mean_weight = sum(measured) / len(measured) if measured else 1.0
+        weights = [1 / max(p50[id(target)], 1e-3) if p50[id(target)] is not None else mean_weight
+                   for target in self.targets]
+        first = random.choices(self.targets, weights=weights)[0]
+        rest = sorted((target for target in self.targets if target is not first),
+                      key=lambda target: p50[id(target)] if p50[id(target)] is not None else float("inf"))
+        return [first] + rest
+
+    def hedge_delay_s(self, target):
+        window = _window(target)
+        if len(window) < MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY_S
+        return min(HEDGE_MAX_DELAY_S, max(HEDGE_MIN_DELAY_S, window.percentile(self.hedge_percentile)))
+
+    @staticmethod
+    def _record(target, result, seconds=None):
+        """Counts the outcome of one attempt; `seconds` (time to first token) feeds the rolling window."""
+        labels = {"provider": target.get("provider", "mistral"), "model": target["model"]}
+        if seconds is not None:
+            _window(target).add(seconds)
+        if result == "won":
+            metrics.LLM_FIRST_TOKEN_SECONDS.labels(**labels).observe(seconds)
+        metrics.LLM_ROUTED_REQUESTS.labels(result=result, **labels).inc()
+
+    def _start(self, target, prompt, system):
+        client = llm_client.client_for(target)
+        return _Attempt(target, client.astream(prompt, target["model"], target.get("temperature"), system=system))
+
+    async def astream(self, prompt, system=None):
+        """Streams the answer of the first target to produce a token (see the module docstring)."""
+        pending = self.order()
+        running = [self._start(pending.pop(0), prompt, system)]
+        hedged = False
+        winner = first_token = last_error = None
+        try:
+            while winner is None:
+                if not running:
+                    if not pending:
+                        raise last_error
+                    running.append(self._start(pending.pop(0), prompt, system))
+                timeout = None
+                if self.hedge and not hedged and pending:
+                    timeout = max(0.0, self.hedge_delay_s(running[0].target) - running[0].elapsed)
+                done, _ = await asyncio.wait([attempt.first for attempt in running], timeout=timeout,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # No first token within the hedge delay: race the next target
+                    hedged = True
+                    metrics.LLM_HEDGES.labels(role=self.role).inc()
+                    running.append(self._start(pending.pop(0), prompt, system))
+                    continue
+                for attempt in list(running):
+                    if attempt.first not in done:
+                        continue
+                    error = attempt.first.exception()
+                    if error is None or isinstance(error, StopAsyncIteration):
+                        winner = attempt
+                        first_token = None if error is not None else attempt.first.result()
+                        break
+                    running.remove(attempt)
+                    self._record(attempt.target, "error")
+                    last_error = error
+        finally:
+            for attempt in running:
+                if attempt is not winner:
+                    if winner is not None:
+                        self._record(attempt.target, "lost", attempt.elapsed)
+                    await attempt.cancel()
+
+        self._record(winner.target, "won", winner.elapsed)
+        if first_token is None:
+            return
+        try:
+            yield first_token
+            async for token in winner.stream:
+                yield token
+        finally:
+            await winner.stream.aclose()
+
+    async def acomplete(self, prompt, system=None):
+        if len(self.targets) == 1:
+            target = self.targets[0]
+            return await llm_client.client_for(target).acomplete(prompt, target["model"], target.get("temperature"), system=system)
+        parts = [token async for token in self.astream(prompt, system=system)]
+        return "".join(parts)
+
+    def complete(self, prompt, system=None):
+        """Blocking completion: the targets in routing order, falling through on errors."""
+        last_error = None
+        for target in self.order():
+            try:
+                return llm_client.client_for(target).complete(prompt, target["model"], target.get("temperature"), system=system)
+            except Exception as e:
+                self._record(target, "error")
+                last_error = e
+        raise last_error
+
+    def stream(self, prompt, system=None):
+        """Blocking token stream: falls through to the next target when one fails before its first token."""
+        last_error = None
+        for target in self.order():
+            started = False
+            try:
+                for token in llm_client.client_for(target).stream(prompt, target["model"], target.get("temperature"), system=system):
+                    started = True
+                    yield token
+                return
+            except Exception as e:
+                if started:
+                    raise
+                self._record(target, "error")
+                last_error = e
+        raise last_error
+
+
+_routers = {}
+_routers_lock = threading.Lock()
+
+
+def router_for(role, settings):
+    """Cached router for the role's current settings (a changed config builds a new router)."""
+    key = (role, json.dumps(settings, sort_keys=True))
+    router = _routers.get(key)
+    if router is None:
+        with _routers_lock:
+            router = _routers.get(key)
+            if router is None:
+                router = _routers[key] = LLMRouter(role, settings)
+    return router
+
+
+def stats():
+    """Rolling time-to-first-token percentiles per target."""
+    return {
+        key: {"samples": len(window), "p50_s": window.percentile(50), "p95_s": window.percentile(95)}
+        for key, window in list(_windows.items())
+    }
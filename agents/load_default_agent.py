@@ -2,8 +2,10 @@ import os
 import requests
 import json
 from dotenv import load_dotenv, dotenv_values
-from crewai import Agent, Task, LLM
-from mistralai import Mistral
+from agents import stub_llm, llm_router
+from util import metrics
+
+# crewai and mistralai are imported lazily on first use (they dominate cold-start time)
 
 if "MISTRAL_API_KEY" not in os.environ:
     # For running locally or docker run without env vars set,
@@ -17,7 +19,8 @@ UPSTASH_REDIS_REST_TOKEN = os.getenv("UPSTASH_REDIS_REST_TOKEN")
 def fetch_config_from_upstash(key: str) -> dict:
     url = f"{UPSTASH_REDIS_REST_URL}/get/{key}"
     headers = {"Authorization": f"Bearer {UPSTASH_REDIS_REST_TOKEN}"}
-    response = requests.get(url, headers=headers)
+    with metrics.EXTERNAL_CALL_SECONDS.labels(service="upstash", operation="get").time():
+        response = requests.get(url, headers=headers)
 
     if response.status_code == 200:
         # response.json()["result"] can be None or missing, so check:
@@ -35,54 +38,175 @@ def load_default_config() -> dict:
     with open(default_path, "r") as f:
         return json.load(f)
 
+# Models used when the agent config has no "llm" section: "standard" answers /stdllm requests,
+# "agent" is the CrewAI agent's LLM. Override per role in agent_config.json, e.g.
+# "llm": {"standard": {"model": "mistral-small-latest", "temperature": 0.3}}
+# A role may also list fallback models/providers for routing and hedging (see agents/llm_router.py).
+DEFAULT_LLM_SETTINGS = {
+    "standard": {"provider": "mistral", "model": "mistral-small-latest", "temperature": None},
+    "agent": {"provider": "mistral", "model": "mistral-large-latest", "temperature": 0.7},
+}
+
+def llm_settings(role):
+    """Provider, model, temperature and routing for `role` ('standard' or 'agent') from the agent config, over the defaults."""
+    configured = (init().get("llm") or {}).get(role) or {}
+    return {**DEFAULT_LLM_SETTINGS[role], **configured}
+
+def llm_route(role):
+    return llm_router.router_for(role, llm_settings(role))
+
 def StandardLLMResponse(input):
     """ 
     Modify this as well with respect to your custom selected LLM. Make sure final response returns extracted answer from query.
+    Uses the shared pooled clients (agents/llm_client.py) with timeouts and retries.
+    """
+    if stub_llm.enabled():
+        return stub_llm.StubLLM().complete(input)
+
+    return llm_route("standard").complete(input)
+
+async def StandardLLMResponseAsync(input):
+    """
+    Async variant of StandardLLMResponse for the FastAPI backend: awaits the model without holding a worker thread.
+    """
+    if stub_llm.enabled():
+        return await stub_llm.StubLLM().acomplete(input)
+
+    return await llm_route("standard").acomplete(input)
+
+def StandardLLMStream(input):
+    """
+    Streaming variant of StandardLLMResponse: yields the answer token by token using Mistral's streaming API.
+    """
+    if stub_llm.enabled():
+        yield from stub_llm.StubLLM().stream(input)
+        return
+
+    yield from llm_route("standard").stream(input)
+
+async def StandardLLMStreamAsync(input):
+    """Async token stream for the FastAPI backend (hedged when the route configures it)."""
+    if stub_llm.enabled():
+        async for token in stub_llm.StubLLM().astream(input):
+            yield token
+        return
+
+    async for token in llm_route("standard").astream(input):
+        yield token
+
+# Single-agent fast path: an agent and task without tools or delegation are answered with one direct
+# LLM call that renders the agent and task prompts, skipping CrewAI's ReAct scaffolding.
+# AGENT_FAST_PATH=0 always uses the Crew.
+FAST_PATH_ENABLED = os.getenv("AGENT_FAST_PATH", "1").lower() not in ("0", "false", "no")
+
+def fast_path_eligible(config=None):
+    """True when the agent config has the tool-free, non-delegating shape the fast path handles."""
+    if not FAST_PATH_ENABLED:
+        return False
+    config = config if config is not None else init()
+    # Tools or delegation need the Crew (the factories below honour both)
+    agent, task = config.get("agent") or {}, config.get("task") or {}
+    return not (agent.get("tools") or task.get("tools") or agent.get("allow_delegation"))
+
+# Tools an agent or task can list by name in agent_config.json, e.g. "tools": ["sentiment_analysis"]
+TOOLS = {
+    "sentiment_analysis": ("tools.sentiment_analysis", "SentimentAnalysisTool"),
+}
+
+def create_tools(names):
+    """CrewAI tool instances for the tool names of an agent or task config."""
+    import importlib
+
+    tools = []
+    for name in names or []:
+        if name not in TOOLS:
+            raise ValueError(f"Unknown tool '{name}' in agent_config (available: {', '.join(TOOLS)})")
+        module, class_name = TOOLS[name]
+        tools.append(getattr(importlib.import_module(module), class_name)())
+    return tools
+
+def _interpolate(template, inputs):
+    # Same placeholders as Crew.kickoff(inputs=...); other braces in the prompt are left untouched
+    for key, value in inputs.items():
+        template = template.replace("{" + key + "}", str(value))
+    return template
+
+def render_agent_prompt(inputs):
+    """Renders the agent (role, goal, backstory) and task into (system, user) messages for one LLM call."""
+    init()
+    system = (
+        f"You are {agent_data['role']}. {agent_data['backstory']}\n"
+        f"Your personal goal is: {agent_data['goal']}"
+    )
+    user = (
+        f"Current Task: {_interpolate(task_data['description'], inputs)}\n\n"
+        f"This is the expected criteria for your final answer: {_interpolate(task_data['expected_output'], inputs)}\n"
+        "Reply with the complete final answer only."
+    )
+    return system, user
+
+def DirectAgentResponse(inputs):
+    """Fast-path equivalent of crew.kickoff(inputs=inputs) for single-agent configs; returns the answer text."""
+    system, user = render_agent_prompt(inputs)
+    if stub_llm.enabled():
+        return stub_llm.StubLLM().complete(f"{system}\n{user}")
+    return llm_route("agent").complete(user, system=system)
+
+async def DirectAgentResponseAsync(inputs):
+    system, user = render_agent_prompt(inputs)
+    if stub_llm.enabled():
+        return await stub_llm.StubLLM().acomplete(f"{system}\n{user}")
+    return await llm_route("agent").acomplete(user, system=system)
+
+def DirectAgentStream(inputs):
+    system, user = render_agent_prompt(inputs)
+    if stub_llm.enabled():
+        yield from stub_llm.StubLLM().stream(f"{system}\n{user}")
+        return
+    yield from llm_route("agent").stream(user, system=system)
+
+async def DirectAgentStreamAsync(inputs):
+    system, user = render_agent_prompt(inputs)
+    if stub_llm.enabled():
+        async for token in stub_llm.StubLLM().astream(f"{system}\n{user}"):
+            yield token
+        return
+    async for token in llm_route("agent").astream(user, system=system):
+        yield token
+
+# Agent/task config, populated by init() (no network calls at import time)
+config_data = None
+agent_data = None
+task_data = None
+
+def init(force=False):
     """
-    with Mistral(
-        api_key=os.environ["MISTRAL_API_KEY"],
-    ) as mistral:
-
-        response = mistral.chat.complete(model="mistral-small-latest", messages=[
-            {
-                "content": input,
-                "role": "user",
-            },
-        ])
-
-        final_response = response.choices[0].message.content
-
-    return final_response
-
-# Try fetching the config from Upstash, fallback to default if not found or error
-try:
-    config_data = fetch_config_from_upstash("agent_config")
-except (Exception, KeyError) as e:
-    print(f"Warning: Could not load agent_config from Upstash due to {e}, loading default config.")
-    config_data = load_default_config()
-
-# Make sure the keys exist in config_data, fallback to default keys if not
-agent_data = config_data.get("agent")
-task_data = config_data.get("task")
-
-if not agent_data or not task_data:
-    print("Warning: agent or task config missing, loading default config from file.")
-    config_data = load_default_config()
-    agent_data = config_data["agent"]
-    task_data = config_data["task"]
-
-# Initialize LLM 
-"""
-You can use any supported or your custom Large Language Model (LLM) with Crew AI.
-
-For more details on model support, refer to Crew AI's documentation: https://docs.crewai.com/concepts/llms
-
-"""
-llm = LLM(
-    model="mistral/mistral-large-latest",
-    temperature=0.7,
-    api_key=os.environ["MISTRAL_API_KEY"],
-)
+    Loads the agent config: tries Upstash first, falls back to the default config if not found or on error.
+    Called explicitly at startup; the factories below call it lazily if it has not run yet.
+    """
+    global config_data, agent_data, task_data
+    if config_data is not None and not force:
+        return config_data
+
+    try:
+        data = fetch_config_from_upstash("agent_config")
+    except (Exception, KeyError) as e:
+        print(f"Warning: Could not load agent_config from Upstash due to {e}, loading default config.")
+        data = load_default_config()
+    return apply_config(data)
+
+def apply_config(data):
+    """Makes `data` the live agent config (used by init() and by hot reloads); returns the config applied."""
+    global config_data, agent_data, task_data
+    # Make sure the keys exist in config_data, fallback to default keys if not
+    if not data.get("agent") or not data.get("task"):
+        print("Warning: agent or task config missing, loading default config from file.")
+        data = load_default_config()
+
+    config_data = data
+    agent_data = data["agent"]
+    task_data = data["task"]
+    return config_data
 
 class ConfigLoader:
     def __init__(self, env_path=".env"):
@@ -103,24 +227,52 @@ class ConfigLoader:
         # os.environ["GEMINI_API_KEY"] = self.config.get("GEMINI_API_KEY", "")
 
 class LLMSetup:
-    def __init__(self):
-        self.llm = LLM(
-            model="mistral/mistral-large-latest",
-            temperature=0.7,
-            api_key=os.environ["MISTRAL_API_KEY"],
-        )
+    """
+    You can use any supported or your custom Large Language Model (LLM) with Crew AI.
+
+    For more details on model support, refer to Crew AI's documentation: https://docs.crewai.com/concepts/llms
+    """
+    def __init__(self, stream=False):
+        # stream=True makes CrewAI emit LLMStreamChunkEvent for every generated token (used by /chat/stream)
+        if stub_llm.enabled():
+            self.llm = stub_llm.create_crew_llm()
+            return
+        from crewai import LLM
+        # CrewAI makes its own LLM calls, so the Crew path uses the primary target only (no hedging)
+        settings = llm_settings("agent")
+        provider = settings.get("provider", "mistral")
+        if provider == "stub":
+            self.llm = stub_llm.create_crew_llm()
+        elif provider == "openai":
+            self.llm = LLM(
+                model=f"openai/{settings['model']}",
+                base_url=settings["base_url"],
+                temperature=settings["temperature"],
+                api_key=os.environ[settings.get("api_key_env", "OPENAI_API_KEY")],
+                stream=stream,
+            )
+        else:
+            self.llm = LLM(
+                model=f"mistral/{settings['model']}",
+                temperature=settings["temperature"],
+                api_key=os.environ["MISTRAL_API_KEY"],
+                stream=stream,
+            )
 
 class DataAnalysisAgentFactory:
     def __init__(self, llm):
         self.llm = llm
 
     def create_agent(self):
+        from crewai import Agent
+        init()
         return Agent(
             name=agent_data["name"],
             role=agent_data["role"],
             goal=agent_data["goal"],
             backstory=agent_data["backstory"],
-            allow_delegation=False,
+            tools=create_tools(agent_data.get("tools")),
+            allow_delegation=bool(agent_data.get("allow_delegation", False)),
             verbose=True,
             llm=self.llm
         )
@@ -130,8 +282,11 @@ class DataAnalysisTaskFactory:
         self.agent = agent
 
     def create_task(self):
+        from crewai import Task
+        init()
         return Task(
             description=task_data["description"],
             expected_output=task_data["expected_output"],
+            tools=create_tools(task_data.get("tools")),
             agent=self.agent
         )
\ No newline at end of file
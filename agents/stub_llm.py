@@ -0,0 +1,75 @@
+"""
+Deterministic stub LLM for local latency measurements (time-to-first-token, load tests).
+
+Enable with TRUENOTION_STUB_LLM=1. No network calls are made; the stub waits
+STUB_LLM_LATENCY_MS before its first token and then emits STUB_LLM_TOKENS tokens at
+STUB_LLM_TOKENS_PER_SEC. Both the CrewAI path (StubCrewLLM) and StandardLLMResponse(Async) use it.
+"""
+
+import os
+import time
+import asyncio
+
+
+def enabled():
+    return os.getenv("TRUENOTION_STUB_LLM", "").lower() in ("1", "true", "yes")
+
+
+class StubLLM:
+    def __init__(self, latency_ms=None, tokens_per_sec=None, num_tokens=None):
+        self.latency_ms = float(latency_ms if latency_ms is not None else os.getenv("STUB_LLM_LATENCY_MS", "300"))
+        self.tokens_per_sec = float(tokens_per_sec if tokens_per_sec is not None else os.getenv("STUB_LLM_TOKENS_PER_SEC", "50"))
+        self.num_tokens = int(num_tokens if num_tokens is not None else os.getenv("STUB_LLM_TOKENS", "60"))
+
+    def stream(self, prompt):
+        """Yields a deterministic answer token by token, derived from the prompt length."""
+        time.sleep(self.latency_ms / 1000)
+        delay = 1 / self.tokens_per_sec if self.tokens_per_sec > 0 else 0
+        seed = len(prompt)
+        for i in range(self.num_tokens):
+            if i:
+                time.sleep(delay)
+            yield f"token{(seed + i) % 1000} "
+
+    def complete(self, prompt):
+        return "".join(self.stream(prompt)).strip()
+
+    async def astream(self, prompt):
+        """Async variant of stream(): same tokens and timing, without blocking the event loop."""
+        await asyncio.sleep(self.latency_ms / 1000)
+        delay = 1 / self.tokens_per_sec if self.tokens_per_sec > 0 else 0
+        seed = len(prompt)
+        for i in range(self.num_tokens):
+            if i and delay:
+                await asyncio.sleep(delay)
+            yield f"token{(seed + i) % 1000} "
+
+    async def acomplete(self, prompt):
+        """Same answer and timing as complete(), awaited like the pooled async client."""
+        await asyncio.sleep(self.latency_ms / 1000)
+        if self.tokens_per_sec > 0:
+            await asyncio.sleep(max(0, self.num_tokens - 1) / self.tokens_per_sec)
+        seed = len(prompt)
+        return "".join(f"token{(seed + i) % 1000} " for i in range(self.num_tokens)).strip()
+
+
+def create_crew_llm():
+    """Builds a CrewAI-compatible stub LLM that also emits CrewAI stream chunk events."""
+    from crewai import BaseLLM
+    from crewai.utilities.events import crewai_event_bus, LLMStreamChunkEvent
+
+    class StubCrewLLM(BaseLLM):
+        def __init__(self):
+            super().__init__(model="stub/stub-llm", temperature=0)
+            self.stub = StubLLM()
+
+        def call(self, messages, tools=None, callbacks=None, available_functions=None):
+            prompt = messages if isinstance(messages, str) else "\n".join(m.get("content", "") for m in messages)
+            parts = ["Thought: I now can give a great answer\nFinal Answer: "]
+            crewai_event_bus.emit(self, event=LLMStreamChunkEvent(chunk=parts[0]))
+            for token in self.stub.stream(prompt):
+                crewai_event_bus.emit(self, event=LLMStreamChunkEvent(chunk=token))
+                parts.append(token)
+            return "".join(parts).strip()
+
+    return StubCrewLLM()
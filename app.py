@@ -26,19 +26,39 @@ Fast API Integration
 
 """
 
-from util import suppress
+from util import suppress, startup_profile
+if startup_profile.requested():
+    # TRUENOTION_PROFILE_STARTUP=1: record import times from here on, report after warmup
+    startup_profile.enable()
 suppress.all()
 suppress.langchain_warnings()
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Response, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, JSONResponse
 from pydantic import BaseModel
-from crewai import Crew
-from agents import load_default_agent
+from agents import load_default_agent, llm_client, llm_router
+from agents.crew_pool import CrewPool, DEFAULT_POOL_SIZE as CREW_POOL_SIZE
 from src.banner import print_banner
+from src.index_manager import IndexHandle, RebuildJobs
+from src.tenants import TenantIndexManager, UnknownTenant, TenantForbidden, TENANT_HEADER, TENANT_TOKEN_HEADER
+from src.shared_index import SharedIndex
+from src.sync_scheduler import SyncScheduler, verify_signature, WEBHOOK_SECRET
+from src.config_manager import ConfigManager, rag_change_kind, agent_change_kinds
+from src.semantic_cache import SemanticCache, context_hash
+from src.answer_cache import AnswerCache, make_key, config_version
+from src.single_flight import SingleFlight
+from src.admission import AdmissionController, AdmissionRejected
+from src.warmup import Warmup, RETRY_AFTER_S as WARMUP_RETRY_AFTER_S
+from src.sessions import SessionManager, store_from_env as session_store_from_env, llm_summarizer
+from util import metrics, request_profile
 from datetime import datetime
-from src import process, data_loader
+from src import process, data_loader, chat_modes, streaming, enrichment, embeddings
 import os
 import json
+import asyncio
+import threading
+import time
 
 app = FastAPI()
 
@@ -49,64 +69,416 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets the browser client read how long to wait after a 429/503
+    expose_headers=["Retry-After"],
 )
 
 print("Initializing..")
 print_banner()
 
-# Global variables for conversation, retriever and crew instance
+# Global variables for conversation, index and crew pool
+# (conversation modes are resolved per request, see src/chat_modes.py)
 chat_history = []  # Each element is a tuple (user query, AI answer)
-history_mode = True
-crew_instance = None
-retriever = None
-loaded_files_reference = []
-disable_agent= False
-k = None
-chunk_size = None
-memory = None  # Number of historical conversation pairs to include
-
-try:
-    with open('rag/rag_config.json','r') as f:
-        rag_parameters = json.load(f)
-except (Exception, KeyError) as e:
-    print(f"Info: Could not load rag_config, using default config.")
-    with open('rag/default_rag_config.json','r') as f:
-        rag_parameters = json.load(f)
-
-file_path = os.path.join(os.getcwd(), "rag/rag_config.json")
-with open(file_path, "w") as f:
-    json.dump(rag_parameters, f, indent=2)
-
-data_loader.upload_agent_config_to_upstash(filepath="rag/rag_config.json", key="rag_config")
-
-k = rag_parameters.get("k")
-chunk_size = rag_parameters.get("chunk_size")
-memory = rag_parameters.get("memory")
-
-# logging on frontend
-retriever, loaded_files_reference = process.initialize_system(adjusted_k=k, adjusted_chunk_size=chunk_size)
-
-loaded_files_reference.extend([
-    "RAG Parameters: ",
-    f"Top-k value: {k}",
-    f"Chunk size: {chunk_size}",
-    f"Memory: {memory}"
-])
-
-crew_instance = None
+crew_pool = None
+# Live retriever, loaded files reference and RAG parameters, swapped atomically on rebuilds
+index_handle = IndexHandle()
+
+def load_rag_parameters(from_upstash=False):
+    """Loads rag_config from Upstash (or the local file) and falls back to the default config."""
+    try:
+        if from_upstash:
+            rag_parameters = load_default_agent.fetch_config_from_upstash("rag_config")
+        else:
+            with open('rag/rag_config.json','r') as f:
+                rag_parameters = json.load(f)
+    except (Exception, KeyError) as e:
+        print(f"Info: Could not load rag_config, using default config.")
+        with open('rag/default_rag_config.json','r') as f:
+            rag_parameters = json.load(f)
+
+    save_rag_parameters(rag_parameters)
+    return rag_parameters
+
+def save_rag_parameters(rag_parameters):
+    with open(os.path.join(os.getcwd(), "rag/rag_config.json"), "w") as f:
+        json.dump(rag_parameters, f, indent=2)
+
+def build_index(from_upstash=True, rag_parameters=None):
+    """
+    Syncs data, builds a new retriever and returns (retriever, loaded_files_reference, rag_parameters, fingerprint).
+    Uses `rag_parameters` when given, otherwise loads rag_config.
+    """
+    if rag_parameters is None:
+        rag_parameters = load_rag_parameters(from_upstash=from_upstash)
+    else:
+        save_rag_parameters(rag_parameters)
+    retriever, loaded_files_reference, fingerprint = process.initialize_system(
+        adjusted_k=rag_parameters.get("k"), adjusted_chunk_size=rag_parameters.get("chunk_size"), with_fingerprint=True,
+        embedding_backend=embeddings.backend_name(rag_parameters),
+    )
+    return retriever, loaded_files_reference, rag_parameters, fingerprint
+
+# With SHARED_INDEX_DIR, one worker builds and publishes index generations that every worker
+# attaches to memory-mapped (see src/shared_index.py); None: this process builds its own index
+shared_index = SharedIndex.from_env()
+
+def publish_index(built):
+    """Publishes a built index as the next shared generation and returns it attached from the shared files."""
+    generation = shared_index.publish(*built)
+    del built
+    return shared_index.attach(generation)
+
+def rebuild_index():
+    # Background rebuilds use the live rag_config (kept current by the config manager below)
+    built = build_index(rag_parameters=config_manager.get("rag_config"))
+    return built if shared_index is None else publish_index(built)
+
+rebuild_jobs = RebuildJobs(index_handle, rebuild_index)
+
+def update_index(changes):
+    """
+    Applies synced changes to a copy of the live index (process.update_system): only the changed pages
+    and keys are fetched, chunked and embedded. Rebuilds everything when there is no index yet, when
+    a pending rag_config change needs a re-index anyway, or when the incremental update fails.
+    """
+    index = index_handle.current()
+    rag_parameters = config_manager.get("rag_config") or index.rag_parameters
+    built = None
+    if index.retriever is not None and rag_change_kind(index.rag_parameters, rag_parameters) != "reindex":
+        try:
+            retriever, keys, fingerprint = process.update_system(
+                index.retriever, changes, adjusted_k=rag_parameters.get("k"), adjusted_chunk_size=rag_parameters.get("chunk_size"),
+                loaded_files_reference=index.loaded_files_reference, fingerprint=index.fingerprint,
+                embedding_backend=embeddings.backend_name(rag_parameters),
+            )
+            built = (retriever, keys, rag_parameters, fingerprint)
+        except Exception as e:
+            print(f"Incremental re-index failed ({e}), rebuilding the whole index.")
+    del index  # the old snapshot is released by the swap, not kept alive by this job
+    if built is None:
+        return rebuild_index()
+    return built if shared_index is None else publish_index(built)
+
+def reindex_changed_data(changes):
+    """Sync scheduler callback: re-indexes the changed pages and keys in the background."""
+    job, created = rebuild_jobs.submit(lambda: update_index(changes), kind="incremental")
+    # A rebuild that is already running may have read the data before these changes: retry after it
+    return f"re-indexing (job {job['job_id']})" if created else None
+
+# Polls Notion/Upstash (or takes webhook pushes) and re-indexes debounced changes, see src/sync_scheduler.py
+sync_scheduler = SyncScheduler(reindex_changed_data)
+rebuild_jobs.add_listener(sync_scheduler.retry_deferred)
+# Per-tenant indexes (X-Tenant header), lazily loaded from their artifacts and LRU-evicted
+# beyond TENANT_RAM_BUDGET_MB, see src/tenants.py
+tenant_indexes = TenantIndexManager()
+# Semantic /chat response cache, invalidated whenever the index version changes; every resident
+# tenant has its own, dropped together with the tenant's index
+response_cache = SemanticCache()
+tenant_response_caches = {}
+tenant_indexes.add_evict_listener(lambda tenant: tenant_response_caches.pop(tenant, None))
+# Exact-match answer cache (local LRU + optional shared Upstash tier); keys include the index
+# fingerprint and agent config version, the local tier is evicted whenever either changes
+answer_cache = AnswerCache.from_env()
+agent_config_version = None  # set once the agent config is loaded during warmup
+index_handle.add_swap_listener(lambda snapshot: answer_cache.evict_local())
+# Single-flight coalescing of identical in-flight /chat requests (keyed like the answer cache)
+in_flight = SingleFlight()
+# Bounded, prioritized admission in front of crew kickoffs and standard LLM calls (429/503 + Retry-After)
+admission = AdmissionController.from_env(default_concurrency=CREW_POOL_SIZE)
+# Server-side conversation sessions (SESSION_BACKEND=memory|upstash); turns beyond the 'memory'
+# window are folded into a rolling summary so prompts stay flat over long conversations
+session_manager = SessionManager(session_store_from_env(), llm_summarizer(load_default_agent.StandardLLMResponse))
+
+def apply_rag_config(old, new):
+    """Applies a rag_config change by type: memory instantly, k with a new retriever, chunk_size by re-indexing."""
+    kind = rag_change_kind(old, new)
+    save_rag_parameters(new)
+    index = index_handle.current()
+    if kind == "instant" or index.retriever is None:
+        # Nothing to re-index yet during warmup: the initial build reads the saved file
+        index_handle.update_parameters(new)
+        return "applied"
+    if kind == "retriever":
+        retriever = index.retriever.vectorstore.as_retriever(search_kwargs={"k": new.get("k")})
+        index_handle.swap(retriever, index.loaded_files_reference, new, index.fingerprint)
+        return f"new retriever (index version {index_handle.version})"
+    if shared_index is not None and not shared_index.is_builder:
+        # The builder re-indexes and publishes; this worker switches with the next generation
+        return "re-indexing on the builder"
+    job, _ = rebuild_jobs.submit()
+    return f"re-indexing (job {job['job_id']})"
+
+def apply_agent_config(old, new):
+    """Applies an agent_config change: prompts (and the agent's LLM) rebuild the crew pool, model settings apply directly."""
+    global agent_config_version
+    kinds = agent_change_kinds(old, new)
+    load_default_agent.apply_config(new)
+    # Cached answers were produced with the previous prompts/models
+    agent_config_version = config_version(new)
+    answer_cache.evict_local()
+    response_cache.invalidate()
+    for cache in list(tenant_response_caches.values()):
+        cache.invalidate()
+    agent_llm_changed = ((old or {}).get("llm") or {}).get("agent") != (new.get("llm") or {}).get("agent")
+    stale_crews = crew_pool is not None and ("prompts" in kinds or agent_llm_changed)
+    # Tools or delegation were added: build the crews the fast path no longer covers ahead of requests
+    missing_crews = crew_pool is None and not load_default_agent.fast_path_eligible(new)
+    if stale_crews or missing_crews:
+        threading.Thread(target=rebuild_crew_pool, name="crew-rebuild", daemon=True).start()
+        return "rebuilding crews"
+    return "applied"
+
+crew_rebuild_lock = threading.Lock()
+
+def get_crew_pool():
+    """The crew pool, built on first use: configs the fast path answers never import CrewAI or build crews."""
+    global crew_pool
+    if crew_pool is None:
+        with crew_rebuild_lock:
+            if crew_pool is None:
+                crew_pool = CrewPool(initialize_agent, size=CREW_POOL_SIZE)
+    return crew_pool
+
+async def acquire_crew_pool():
+    return crew_pool or await asyncio.to_thread(get_crew_pool)
+
+def rebuild_crew_pool():
+    """Builds crews from the live agent config, swaps the pool in and retires the old one once it drains."""
+    global crew_pool
+    with crew_rebuild_lock:
+        try:
+            new_pool = CrewPool(initialize_agent, size=CREW_POOL_SIZE)
+        except Exception as e:
+            print(f"Crew rebuild failed, keeping the previous crews: {e}")
+            return
+        old_pool, crew_pool = crew_pool, new_pool
+    print("Crew pool rebuilt with the new agent config.")
+    if old_pool is not None:
+        old_pool.retire()
+
+# Versioned agent_config/rag_config, hot reloaded by change type when their Upstash version key changes
+config_manager = ConfigManager(load_default_agent.fetch_config_from_upstash)
+config_manager.on_change("rag_config", apply_rag_config)
+config_manager.on_change("agent_config", apply_agent_config)
+
+# Size of the live vector store, refreshed on every swap and exported as gauges at /metrics
+index_stats = {}
+
+def update_index_stats(snapshot):
+    global index_stats
+    index_stats = process.index_stats(snapshot.retriever)
+
+index_handle.add_swap_listener(update_index_stats)
+
+def collect_metrics():
+    """Exports values other components already track (caches, index size, warmup) at scrape time."""
+    answer = answer_cache.stats()
+    semantic = response_cache.stats()
+    flights = in_flight.stats()
+    yield "truenotion_cache_lookups_total", "counter", "Answer and semantic cache lookups by result.", [
+        ({"cache": "answer", "result": "hit_local"}, answer["local_hits"]),
+        ({"cache": "answer", "result": "hit_shared"}, answer["shared_hits"]),
+        ({"cache": "answer", "result": "miss"}, answer["misses"]),
+        ({"cache": "semantic", "result": "hit"}, semantic["hits"]),
+        ({"cache": "semantic", "result": "miss"}, semantic["misses"]),
+    ]
+    yield "truenotion_cache_hit_ratio", "gauge", "Cache hit ratio since startup.", [
+        ({"cache": "answer"}, answer["hit_rate"]),
+        ({"cache": "semantic"}, semantic["hit_rate"]),
+    ]
+    yield "truenotion_cache_entries", "gauge", "Entries held by the in-process caches.", [
+        ({"cache": "answer"}, answer["entries"]),
+        ({"cache": "semantic"}, semantic["entries"]),
+    ]
+    yield "truenotion_single_flight_total", "counter", "Chat computations executed vs. coalesced onto an identical in-flight request.", [
+        ({"result": "executed"}, flights["executions"]),
+        ({"result": "coalesced"}, flights["coalesced"]),
+    ]
+    yield "truenotion_single_flight_waiters", "gauge", "Requests currently waiting on in-flight chat computations (all keys).", [
+        ({}, in_flight.total_waiters()),
+    ]
+    yield "truenotion_crews_in_flight", "gauge", "Crew kickoffs currently running.", [
+        ({}, crew_pool.in_flight if crew_pool is not None else 0),
+    ]
+    yield "truenotion_llm_first_token_p50_seconds", "gauge", "Rolling p50 time to first token per LLM target (used for routing and hedging).", [
+        ({"target": target}, window["p50_s"]) for target, window in llm_router.stats().items()
+    ]
+    admission_stats = admission.stats()
+    yield "truenotion_admission_active", "gauge", "LLM-bound requests currently admitted.", [({}, admission_stats["active"])]
+    yield "truenotion_admission_queue_depth", "gauge", "LLM-bound requests waiting for admission.", [
+        ({"priority": priority}, depth) for priority, depth in admission_stats["queued"].items()
+    ]
+    stats = index_stats
+    yield "truenotion_index_version", "gauge", "Version of the live index (increments on every swap).", [({}, index_handle.version)]
+    yield "truenotion_index_chunks", "gauge", "Document chunks in the live index.", [({}, stats.get("chunks"))]
+    yield "truenotion_index_vectors", "gauge", "Vectors in the live FAISS index.", [({}, stats.get("vectors"))]
+    yield "truenotion_index_size_bytes", "gauge", "Size of the FAISS vectors in bytes.", [({}, stats.get("index_bytes"))]
+    yield "truenotion_vectorstore_resident_bytes", "gauge", "Estimated resident memory of the vector store (vectors + chunk text).", [
+        ({}, stats.get("resident_bytes")),
+    ]
+    resident_tenants = tenant_indexes.resident()
+    yield "truenotion_tenant_index_resident_bytes", "gauge", "Estimated resident memory of each resident tenant index.", [
+        ({"tenant": tenant}, resident_bytes) for tenant, resident_bytes, _ in resident_tenants
+    ]
+    yield "truenotion_tenant_index_last_load_seconds", "gauge", "Time the last load of each resident tenant index took.", [
+        ({"tenant": tenant}, load_seconds) for tenant, _, load_seconds in resident_tenants
+    ]
+    yield "truenotion_tenant_index_budget_bytes", "gauge", "RAM budget of the resident tenant indexes.", [
+        ({}, tenant_indexes.ram_budget_bytes),
+    ]
+    if shared_index is not None:
+        yield "truenotion_shared_index_generation", "gauge", "Shared index generation this worker answers from.", [
+            ({"role": "builder" if shared_index.is_builder else "worker"}, shared_index.generation),
+        ]
+    sync_stats = sync_scheduler.stats()
+    last_sync = sync_stats["last_success_at"]
+    yield "truenotion_sync_last_success_age_seconds", "gauge", "Seconds since the sync scheduler last polled the data sources successfully.", [
+        ({}, time.time() - last_sync if last_sync is not None else None),
+    ]
+    yield "truenotion_sync_pending_changes", "gauge", "Changed items waiting (debounce) for a re-index.", [
+        ({}, sum(sum(kinds.values()) for kinds in sync_stats["pending"].values())),
+    ]
+    yield "truenotion_process_resident_bytes", "gauge", "Resident memory of the backend process.", [({}, metrics.resident_memory_bytes())]
+    yield "truenotion_ready", "gauge", "1 once warmup has finished, 0 otherwise.", [({}, 1 if warmup.ready else 0)]
+
+metrics.add_collector(collect_metrics)
+
+# Startup warmup runs in the background so the port opens immediately
+warmup = Warmup()
+
+def warmup_system():
+    """Initial index build from the local rag_config (then published to Upstash) and, unless the fast path serves the agent config, crew pool setup."""
+    global agent_config_version
+    try:
+        with warmup.stage("agent_config"):
+            agent_config = load_default_agent.init()
+            agent_config_version = config_version(agent_config)
+            config_manager.set_initial("agent_config", agent_config)
+        with warmup.stage("index"):
+            if shared_index is None:
+                initial_index = build_index(from_upstash=False)
+            elif shared_index.become_builder():
+                initial_index = publish_index(build_index(from_upstash=False))
+            else:
+                # Another worker builds; attach to its first generation
+                initial_index = shared_index.wait_and_attach()
+        if shared_index is None or shared_index.is_builder:
+            with warmup.stage("upload_rag_config"):
+                data_loader.upload_agent_config_to_upstash(filepath="rag/rag_config.json", key="rag_config")
+                rag_parameters = initial_index[2]
+                config_manager.set_initial("rag_config", rag_parameters)
+                config_manager.publish("rag_config", rag_parameters)
+        else:
+            config_manager.set_initial("rag_config", initial_index[2])
+        with warmup.stage("swap_index"):
+            index_handle.swap(*initial_index)
+            del initial_index
+        if not load_default_agent.fast_path_eligible():
+            with warmup.stage("crew_pool"):
+                get_crew_pool()
+        with warmup.stage("background_jobs"):
+            if shared_index is not None:
+                shared_index.start(lambda built: index_handle.swap(*built))
+            config_manager.start()
+            if shared_index is None or shared_index.is_builder:
+                # Followers get synced data with the builder's next generation
+                sync_scheduler.start()
+        warmup.mark_ready()
+        print("Warmup complete, backend is ready.")
+    except Exception as e:
+        # Every step runs in a stage; this also covers anything between them, so /healthz fails
+        warmup.mark_failed(e)
+        print(f"Warmup failed: {e}")
+    if startup_profile.enabled():
+        startup_profile.print_report()
+
+def require_ready():
+    """Dependency for endpoints that need the index and agents: 503 + Retry-After until warmup finished."""
+    if not warmup.ready:
+        report = warmup.report()
+        raise HTTPException(
+            status_code=503,
+            detail={"message": "Backend is warming up, please retry shortly.", "status": report["status"], "stage": report["stage"]},
+            headers={"Retry-After": str(WARMUP_RETRY_AFTER_S)},
+        )
+
+def require_admin(request: Request):
+    """Dependency for profiling and debug endpoints: X-Admin-Token must match TRUENOTION_ADMIN_TOKEN."""
+    if not request_profile.authorized(request.headers.get("X-Admin-Token")):
+        raise HTTPException(status_code=403, detail="A valid X-Admin-Token is required (set TRUENOTION_ADMIN_TOKEN on the server).")
+
+def profiling_requested(request):
+    """
+    None unless the request asks to be profiled (X-Profile header or ?profile=), otherwise whether the
+    sampling profiler should run too (X-Profile: sample). Only admins may profile requests.
+    """
+    flag = (request.headers.get("X-Profile") or request.query_params.get("profile") or "").lower()
+    if flag in ("", "0", "false", "no"):
+        return None
+    require_admin(request)
+    return flag == "sample"
+
+def request_priority(request):
+    """Admission priority class from the X-Priority header (interactive by default, 'batch' for bulk clients)."""
+    try:
+        return admission.parse_priority(request.headers.get("X-Priority"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def cache_bypassed(request):
+    """Cache-Control: no-cache skips the answer and semantic cache lookups (fresh answers are still stored)."""
+    return "no-cache" in (request.headers.get("Cache-Control") or "").lower()
+
+@app.exception_handler(AdmissionRejected)
+def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.reason, "admission": admission.stats()},
+        headers={"Retry-After": str(exc.retry_after_s)},
+    )
 
 class Query(BaseModel):
     question: str
-    history: list[list[str]] = []
+    history: list = []  # Expects a list of tuples like [(question, answer), ...]; ignored with a session_id
+    session_id: str | None = None  # Server-side session echoed back from the previous answer
+    mode: str | None = None  # Mode echoed back from the previous answer (e.g. "stdllm-nh")
 
 @app.on_event("startup")
 def startup_event():
-    global crew_instance
-    crew_instance = initialize_agent()
+    threading.Thread(target=warmup_system, name="warmup", daemon=True).start()
+
+@app.get("/healthz")
+def healthz():
+    """Liveness: the process is up. Fails only when warmup failed, so orchestrators restart the pod."""
+    report = warmup.report()
+    if warmup.failed:
+        return JSONResponse(status_code=503, content=report)
+    return report
+
+@app.get("/readyz")
+def readyz():
+    """Readiness: 200 once the index (and the crew pool, when the agent config needs one) is ready, otherwise 503 with the running stage."""
+    report = warmup.report()
+    if not warmup.ready:
+        return JSONResponse(status_code=503, content=report, headers={"Retry-After": str(WARMUP_RETRY_AFTER_S)})
+    return report
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    config_manager.stop()
+    sync_scheduler.stop()
+    if shared_index is not None:
+        shared_index.stop()
+    if crew_pool is not None:
+        crew_pool.shutdown()
+    rebuild_jobs.shutdown()
+    await llm_client.aclose_all()
 
 def initialize_agent():
+    from crewai import Crew
     load_default_agent.ConfigLoader()
-    llm_setup = load_default_agent.LLMSetup()
+    # Streaming LLM so /chat/stream can forward tokens; /chat simply receives the aggregated answer
+    llm_setup = load_default_agent.LLMSetup(stream=True)
     agent_factory = load_default_agent.DataAnalysisAgentFactory(llm_setup.llm)
     data_analysis_agent = agent_factory.create_agent()
     task_factory = load_default_agent.DataAnalysisTaskFactory(data_analysis_agent)
@@ -117,91 +489,439 @@ def initialize_agent():
         verbose=True
     )
 
-class Query(BaseModel):
-    question: str
-    history: list  # Expects a list of tuples like [(question, answer), ...]
-
-@app.post("/chat")
-def chat_api(query: Query):
-    global disable_agent, history_mode, memory
-
-    user_input = query.question
-    conversation_history = query.history
-
-    # Set conversation modes based on input markers
-    if "/stdllm" in user_input:
-        disable_agent = True
-        history_mode = True
-    elif "/stdllm-nh" in user_input:
-        disable_agent = True
-        history_mode = False
-    elif "/truN" in user_input:
-        disable_agent = False
-        history_mode = True
-    elif "/truN-nh" in user_input:
-        disable_agent = False
-        history_mode = False
+def resolve_mode(query):
+    """Resolves the conversation mode for this request only (marker in question > echoed mode > default)."""
+    try:
+        return chat_modes.parse_chat_mode(query.question, query.mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def load_conversation(query):
+    """
+    Returns (session, conversation_history, summary). Requests with a session_id, or with neither a
+    session_id nor a history, use a server-side session; legacy clients keep sending the full history.
+    """
+    if query.session_id is None and query.history:
+        return None, query.history, ""
+    with request_profile.span("session.load"):
+        session = await asyncio.to_thread(session_manager.load, query.session_id)
+    return session, session["turns"], session["summary"]
+
+# Background session compactions in flight (the event loop only keeps weak references to tasks)
+compaction_tasks = set()
+
+async def compact_session(session_id, memory):
+    """
+    Folds old turns into the session summary. The summary is an LLM call, so it waits for admission as
+    batch traffic; when it is rejected or shed the session stays as it is and the next turn retries
+    (prompts only ever include the last `memory` turns, so nothing grows meanwhile).
+    """
+    try:
+        async with admission.admit("batch"):
+            await asyncio.to_thread(session_manager.compact, session_id, memory)
+    except AdmissionRejected as e:
+        print(f"Skipped compacting session {session_id}: {e.reason}")
+    except Exception as e:
+        print(f"Could not compact session {session_id}: {e}")
+
+async def record_turn(session, user_input, answer, index):
+    """Appends the turn to the server-side session; folding old turns into the summary runs in the background."""
+    if session is None:
+        return
+    memory = index.rag_parameters.get("memory")
+    try:
+        updated = await asyncio.to_thread(session_manager.append_turn, session["session_id"], user_input, answer)
+    except Exception as e:
+        print(f"Could not update session {session['session_id']}: {e}")
+        return
+    if len(updated["turns"]) > memory:
+        task = asyncio.create_task(compact_session(session["session_id"], memory))
+        compaction_tasks.add(task)
+        task.add_done_callback(compaction_tasks.discard)
+
+def chat_reply(answer, mode, session):
+    reply = {"answer": answer, "mode": mode.name}
+    if session is not None:
+        reply["session_id"] = session["session_id"]
+    return reply
 
+def build_history_str(conversation_history, index, summary=""):
     # Build conversation history string from the provided history (using last 'memory' turns)
-    history_str = "\n".join([f"You: {q}\nAI: {a}" for q, a in conversation_history[-memory:]])
-    now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    # If the agent is enabled, use the crew_instance with context
-    if not disable_agent:
-        if "/truN" in user_input:
-            user_input = user_input.replace("/stdllm", "")
-        if "/truN-nh" in user_input:
-            user_input = user_input.replace("/stdllm-nh", "")
-        # Retrieve document context with error handling
-        try:
-            retrieved_docs = retriever.get_relevant_documents(user_input)
-            context = "\n\n".join([doc.page_content for doc in retrieved_docs])
-        except Exception as e:
-            print("Error retrieving document context:", e)
-            context = ""
+    memory = index.rag_parameters.get("memory")
+    turns = "\n".join([f"You: {q}\nAI: {a}" for q, a in conversation_history[-memory:]])
+    if summary:
+        return f"Summary of earlier conversation: {summary}\n{turns}"
+    return turns
 
-        # Build the full prompt based on whether history is enabled
-        if history_mode:
-            full_context = f"""Context:
+async def resolve_index(request):
+    """
+    Snapshot of the index a request is answered from: the tenant's (X-Tenant header, authenticated by
+    X-Tenant-Token), loaded from its artifacts on first use, or the live index. It is kept for the whole
+    request even if a rebuild swaps it or the tenant is evicted meanwhile.
+    """
+    tenant = request.headers.get(TENANT_HEADER)
+    if not tenant:
+        return index_handle.current()
+    try:
+        tenant_indexes.authenticate(tenant, request.headers.get(TENANT_TOKEN_HEADER))
+        index = tenant_indexes.get_resident(tenant)
+        if index is not None:
+            return index
+        with request_profile.span("tenant_index.load", tenant=tenant):
+            return await asyncio.to_thread(tenant_indexes.get, tenant)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except TenantForbidden as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except UnknownTenant as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+async def retrieve_documents(user_input, index):
+    """Returns (retrieved_docs, query_embedding); blocking FAISS/embedding work runs in a thread."""
+    try:
+        with request_profile.span("retrieval"):
+            return await asyncio.to_thread(process.retrieve_with_embedding, index.retriever, user_input)
+    except Exception as e:
+        print("Error retrieving document context:", e)
+        return [], None
+
+def semantic_cache_for(index):
+    if index.tenant is None:
+        return response_cache
+    return tenant_response_caches.setdefault(index.tenant, SemanticCache())
+
+def answer_context_hash(retrieved_docs, history_str, mode):
+    # Everything besides the question itself that shapes the agent's answer
+    return context_hash(retrieved_docs, mode.name, history_str if mode.history_mode else "")
+
+def build_crew_inputs(user_input, retrieved_docs, history_str, mode):
+    # Each chunk comes with its ingest-time enrichment (sentiment, language, keywords), see src/enrichment.py
+    context = enrichment.format_context(retrieved_docs)
+
+    # Build the full prompt based on whether history is enabled
+    if mode.history_mode:
+        full_context = f"""Context:
 {context}
 
 Conversation History:
 {history_str}"""
-        else:
-            full_context = f"Context: {context}"
+    else:
+        full_context = f"Context: {context}"
 
-        inputs = {
-            "user_question": user_input,
-            "context": full_context,
-            "timestamp": now_str,
-        }
+    return {
+        "user_question": user_input,
+        "context": full_context,
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+def build_stdllm_prompt(user_input, history_str, mode):
+    # Construct the query to include conversation history if needed
+    if mode.history_mode:
+        return f"I'm User. My query is: {user_input}, My Conversation History is: {history_str}"
+    return user_input
+
+def answer_cache_key(mode, user_input, conversation_history, index, summary=""):
+    memory = index.rag_parameters.get("memory")
+    history_window = ([["summary", summary]] if summary else []) + conversation_history[-memory:] if mode.history_mode else []
+    # Standard LLM answers do not depend on the knowledge base, so they survive index rebuilds; the
+    # fingerprint covers the data and chunking, k is hot-swapped over the same vector store
+    index_version = None if mode.disable_agent else f"{index.fingerprint}:k{index.rag_parameters.get('k')}"
+    if index.tenant is not None and index_version is not None:
+        index_version = f"{index.tenant}:{index_version}"
+    return make_key(mode.name, user_input, history_window, index_version, agent_config_version)
+
+async def lookup_answer(cache_key):
+    # The shared tier does blocking HTTP calls; the local LRU alone is answered inline
+    with request_profile.span("answer_cache.get", shared=answer_cache.shared is not None):
+        if answer_cache.shared is not None:
+            return await asyncio.to_thread(answer_cache.get, cache_key)
+        return answer_cache.get(cache_key)
+
+async def store_answer(cache_key, answer):
+    if answer_cache.shared is not None:
+        await asyncio.to_thread(answer_cache.set, cache_key, answer)
+    else:
+        answer_cache.set(cache_key, answer)
+
+def cache_headers(cache_key, tier):
+    headers = {"X-Cache": "HIT" if tier else "MISS", "X-Cache-Key": cache_key[:16]}
+    if tier:
+        headers["X-Cache-Tier"] = tier
+    return headers
 
+async def answer_question(mode, user_input, history_str, index, priority, use_cache=True):
+    """
+    Runs retrieval + a pooled crew, the single-agent fast path or the standard LLM for one question.
+    Returns (answer, cacheable, semantic_cache_status); error replies are not cacheable.
+    use_cache=False skips the semantic cache lookup.
+    The LLM call waits for admission and raises AdmissionRejected when it is not admitted.
+    """
+    # If the agent is enabled, use a pooled crew instance with context
+    if not mode.disable_agent:
+        retrieved_docs, query_embedding = await retrieve_documents(user_input, index)
+
+        # Paraphrases of an earlier question that retrieved the same context reuse its answer
+        ctx_hash = answer_context_hash(retrieved_docs, history_str, mode)
+        cached_reply = None
+        if use_cache:
+            with request_profile.span("semantic_cache.lookup"):
+                cached_reply = semantic_cache_for(index).lookup(query_embedding, ctx_hash, index.version)
+        if cached_reply is not None:
+            return cached_reply, True, "HIT"
+
+        with metrics.CHAT_STAGE_SECONDS.labels(stage="context_assembly").time(), request_profile.span("context_assembly"):
+            inputs = build_crew_inputs(user_input, retrieved_docs, history_str, mode)
+
+        async with admission_slot(priority):
+            try:
+                if load_default_agent.fast_path_eligible():
+                    # Single agent, single task, no tools: one direct LLM call instead of a Crew run
+                    with metrics.CHAT_STAGE_SECONDS.labels(stage="agent_direct_llm").time(), request_profile.span("DirectAgentResponse"):
+                        reply = await load_default_agent.DirectAgentResponseAsync(inputs)
+                else:
+                    with metrics.CHAT_STAGE_SECONDS.labels(stage="crew_kickoff").time():
+                        result = await (await acquire_crew_pool()).kickoff(inputs)
+                    reply = result.tasks_output[0]
+                if reply is None:
+                    return "Sorry, something went wrong. Please try again.", False, "MISS"
+                safe_reply = str(reply)
+                semantic_cache_for(index).store(query_embedding, ctx_hash, index.version, safe_reply)
+                return safe_reply, True, "MISS"
+            except Exception as e:
+                return f"Encountered an error: {e}", False, "MISS"
+
+    # When the agent is disabled, use the default standard llm response method
+    with metrics.CHAT_STAGE_SECONDS.labels(stage="context_assembly").time(), request_profile.span("context_assembly"):
+        prompt = build_stdllm_prompt(user_input, history_str, mode)
+    async with admission_slot(priority):
         try:
-            result = crew_instance.kickoff(inputs=inputs)
-            reply = result.tasks_output[0]
-            safe_reply = str(reply) if reply is not None else "Sorry, something went wrong. Please try again."
+            with metrics.CHAT_STAGE_SECONDS.labels(stage="direct_llm").time(), request_profile.span("StandardLLMResponse"):
+                return await load_default_agent.StandardLLMResponseAsync(prompt), True, None
         except Exception as e:
-            safe_reply = f"Encountered an error: {e}"
+            return f"Sorry, something went wrong. Please try again. Error details: {e}", False, None
 
-    # When disable_agent is True, use the default standard llm response method
-    else:
-        # Remove the mode marker from the user input if present
-        if "/stdllm" in user_input:
-            user_input = user_input.replace("/stdllm", "")
-        if "/stdllm-nh" in user_input:
-            user_input = user_input.replace("/stdllm-nh", "")
-
-        # Construct the query to include conversation history if needed
-        new_query = f"I'm User. My query is: {user_input}, My Conversation History is: {history_str}"
+@asynccontextmanager
+async def admission_slot(priority):
+    with request_profile.span("admission", priority=priority, queued=admission.queue_depth):
+        ticket = await admission.acquire(priority)
+    try:
+        yield ticket
+    finally:
+        ticket.release()
+
+def request_result(cacheable, semantic_status, coalesced):
+    # Label for truenotion_chat_requests_total
+    if not cacheable:
+        return "error"
+    if coalesced:
+        return "coalesced"
+    return "semantic_hit" if semantic_status == "HIT" else "answered"
+
+@app.post("/chat", dependencies=[Depends(require_ready)])
+async def chat_api(query: Query, request: Request, response: Response):
+    profile = profiling_requested(request)
+    priority = request_priority(request)
+    with metrics.CHAT_REQUEST_SECONDS.labels(endpoint="/chat").time():
+        use_cache = not cache_bypassed(request)
+        if profile is None:
+            return await answer_chat(query, response, priority, await resolve_index(request), use_cache)
+        # Admin-only: record the span tree of this request and return it along with the answer
+        with request_profile.trace("/chat", sample=profile, question=query.question[:80]) as trace:
+            reply = await answer_chat(query, response, priority, await resolve_index(request), use_cache)
+        response.headers["X-Trace-Id"] = trace.trace_id
+        return {**reply, "trace": trace.to_dict()}
+
+async def answer_chat(query, response, priority, index, use_cache=True):
+    mode, user_input = resolve_mode(query)
+    session, conversation_history, summary = await load_conversation(query)
+    history_str = build_history_str(conversation_history, index, summary)
+
+    # Byte-identical (normalized) questions are answered from the exact-match cache
+    cache_key = answer_cache_key(mode, user_input, conversation_history, index, summary)
+    cached_reply, tier = await lookup_answer(cache_key) if use_cache else (None, None)
+    response.headers.update(cache_headers(cache_key, tier))
+    if cached_reply is not None:
+        metrics.CHAT_REQUESTS.labels(endpoint="/chat", mode=mode.name, result="cache_hit").inc()
+        await record_turn(session, user_input, cached_reply, index)
+        return chat_reply(cached_reply, mode, session)
+
+    async def compute():
+        result = await answer_question(mode, user_input, history_str, index, priority, use_cache)
+        safe_reply, cacheable, _ = result
+        if cacheable:
+            await store_answer(cache_key, safe_reply)
+        return result
+
+    # Concurrent requests with the same cache key wait on one in-flight computation
+    with request_profile.span("single_flight") as flight_span:
         try:
-            if history_mode:
-                safe_reply = load_default_agent.StandardLLMResponse(new_query)
-            else:
-                safe_reply = load_default_agent.StandardLLMResponse(user_input)
+            (safe_reply, cacheable, semantic_status), coalesced = await in_flight.do(cache_key, compute)
+        except AdmissionRejected:
+            metrics.CHAT_REQUESTS.labels(endpoint="/chat", mode=mode.name, result="rejected").inc()
+            raise
+    if flight_span is not None:
+        flight_span.attrs["coalesced"] = coalesced
+    if semantic_status:
+        response.headers["X-Semantic-Cache"] = semantic_status
+    if coalesced:
+        response.headers["X-Coalesced"] = "1"
+    metrics.CHAT_REQUESTS.labels(endpoint="/chat", mode=mode.name, result=request_result(cacheable, semantic_status, coalesced)).inc()
+    if cacheable:
+        await record_turn(session, user_input, safe_reply, index)
+
+    return chat_reply(safe_reply, mode, session)
+
+@app.post("/chat/stream", dependencies=[Depends(require_ready)])
+async def chat_stream_api(query: Query, request: Request):
+    """
+    Same pipeline as /chat, streamed as Server-Sent Events. The first event carries the ids of the
+    retrieved sources, followed by one 'token' event per generated chunk and a final 'done' event.
+    Profiled requests end with a 'trace' event; the trace is fetched from /debug/traces/{trace_id}.
+    """
+    profile = profiling_requested(request)
+    priority = request_priority(request)
+    trace = None if profile is None else request_profile.start("/chat/stream", sample=profile, question=query.question[:80])
+    ticket = None
+    use_cache = not cache_bypassed(request)
+    try:
+        mode, user_input = resolve_mode(query)
+        index = await resolve_index(request)
+        session, conversation_history, summary = await load_conversation(query)
+        history_str = build_history_str(conversation_history, index, summary)
+        cache_key = answer_cache_key(mode, user_input, conversation_history, index, summary)
+        cached_reply, tier = await lookup_answer(cache_key) if use_cache else (None, None)
+        if cached_reply is None:
+            # Admitted before the response starts, so a rejection is a proper 429/503 rather than an SSE error
+            with request_profile.span("admission", priority=priority, queued=admission.queue_depth):
+                ticket = await admission.acquire(priority)
+    except Exception as e:
+        if isinstance(e, AdmissionRejected):
+            metrics.CHAT_REQUESTS.labels(endpoint="/chat/stream", mode=mode.name, result="rejected").inc()
+        if trace is not None:
+            request_profile.finish(trace)
+        raise
+
+    async def event_stream():
+        started = time.perf_counter()
+        try:
+            async for event in stream_events():
+                yield event
+            if trace is not None:
+                request_profile.finish(trace)
+                yield streaming.format_sse("trace", {"trace_id": trace.trace_id, "duration_ms": trace.duration_ms})
+        finally:
+            if ticket is not None:
+                ticket.release()
+            if trace is not None and trace.root.end is None:
+                request_profile.finish(trace)
+            metrics.CHAT_REQUEST_SECONDS.labels(endpoint="/chat/stream").observe(time.perf_counter() - started)
+
+    async def stream_events():
+        loop = asyncio.get_running_loop()
+        channel = streaming.TokenChannel(loop)
+        retrieved_docs, query_embedding = ([], None) if mode.disable_agent else await retrieve_documents(user_input, index)
+        sources = [
+            {"id": doc.metadata.get("id", ""), "source_key": doc.metadata.get("source_key", "")}
+            for doc in retrieved_docs
+        ]
+        yield streaming.format_sse("sources", {"sources": sources, "mode": mode.name})
+
+        if cached_reply is not None:
+            yield streaming.format_sse("token", {"token": cached_reply})
+            yield streaming.format_sse("done", {**chat_reply(cached_reply, mode, session), "cached": True})
+            metrics.CHAT_REQUESTS.labels(endpoint="/chat/stream", mode=mode.name, result="cache_hit").inc()
+            await record_turn(session, user_input, cached_reply, index)
+            return
+
+        if not mode.disable_agent:
+            ctx_hash = answer_context_hash(retrieved_docs, history_str, mode)
+            semantic_reply = None
+            if use_cache:
+                with request_profile.span("semantic_cache.lookup"):
+                    semantic_reply = semantic_cache_for(index).lookup(query_embedding, ctx_hash, index.version)
+            if semantic_reply is not None:
+                ticket.release()
+                yield streaming.format_sse("token", {"token": semantic_reply})
+                yield streaming.format_sse("done", {**chat_reply(semantic_reply, mode, session), "cached": True})
+                metrics.CHAT_REQUESTS.labels(endpoint="/chat/stream", mode=mode.name, result="semantic_hit").inc()
+                await store_answer(cache_key, semantic_reply)
+                await record_turn(session, user_input, semantic_reply, index)
+                return
+
+            with metrics.CHAT_STAGE_SECONDS.labels(stage="context_assembly").time(), request_profile.span("context_assembly"):
+                inputs = build_crew_inputs(user_input, retrieved_docs, history_str, mode)
+            answer_filter = streaming.FinalAnswerFilter(channel.put)
+
+            def run_crew(crew):
+                try:
+                    with streaming.crew_stream_sink(answer_filter), metrics.CHAT_STAGE_SECONDS.labels(stage="crew_kickoff").time(), \
+                            request_profile.span("crew_instance.kickoff"):
+                        result = crew.kickoff(inputs=inputs)
+                    reply = result.tasks_output[0]
+                    if reply is None:
+                        raise RuntimeError("Sorry, something went wrong. Please try again.")
+                    semantic_cache_for(index).store(query_embedding, ctx_hash, index.version, str(reply))
+                    return str(reply)
+                finally:
+                    channel.close()
+
+            async def run_direct():
+                # Streamed on the event loop through the LLM router (hedged when configured)
+                try:
+                    parts = []
+                    with metrics.CHAT_STAGE_SECONDS.labels(stage="agent_direct_llm").time(), request_profile.span("DirectAgentStream"):
+                        async for token in load_default_agent.DirectAgentStreamAsync(inputs):
+                            parts.append(token)
+                            channel.put(token)
+                    reply = "".join(parts)
+                    semantic_cache_for(index).store(query_embedding, ctx_hash, index.version, reply)
+                    return reply
+                finally:
+                    channel.close()
+
+            async def generate():
+                if load_default_agent.fast_path_eligible():
+                    return await run_direct()
+                pool = await acquire_crew_pool()  # the pool may be replaced by an agent config change meanwhile
+                async with pool.acquire() as crew:
+                    return await pool.run_in_executor(run_crew, crew)
+        else:
+            with metrics.CHAT_STAGE_SECONDS.labels(stage="context_assembly").time(), request_profile.span("context_assembly"):
+                prompt = build_stdllm_prompt(user_input, history_str, mode)
+
+            async def generate():
+                try:
+                    parts = []
+                    with metrics.CHAT_STAGE_SECONDS.labels(stage="direct_llm").time(), request_profile.span("StandardLLMStream"):
+                        async for token in load_default_agent.StandardLLMStreamAsync(prompt):
+                            parts.append(token)
+                            channel.put(token)
+                    return "".join(parts)
+                finally:
+                    channel.close()
+
+        task = asyncio.create_task(generate())
+        try:
+            async for token in channel:
+                yield streaming.format_sse("token", {"token": token})
+            answer = await task
         except Exception as e:
-            safe_reply = f"Sorry, something went wrong. Please try again. Error details: {e}"
+            metrics.CHAT_REQUESTS.labels(endpoint="/chat/stream", mode=mode.name, result="error").inc()
+            yield streaming.format_sse("error", {"detail": str(e)})
+            return
+        finally:
+            if not task.done():
+                task.cancel()
+            ticket.release()
+        yield streaming.format_sse("done", chat_reply(answer, mode, session))
+        metrics.CHAT_REQUESTS.labels(endpoint="/chat/stream", mode=mode.name, result="answered").inc()
+        await store_answer(cache_key, answer)
+        await record_turn(session, user_input, answer, index)
 
-    return {"answer": safe_reply}
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **cache_headers(cache_key, tier)}
+    if trace is not None:
+        headers["X-Trace-Id"] = trace.trace_id
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=headers)
 
 # -----------------------------
 # NEW ENDPOINT: Save Agent Configuration
@@ -209,67 +929,168 @@ Conversation History:
 class AgentConfig(BaseModel):
     agent: dict
     task: dict
+    llm: dict | None = None  # Optional per-role model/temperature, e.g. {"standard": {"model": ..., "temperature": ...}}
 
 @app.post("/save-agent-config")
 def save_agent_config(config: AgentConfig):
     try:
+        data = config.dict(exclude_none=True)
         # Define the file path where the configuration will be saved. Here, we save the file in the backend folder.
         file_path = os.path.join(os.getcwd(), "agents/agent_config.json")
         with open(file_path, "w") as f:
-            json.dump(config.dict(), f, indent=2)
+            json.dump(data, f, indent=2)
         data_loader.upload_agent_config_to_upstash(filepath="agents/agent_config.json", key="agent_config")
-        return {"message": "Agent configuration saved successfully.", "file_path": file_path}
+        # Other instances pick the new version up on their next poll; this one applies it right away
+        config_manager.publish("agent_config", data)
+        result = config_manager.apply("agent_config", data)
+        return {
+            "message": "Agent configuration saved successfully.",
+            "file_path": file_path,
+            "version": config_manager.version("agent_config"),
+            "result": result,
+        }
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/loaded-files-reference")
-def get_loaded_files_reference():
+async def get_loaded_files_reference(request: Request):
+    index = await resolve_index(request)
     try:
-        return {"loaded_files_reference": loaded_files_reference}
+        # logging on frontend; the parameters are read live since memory and k change without a rebuild
+        rag_parameters = index.rag_parameters
+        return {"loaded_files_reference": index.loaded_files_reference + [
+            "RAG Parameters: ",
+            f"Top-k value: {rag_parameters.get('k')}",
+            f"Chunk size: {rag_parameters.get('chunk_size')}",
+            f"Memory: {rag_parameters.get('memory')}"
+        ]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
-@app.post("/initialize")
-def reset_backend_state():
-    global loaded_files_reference
+@app.post("/initialize", status_code=202, dependencies=[Depends(require_ready)])
+def reset_backend_state(config_only: bool = False):
+    """
+    Reloads agent_config and rag_config and starts a complete background rebuild (Notion sync,
+    embedding, FAISS); the new index is swapped in atomically when ready. ?config_only=true only
+    reloads the configs and applies what changed (see src/config_manager.py): prompt changes rebuild
+    the crews, memory applies instantly, k swaps the retriever and chunk_size re-indexes in the background.
+    """
     try:
-        rag_parameters = load_default_agent.fetch_config_from_upstash("rag_config")
-        file_path = os.path.join(os.getcwd(), "rag/rag_config.json")
-        with open(file_path, "w") as f:
-            json.dump(rag_parameters, f, indent=2)
+        applied = config_manager.refresh()
+    except Exception as e:
+        if config_only:
+            raise HTTPException(status_code=502, detail=f"Could not reload the config: {e}")
+        print(f"Info: Could not reload the config ({e}), rebuilding with the live one.")
+        applied = {}
+    versions = {key: config_manager.version(key) for key in applied}
+    if config_only:
+        return {"status": "config reloaded", "applied": applied, "versions": versions, "index_version": index_handle.version}
+    job, created = rebuild_jobs.submit()
+    return {
+        "status": "rebuild started" if created else "rebuild already in progress",
+        "job_id": job["job_id"],
+        "applied": applied,
+        "versions": versions,
+        "index_version": index_handle.version,
+    }
 
-        k = rag_parameters.get("k")
-        chunk_size = rag_parameters.get("chunk_size")
-        memory = rag_parameters.get("memory")
+@app.get("/config")
+def get_config_status():
+    """Live config versions, poller state and recently applied changes."""
+    return config_manager.stats()
 
-        # logging on frontend
-        retriever, loaded_files_reference = process.initialize_system(adjusted_k=k, adjusted_chunk_size=chunk_size)
+@app.get("/index/shared")
+def get_shared_index():
+    """Role of this worker and the shared index generation it answers from (404 without SHARED_INDEX_DIR)."""
+    if shared_index is None:
+        raise HTTPException(status_code=404, detail="No shared index configured (set SHARED_INDEX_DIR).")
+    return {**shared_index.stats(), "index_version": index_handle.version}
 
-        loaded_files_reference.extend([
-            "RAG Parameters: ",
-            f"Top-k value: {k}",
-            f"Chunk size: {chunk_size}",
-            f"Memory: {memory}"
-        ])
-    
-    except (Exception, KeyError) as e:
-        print(f"Info: Could not load rag_config, using default config.")
-        with open('rag/default_rag_config.json','r') as f:
-            rag_parameters = json.load(f)
+@app.get("/sync")
+def get_sync_status():
+    """Data sync scheduler: poll state, debounced pending changes and recent change-driven re-indexes."""
+    return {**sync_scheduler.stats(), "index_version": index_handle.version}
+
+@app.post("/sync", status_code=202, dependencies=[Depends(require_admin)])
+def request_sync():
+    """Polls the data sources now instead of at the next interval; changes are re-indexed after the debounce."""
+    sync_scheduler.notify("manual")
+    return {"status": "sync requested"}
+
+# Last verification token Notion sent to /sync/webhook (kept only while SYNC_WEBHOOK_SECRET is unset)
+webhook_verification_token = None
+
+@app.get("/sync/webhook/verification-token", dependencies=[Depends(require_admin)])
+def get_webhook_verification_token():
+    """The verification token of a new Notion webhook subscription, to confirm it and set SYNC_WEBHOOK_SECRET."""
+    if webhook_verification_token is None:
+        raise HTTPException(status_code=404, detail="No verification token received (or SYNC_WEBHOOK_SECRET is already set).")
+    return webhook_verification_token
+
+@app.post("/sync/webhook", status_code=202)
+async def sync_webhook(request: Request):
+    """
+    Push endpoint for Notion webhooks (or any caller with X-Admin-Token): an event triggers an
+    immediate poll. Events must carry a valid X-Notion-Signature when SYNC_WEBHOOK_SECRET is set.
+    """
+    body = await request.body()
+    try:
+        event = json.loads(body or b"{}")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="The webhook body must be JSON.")
+    if isinstance(event, dict) and "verification_token" in event and not WEBHOOK_SECRET:
+        # Notion's one-time subscription check, only accepted until the token is configured as
+        # SYNC_WEBHOOK_SECRET; admins read it from GET /sync/webhook/verification-token
+        global webhook_verification_token
+        webhook_verification_token = {"token": str(event["verification_token"]), "received_at": time.time()}
+        print("Notion webhook verification token received (GET /sync/webhook/verification-token).")
+        return {"status": "verification token received"}
+    signed = verify_signature(body, request.headers.get("X-Notion-Signature"))
+    if not signed and not request_profile.authorized(request.headers.get("X-Admin-Token")):
+        raise HTTPException(status_code=403, detail="A valid X-Notion-Signature (SYNC_WEBHOOK_SECRET) or X-Admin-Token is required.")
+    sync_scheduler.notify(f"webhook {event.get('type', 'event') if isinstance(event, dict) else 'event'}")
+    return {"status": "sync requested"}
+
+@app.get("/tenants", dependencies=[Depends(require_admin)])
+def get_tenants():
+    """Resident tenant indexes (memory, load time, requests) and the RAM budget."""
+    return tenant_indexes.stats()
+
+@app.post("/tenants/{tenant}/evict", dependencies=[Depends(require_admin)])
+def evict_tenant(tenant: str):
+    """Drops a tenant's resident index, e.g. after rebuilding its artifacts; the next request reloads it."""
+    return {"tenant": tenant, "evicted": tenant_indexes.evict(tenant)}
+
+@app.get("/cache/stats")
+def get_cache_stats():
+    return {
+        "answer_cache": answer_cache.stats(),
+        "semantic_cache": response_cache.stats(),
+        "single_flight": in_flight.stats(),
+    }
 
-        k = rag_parameters.get("k")
-        chunk_size = rag_parameters.get("chunk_size")
-        memory = rag_parameters.get("memory")
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus scrape endpoint (per-stage latency histograms, cache and index metrics)."""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
 
-        # logging on frontend
-        retriever, loaded_files_reference = process.initialize_system(adjusted_k=k, adjusted_chunk_size=chunk_size)
+@app.get("/debug/traces", dependencies=[Depends(require_admin)])
+def list_traces():
+    """Most recent profiled requests (ring buffer), newest first."""
+    return {"traces": request_profile.traces.list()}
 
-        loaded_files_reference.extend([
-            "",
-            f"Top-k value: {k}",
-            f"Chunk size: {chunk_size}",
-            f"Memory: {memory}"
-        ])
+@app.get("/debug/traces/{trace_id}", dependencies=[Depends(require_admin)])
+def get_trace(trace_id: str):
+    trace = request_profile.traces.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"Unknown trace '{trace_id}'")
+    return trace.to_dict()
 
-    return {"status": "backend state reset"}
+@app.get("/initialize/{job_id}")
+def get_rebuild_status(job_id: str):
+    job = rebuild_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown rebuild job '{job_id}'")
+    job["index_version"] = index_handle.version
+    return job
@@ -0,0 +1,160 @@
+"""
+Crew path vs. single-agent fast path: latency and prompt tokens per answer.
+
+Both paths answer the same questions with identical crew inputs (question, a synthetic retrieved
+context of --context-chars, timestamp) against the stub LLM, so only the framework overhead and the
+prompts differ. Every prompt the LLM receives is recorded, so tokens are counted on exactly what each
+path sends (tiktoken's cl100k_base when installed, otherwise ~4 characters per token). The Crew path
+is built like app.py builds its pooled crews (verbose output is discarded, not skipped).
+
+    python benchmarks/agent_fast_path.py --runs 20 --out fast-path.json
+    python benchmarks/agent_fast_path.py --latency-ms 800 --tokens-per-sec 40
+
+End-to-end numbers against a live model come from the server benchmarks, with the fast path toggled
+by AGENT_FAST_PATH=0/1 (benchmarks/loadtest.py, benchmarks/ttft.py).
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import synthetic_notion  # noqa: E402
+from pipeline import percentile, git_commit  # noqa: E402
+
+
+def token_counter():
+    try:
+        import tiktoken
+
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return "cl100k_base", lambda text: len(encoding.encode(text))
+    except Exception:
+        return "chars/4", lambda text: max(1, round(len(text) / 4))
+
+
+def make_inputs(question, context_chars, seed):
+    context = " ".join(synthetic_notion.sample_queries(max(1, context_chars // 20), seed=seed))[:context_chars]
+    return {
+        "user_question": question,
+        "context": f"Context: {context}",
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def build_crew(load_default_agent):
+    from crewai import Crew
+
+    llm_setup = load_default_agent.LLMSetup()
+    agent = load_default_agent.DataAnalysisAgentFactory(llm_setup.llm).create_agent()
+    task = load_default_agent.DataAnalysisTaskFactory(agent).create_task()
+    return Crew(agents=[agent], tasks=[task], verbose=True)
+
+
+def measure(name, answer, questions, args, prompts, count_tokens):
+    latencies, llm_calls, prompt_tokens = [], [], []
+    for i, question in enumerate(questions):
+        inputs = make_inputs(question, args.context_chars, seed=args.seed + i)
+        prompts.clear()
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            answer(inputs)
+        latencies.append(time.perf_counter() - start)
+        llm_calls.append(len(prompts))
+        prompt_tokens.append(sum(count_tokens(prompt) for prompt in prompts))
+    return {
+        "path": name,
+        "runs": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 1),
+        "llm_calls_per_answer": round(statistics.mean(llm_calls), 2),
+        "prompt_tokens_per_answer": round(statistics.mean(prompt_tokens), 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--context-chars", type=int, default=6000, help="size of the retrieved context in the prompt")
+    parser.add_argument("--latency-ms", type=float, default=0, help="stub LLM time to first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=0, help="stub LLM generation speed (0 = instant)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)
+    os.environ.update(
+        TRUENOTION_STUB_LLM="1",
+        STUB_LLM_LATENCY_MS=str(args.latency_ms),
+        STUB_LLM_TOKENS_PER_SEC=str(args.tokens_per_sec),
+        CREWAI_DISABLE_TELEMETRY="true",
+        OTEL_SDK_DISABLED="true",
+    )
+    for name in ("UPSTASH_REDIS_REST_URL", "UPSTASH_REDIS_REST_TOKEN"):
+        os.environ.setdefault(name, "offline-benchmark")
+
+    from agents import load_default_agent, stub_llm
+
+    # No agent_config in the (empty) fake Upstash: the default agent config is used
+    load_default_agent.requests = synthetic_notion.FakeUpstash()
+    load_default_agent.init(force=True)
+    if not load_default_agent.fast_path_eligible():
+        print("The agent config is not eligible for the fast path (or AGENT_FAST_PATH=0).", file=sys.stderr)
+        return 1
+
+    prompts = []
+    original_stream = stub_llm.StubLLM.stream
+
+    def recording_stream(self, prompt):
+        prompts.append(prompt)
+        return original_stream(self, prompt)
+
+    stub_llm.StubLLM.stream = recording_stream
+    tokenizer, count_tokens = token_counter()
+    questions = synthetic_notion.sample_queries(args.runs, seed=args.seed + 1)
+
+    crew = build_crew(load_default_agent)
+    results = [
+        measure("crew", lambda inputs: crew.kickoff(inputs=inputs), questions, args, prompts, count_tokens),
+        measure("fast_path", load_default_agent.DirectAgentResponse, questions, args, prompts, count_tokens),
+    ]
+
+    print(f"{'path':>10} {'p50 ms':>9} {'p95 ms':>9} {'llm calls':>10} {'prompt tokens':>14}")
+    for result in results:
+        print(f"{result['path']:>10} {result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} "
+              f"{result['llm_calls_per_answer']:>10.2f} {result['prompt_tokens_per_answer']:>14.1f}")
+    crew_result, fast_result = results
+    savings = {
+        "p50_ms": round(crew_result["p50_ms"] - fast_result["p50_ms"], 1),
+        "prompt_tokens_per_answer": round(crew_result["prompt_tokens_per_answer"] - fast_result["prompt_tokens_per_answer"], 1),
+    }
+    print(f"\nFast path saves {savings['p50_ms']} ms at p50 and {savings['prompt_tokens_per_answer']} prompt tokens per answer ({tokenizer}).")
+
+    report = {
+        "benchmark": "agent_fast_path",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "tokenizer": tokenizer,
+        "params": {key: value for key, value in vars(args).items() if key != "out"},
+        "results": results,
+        "savings": savings,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""
+Embedding backend comparison (bench-embeddings): every backend of src/embeddings.py embeds the same
+local corpus, each in a fresh process so memory is measured per backend.
+
+    load            time to create the backend (model load / client setup)
+    embed_batch     chunks embedded per second in batches of --batch-size (vectors/s, per-batch p50/p99)
+    embed_query     single query latency (p50/p99 over --queries sample queries)
+    memory          RSS growth of the process after loading and after embedding the corpus
+
+The corpus is the JSON files of --data (the data/ folder format: [{"id", "properties"}, ...]) or, by
+default, synthetic Notion pages (benchmarks/synthetic_notion.py), serialized and chunked like
+data_loader does. Backends that cannot run here (missing package, model file or API token) are
+reported as skipped. "synthetic" (random word vectors) is always available as a reference.
+
+    python benchmarks/embeddings.py --backends glove,huggingface,deepinfra,synthetic --rows 2000 --out embeddings.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import synthetic_notion  # noqa: E402
+from pipeline import git_commit, percentile, rss_bytes  # noqa: E402
+
+
+def load_corpus(args):
+    """Chunk texts of the corpus: the --data JSON files or synthetic Notion pages."""
+    entries = []
+    if args.data:
+        for name in sorted(os.listdir(args.data)):
+            if name.endswith(".json"):
+                with open(os.path.join(args.data, name), encoding="utf-8") as f:
+                    entries.extend(json.load(f))
+    else:
+        for response in synthetic_notion.notion_responses(args.rows, seed=args.seed):
+            for page in response["results"]:
+                entries.append({"id": page["id"], "properties": page["properties"]})
+    chunks = []
+    step = args.chunk_size - args.chunk_overlap
+    for entry in entries:
+        text = json.dumps(entry["properties"], ensure_ascii=False, indent=2)
+        chunks.extend(text[start:start + args.chunk_size] for start in range(0, len(text), step))
+    return chunks
+
+
+def register_synthetic():
+    from src import embeddings
+
+    embeddings.register(
+        "synthetic", lambda: embeddings.WordVectorEmbeddings(synthetic_notion.SyntheticKeyedVectors(), model_id="synthetic-50")
+    )
+
+
+def run_backend(name, args):
+    """Benchmarks one backend in the current process and returns its results."""
+    from src import embeddings
+
+    register_synthetic()
+    chunks = load_corpus(args)
+    queries = synthetic_notion.sample_queries(args.queries, seed=args.seed + 1)
+    rss_start = rss_bytes()
+
+    start = time.perf_counter()
+    try:
+        backend = embeddings.get_backend(name)
+        backend.embed_query("warmup")
+    except Exception as e:
+        return {"backend": name, "skipped": f"{type(e).__name__}: {e}"}
+    load_seconds = time.perf_counter() - start
+    rss_loaded = rss_bytes()
+
+    batch_latencies = []
+    start = time.perf_counter()
+    for i in range(0, len(chunks), args.batch_size):
+        batch_start = time.perf_counter()
+        vectors = backend.embed_batch(chunks[i:i + args.batch_size])
+        batch_latencies.append(time.perf_counter() - batch_start)
+    embed_seconds = time.perf_counter() - start
+
+    query_latencies = []
+    for query in queries:
+        query_start = time.perf_counter()
+        backend.embed_query(query)
+        query_latencies.append(time.perf_counter() - query_start)
+
+    return {
+        "backend": name,
+        "model_id": backend.model_id,
+        "dim": int(vectors.shape[1]),
+        "chunks": len(chunks),
+        "load_s": round(load_seconds, 3),
+        "vectors_per_s": round(len(chunks) / embed_seconds, 1) if embed_seconds else None,
+        "batch_p50_ms": round(percentile(batch_latencies, 50) * 1000, 2),
+        "batch_p99_ms": round(percentile(batch_latencies, 99) * 1000, 2),
+        "query_p50_ms": round(percentile(query_latencies, 50) * 1000, 3),
+        "query_p99_ms": round(percentile(query_latencies, 99) * 1000, 3),
+        "rss_model_mb": round((rss_loaded - rss_start) / 2**20, 1),
+        "rss_total_mb": round((rss_bytes() - rss_start) / 2**20, 1),
+    }
+
+
+def run_isolated(name, args):
+    command = [
+        sys.executable, os.path.abspath(__file__), "--single", name, "--rows", str(args.rows),
+        "--chunk-size", str(args.chunk_size), "--chunk-overlap", str(args.chunk_overlap),
+        "--batch-size", str(args.batch_size), "--queries", str(args.queries), "--seed", str(args.seed),
+    ] + (["--data", args.data] if args.data else [])
+    completed = subprocess.run(command, cwd=ROOT, stdout=subprocess.PIPE, text=True, check=True)
+    # The child prints its result as the last line of stdout
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="glove,huggingface,deepinfra,synthetic", help="comma-separated backend names")
+    parser.add_argument("--rows", type=int, default=2000, help="synthetic Notion pages (without --data)")
+    parser.add_argument("--data", help="folder of JSON files in the data/ format to embed instead")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--in-process", action="store_true", help="run all backends in this process (memory is then cumulative)")
+    parser.add_argument("--out", help="write the JSON report to this file")
+    parser.add_argument("--single", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.single is not None:
+        print(json.dumps(run_backend(args.single, args)))
+        return 0
+
+    os.chdir(ROOT)
+    results = []
+    for name in [name.strip() for name in args.backends.split(",") if name.strip()]:
+        print(f"Benchmarking {name}..", file=sys.stderr)
+        results.append(run_backend(name, args) if args.in_process else run_isolated(name, args))
+
+    print(f"\n{'backend':>12} {'vectors/s':>10} {'batch p50':>10} {'query p50':>10} {'query p99':>10} {'load':>7} {'model MB':>9} {'total MB':>9}")
+    for result in results:
+        if "skipped" in result:
+            print(f"{result['backend']:>12}  skipped ({result['skipped']})")
+            continue
+        print(f"{result['backend']:>12} {result['vectors_per_s']:>10.1f} {result['batch_p50_ms']:>8.1f}ms "
+              f"{result['query_p50_ms']:>8.3f}ms {result['query_p99_ms']:>8.3f}ms {result['load_s']:>6.2f}s "
+              f"{result['rss_model_mb']:>9.1f} {result['rss_total_mb']:>9.1f}")
+
+    report = {
+        "benchmark": "embeddings",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {key: value for key, value in vars(args).items() if key not in ("out", "single")},
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""
+Load test for POST /chat: throughput, latency percentiles and error rate at increasing concurrency.
+
+By default boots the backend offline (benchmarks/loadtest_server.py: stub LLM, synthetic local data),
+waits for /readyz and drives it with closed-loop clients; --url targets an already running server.
+
+    python benchmarks/loadtest.py --concurrency 1,4,16,64 --duration 20 --out load.json
+    python benchmarks/loadtest.py --mode stdllm-nh --repeat 0.5 --latency-ms 800 --tokens-per-sec 40
+    python benchmarks/loadtest.py --url http://127.0.0.1:8000 --concurrency 8
+
+--repeat is the share of questions drawn from a small fixed pool (exercises the answer caches and
+single-flight); the rest are unique. Every request uses a fresh session, so history stays empty.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pipeline import percentile, git_commit  # noqa: E402
+from synthetic_notion import VOCABULARY, sample_queries  # noqa: E402
+
+MODE_MARKERS = {"truN": "/truN", "truN-nh": "/truN-nh", "stdllm": "/stdllm", "stdllm-nh": "/stdllm-nh"}
+
+
+def start_server(args):
+    env = dict(
+        os.environ,
+        TRUENOTION_STUB_LLM="1",
+        STUB_LLM_LATENCY_MS=str(args.latency_ms),
+        STUB_LLM_TOKENS_PER_SEC=str(args.tokens_per_sec),
+        STUB_LLM_TOKENS=str(args.tokens),
+    )
+    if args.crew_pool_size:
+        env["CREW_POOL_SIZE"] = str(args.crew_pool_size)
+    log = tempfile.NamedTemporaryFile(prefix="truenotion-loadtest-", suffix=".log", delete=False)
+    command = [sys.executable, os.path.join(ROOT, "benchmarks", "loadtest_server.py"),
+               "--port", str(args.port), "--rows", str(args.rows), "--embeddings", args.embeddings]
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    return process, log.name
+
+
+def wait_ready(url, timeout_s, process=None, log_path=None):
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}, see {log_path}")
+        try:
+            response = requests.get(f"{url}/readyz", timeout=2)
+            if response.status_code == 200:
+                return response.json()
+            if response.json().get("status") == "failed":
+                raise RuntimeError(f"Warmup failed: {response.json().get('error')} (see {log_path})")
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"Server not ready after {timeout_s}s (see {log_path})")
+
+
+class QuestionSource:
+    def __init__(self, mode, repeat, seed=0):
+        self.marker = MODE_MARKERS[mode]
+        self.repeat = repeat
+        self.pool = sample_queries(8, seed=seed)
+        self.rng = random.Random(seed)
+        self.counter = 0
+        self.lock = threading.Lock()
+
+    def next(self):
+        with self.lock:
+            self.counter += 1
+            if self.rng.random() < self.repeat:
+                question = self.rng.choice(self.pool)
+            else:
+                # Fresh random words, so the semantic cache does not match it to an earlier question either
+                question = " ".join(self.rng.choice(VOCABULARY) for _ in range(8)) + f" #{self.counter}"
+        return f"{question} {self.marker}"
+
+
+def run_level(url, concurrency, duration_s, questions, timeout_s, priority=None):
+    """Closed loop: `concurrency` clients each send the next request as soon as the previous one returns."""
+    results = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration_s
+
+    def client():
+        session = requests.Session()
+        if priority:
+            session.headers["X-Priority"] = priority
+        local = []
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = session.post(f"{url}/chat", json={"question": questions.next()}, timeout=timeout_s)
+                ok = response.status_code == 200
+                local.append((time.perf_counter() - start, ok, response.status_code,
+                              response.headers.get("X-Cache") == "HIT", response.headers.get("X-Coalesced") == "1"))
+            except requests.RequestException:
+                local.append((time.perf_counter() - start, False, None, False, False))
+        with lock:
+            results.extend(local)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for latency, ok, *_ in results if ok]
+    errors = [status for _, ok, status, *_ in results if not ok]
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(len(errors) / len(results), 4) if results else 0.0,
+        "errors_by_status": {str(status): errors.count(status) for status in set(errors)},
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1) if latencies else None,
+        "cache_hits": sum(1 for *_, hit, _ in results if hit),
+        "coalesced": sum(1 for *_, coalesced in results if coalesced),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="target an already running server instead of booting one")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per concurrency level")
+    parser.add_argument("--mode", choices=list(MODE_MARKERS), default="truN-nh")
+    parser.add_argument("--repeat", type=float, default=0.0, help="share of questions drawn from a small pool (0..1)")
+    parser.add_argument("--priority", choices=["interactive", "batch"], help="admission priority class (X-Priority)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout in seconds")
+    parser.add_argument("--ready-timeout", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=0)
+    server = parser.add_argument_group("offline server (ignored with --url)")
+    server.add_argument("--rows", type=int, default=2000)
+    server.add_argument("--embeddings", choices=["auto", "glove", "synthetic"], default="auto")
+    server.add_argument("--latency-ms", type=float, default=300)
+    server.add_argument("--tokens-per-sec", type=float, default=50)
+    server.add_argument("--tokens", type=int, default=60)
+    server.add_argument("--crew-pool-size", type=int)
+    parser.add_argument("--out", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    process = log_path = None
+    url = args.url
+    if url is None:
+        process, log_path = start_server(args)
+        url = f"http://127.0.0.1:{args.port}"
+        print(f"Booting offline backend (log: {log_path})..", file=sys.stderr)
+    try:
+        wait_ready(url, args.ready_timeout, process, log_path)
+        questions = QuestionSource(args.mode, args.repeat, seed=args.seed)
+        levels = []
+        print(f"{'conc':>5} {'reqs':>7} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'err %':>7} {'hits':>6} {'coal':>6}")
+        for concurrency in [int(c) for c in args.concurrency.split(",") if c.strip()]:
+            level = run_level(url, concurrency, args.duration, questions, args.timeout, args.priority)
+            levels.append(level)
+            print(f"{level['concurrency']:>5} {level['requests']:>7} {level['throughput_rps']:>8.2f} "
+                  f"{level['p50_ms'] or 0:>9.1f} {level['p95_ms'] or 0:>9.1f} {level['p99_ms'] or 0:>9.1f} "
+                  f"{level['error_rate'] * 100:>7.2f} {level['cache_hits']:>6} {level['coalesced']:>6}")
+        cache_stats = requests.get(f"{url}/cache/stats", timeout=5).json()
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    report = {
+        "benchmark": "loadtest",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "params": {key: value for key, value in vars(args).items() if key != "out"},
+        "levels": levels,
+        "cache_stats": cache_stats,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Boots app.py fully offline for load tests (started by benchmarks/loadtest.py, or by hand).
+
+- LLM: the deterministic stub (TRUENOTION_STUB_LLM=1, STUB_LLM_LATENCY_MS, STUB_LLM_TOKENS_PER_SEC, STUB_LLM_TOKENS)
+- Notion and Upstash: an in-memory fake serving --rows synthetic Notion pages (plus any local data/*.json,
+  which extract_pages uploads as usual)
+- Index: the GloVe template (src/template_glove.py) as drop-in data_loader, with synthetic word vectors
+  when the GloVe model is not available, so no LangChain or HuggingFace download is needed
+
+Everything else (warmup, caches, sessions, crew pool, /chat) is the real request path.
+
+    python benchmarks/loadtest_server.py --port 8765 --rows 2000
+"""
+
+import os
+import sys
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import synthetic_notion  # noqa: E402
+from pipeline import embeddings_model  # noqa: E402
+
+
+def prepare_offline(rows, seed=0, embeddings="auto"):
+    """Patches the network-facing modules before app.py is imported; returns the fake Upstash store."""
+    for name in ("NOTION_TOKEN", "DATABASE_ID", "UPSTASH_REDIS_REST_URL", "UPSTASH_REDIS_REST_TOKEN"):
+        os.environ.setdefault(name, "offline-loadtest")
+    os.environ.setdefault("TRUENOTION_STUB_LLM", "1")
+    os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+    os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+    # The index is built with the GloVe backend (local model or synthetic word vectors, registered below)
+    os.environ.setdefault("EMBEDDING_BACKEND", "glove")
+    from src import connect_notion, data_loader, template_glove, config_manager, embeddings as embedding_backends
+    from agents import load_default_agent
+
+    notion_response = {"object": "list", "results": [], "has_more": False}
+    for response in synthetic_notion.notion_responses(rows, seed=seed):
+        notion_response["results"].extend(response["results"])
+    upstash = synthetic_notion.FakeUpstash(notion_response)
+    for module in (connect_notion, data_loader, template_glove, config_manager, load_default_agent):
+        module.requests = upstash
+
+    _, model = embeddings_model(embeddings)
+    # The GloVe template has the same interface as data_loader
+    for name in ("list_upstash_keys", "get_upstash_json_by_key", "load_dataset_from_upstash", "chunk_documents",
+                 "upload_agent_config_to_upstash"):
+        setattr(data_loader, name, getattr(template_glove, name))
+    embedding_backends.register("glove", lambda: model)
+    return upstash
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rows", type=int, default=2000, help="synthetic Notion pages to index")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--embeddings", choices=["auto", "glove", "synthetic"], default="auto")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)
+    prepare_offline(args.rows, seed=args.seed, embeddings=args.embeddings)
+
+    import uvicorn
+    import app
+
+    uvicorn.run(app.app, host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""
+Offline benchmark of the ingestion and retrieval pipeline (GloVe template: src/template_glove.py).
+
+For each dataset size a fresh process generates synthetic Notion pages (benchmarks/synthetic_notion.py)
+and times every stage with all network calls stubbed (Notion responses are generated, Upstash is an
+in-memory fake, real sockets are blocked):
+
+    extract_notion_rows          parse Notion API responses into rows
+    load_dataset_from_upstash    JSON parsing of the stored datasets into Documents
+    chunk_documents              split into the columnar ChunkStore
+    enrich                       ingest-time analyzers (sentiment, language, keywords) as metadata columns
+    encode                       Word2VecEmbeddings.encode over every chunk
+    create_vectorstore           embedding + FAISS IndexFlatL2 build
+    retrieve                     VectorStore.retrieve latency (p50/p99 over --queries queries)
+
+plus the peak RSS of the process and the RSS after each stage. Uses the local GloVe model when it and
+gensim are available, otherwise random word vectors of the same dimension (--embeddings).
+
+    python benchmarks/pipeline.py --rows 1000,10000,100000 --out bench-before.json
+    python benchmarks/pipeline.py --rows 1000,10000,100000 --out bench-after.json --compare bench-before.json
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import platform
+import resource
+import subprocess
+import statistics
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import synthetic_notion  # noqa: E402  (sibling module, benchmarks/ is on sys.path when run as a script)
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def peak_rss_bytes():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _blocked_connect(*args, **kwargs):
+    raise RuntimeError("Network access is disabled in the offline benchmark")
+
+
+class Stages:
+    def __init__(self):
+        self.results = {}
+
+    def run(self, name, fn, *args, **kwargs):
+        start = time.perf_counter()
+        value = fn(*args, **kwargs)
+        self.record(name, time.perf_counter() - start)
+        return value
+
+    def record(self, name, seconds, **extra):
+        entry = self.results.setdefault(name, {"seconds": 0.0})
+        entry["seconds"] = round(entry["seconds"] + seconds, 6)
+        entry.update(extra)
+        try:
+            entry["rss_after_mb"] = round(rss_bytes() / 2**20, 1)
+        except OSError:
+            pass
+
+
+def embeddings_model(kind):
+    from src import template_glove
+
+    if kind in ("auto", "glove"):
+        try:
+            return "glove", template_glove.load_glove_embeddings()
+        except (ImportError, FileNotFoundError) as e:
+            if kind == "glove":
+                raise
+            print(f"GloVe model unavailable ({e}); using synthetic word vectors.", file=sys.stderr)
+    return "synthetic", template_glove.Word2VecEmbeddings(synthetic_notion.SyntheticKeyedVectors())
+
+
+def run_size(rows, args):
+    """Runs every stage for one dataset size in the current process and returns the results."""
+    # The loaders validate credentials at import time; dummy values are enough since nothing is sent
+    for name in ("NOTION_TOKEN", "DATABASE_ID", "UPSTASH_REDIS_REST_URL", "UPSTASH_REDIS_REST_TOKEN"):
+        os.environ.setdefault(name, "offline-benchmark")
+    from src import connect_notion, template_glove, enrichment
+
+    upstash = synthetic_notion.FakeUpstash()
+    stages = Stages()
+    with mock.patch.object(socket.socket, "connect", _blocked_connect), \
+            mock.patch.object(template_glove, "requests", upstash), \
+            mock.patch.object(connect_notion, "requests", upstash):
+        parsed = []
+        extract_seconds = 0.0
+        for response in synthetic_notion.notion_responses(rows, batch_size=args.batch_size, seed=args.seed):
+            start = time.perf_counter()
+            parsed.extend(connect_notion.extract_notion_rows(response))
+            extract_seconds += time.perf_counter() - start
+            del response
+        stages.record("extract_notion_rows", extract_seconds, rows_per_s=round(rows / extract_seconds) if extract_seconds else None)
+
+        # Stored the way connect_notion.save_to_upstash_redis stores it
+        upstash.set("notion_database", {"0": json.dumps(parsed)})
+        del parsed
+
+        documents, _ = stages.run("load_dataset_from_upstash", template_glove.load_dataset_from_upstash)
+        upstash.store.clear()
+        chunks = stages.run("chunk_documents", template_glove.chunk_documents, documents, chunk_size=args.chunk_size)
+        del documents
+        stages.run("enrich", enrichment.enrich, chunks)
+
+        embeddings_kind, model = embeddings_model(args.embeddings)
+        start = time.perf_counter()
+        for text in chunks.iter_texts():
+            model.encode(text)
+        encode_seconds = time.perf_counter() - start
+        stages.record("encode", encode_seconds, chunks_per_s=round(len(chunks) / encode_seconds) if encode_seconds else None)
+
+        vectorstore = stages.run("create_vectorstore", template_glove.create_vectorstore, chunks, model=model)
+
+        latencies = []
+        for query in synthetic_notion.sample_queries(args.queries, seed=args.seed + 1):
+            start = time.perf_counter()
+            vectorstore.retrieve(query, k=args.k)
+            latencies.append(time.perf_counter() - start)
+        stages.record(
+            "retrieve", sum(latencies),
+            queries=len(latencies),
+            p50_ms=round(percentile(latencies, 50) * 1000, 3),
+            p99_ms=round(percentile(latencies, 99) * 1000, 3),
+            mean_ms=round(statistics.mean(latencies) * 1000, 3),
+        )
+
+    return {
+        "rows": rows,
+        "chunks": len(chunks),
+        "embeddings": embeddings_kind,
+        "stages": stages.results,
+        "peak_rss_mb": round(peak_rss_bytes() / 2**20, 1),
+        "vectorstore_mb": round((vectorstore.index.ntotal * vectorstore.dim * 4 + chunks.nbytes) / 2**20, 1),
+    }
+
+
+def run_isolated(rows, args):
+    """Runs one size in a fresh interpreter so peak RSS is measured per size."""
+    command = [
+        sys.executable, os.path.abspath(__file__), "--single", str(rows),
+        "--chunk-size", str(args.chunk_size), "--k", str(args.k), "--queries", str(args.queries),
+        "--batch-size", str(args.batch_size), "--seed", str(args.seed), "--embeddings", args.embeddings,
+    ]
+    completed = subprocess.run(command, cwd=ROOT, stdout=subprocess.PIPE, text=True, check=True)
+    # The child prints its result as the last line of stdout
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_results(report, baseline=None):
+    previous = {run["rows"]: run for run in (baseline or {}).get("runs", [])}
+    for run in report["runs"]:
+        print(f"\nrows={run['rows']:,}  chunks={run['chunks']:,}  embeddings={run['embeddings']}  "
+              f"peak_rss={run['peak_rss_mb']} MB  vectorstore={run['vectorstore_mb']} MB")
+        before = previous.get(run["rows"], {}).get("stages", {})
+        for name, stage in run["stages"].items():
+            line = f"  {name:28s} {stage['seconds']:10.3f}s"
+            if "p50_ms" in stage:
+                line += f"   p50={stage['p50_ms']:.3f}ms p99={stage['p99_ms']:.3f}ms"
+            # Retrieval is compared on p50 since the number of queries may differ between runs
+            metric = "p50_ms" if "p50_ms" in stage else "seconds"
+            if before.get(name, {}).get(metric):
+                line += f"   ({(stage[metric] / before[name][metric] - 1) * 100:+.1f}% vs baseline)"
+            print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="1000,10000,100000", help="comma-separated dataset sizes (up to 1000000)")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=10000, help="pages per synthetic Notion response")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--embeddings", choices=["auto", "glove", "synthetic"], default="auto")
+    parser.add_argument("--out", help="write the JSON report to this file")
+    parser.add_argument("--compare", help="JSON report of an earlier run to compare against")
+    parser.add_argument("--in-process", action="store_true", help="run all sizes in this process (peak RSS is then cumulative)")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.single is not None:
+        print(json.dumps(run_size(args.single, args)))
+        return 0
+
+    os.chdir(ROOT)
+    sizes = [int(size) for size in args.rows.split(",") if size.strip()]
+    runs = []
+    for rows in sizes:
+        print(f"Benchmarking {rows:,} rows..", file=sys.stderr)
+        runs.append(run_size(rows, args) if args.in_process else run_isolated(rows, args))
+
+    report = {
+        "benchmark": "pipeline",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {key: value for key, value in vars(args).items() if key not in ("out", "compare", "single")},
+        "runs": runs,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(report, baseline)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
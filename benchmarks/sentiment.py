@@ -0,0 +1,155 @@
+"""
+Sentiment throughput: the batched engine (tools/sentiment_engine.py) vs. one TextBlob per text.
+
+Texts look like Notion notes (benchmarks/synthetic_notion.py vocabulary) mixed with opinion words,
+modifiers, negations, emoticons and exclamation marks, so every rule of the lexicon is exercised. Measured:
+
+    textblob        TextBlob(text).sentiment.polarity per text (the previous SentimentAnalysisTool path)
+    engine_single   one uncached engine call per text (SentimentAnalysisTool._run on new texts)
+    engine_batch    uncached batches of --batch-size texts (e.g. every retrieved chunk at once)
+    engine_cached   the same texts again, answered from the LRU cache
+
+plus the lexicon compile time and how often the engine's label (positive / negative / neutral)
+agrees with TextBlob's, on the generated texts and on short chat-style texts with emoticons
+(CHAT_TEXTS, each disagreement is listed).
+
+    python benchmarks/sentiment.py --texts 5000 --batch-size 256 --out sentiment.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import synthetic_notion  # noqa: E402
+from pipeline import git_commit  # noqa: E402
+
+OPINION_WORDS = (
+    "good great excellent amazing happy pleased smooth clear helpful successful impressive solid "
+    "bad poor terrible awful unhappy disappointing slow confusing broken risky late expensive difficult"
+).split()
+MODIFIERS = ("very", "really", "extremely", "slightly", "quite", "absolutely")
+NEGATIONS = ("not", "no", "never")
+EMOTICONS = (":)", ":-)", ":(", ":-(", ":D", ";)", ":P", ":/", ":'(", "<3")
+CHAT_TEXTS = (
+    ":(", ":)", "I am not happy :)", "not bad :(", "good :(", "bad :-)", "<3", "great ;)", "this is fine:)",
+    ":-D wow", "sad :( !", "hmm :/ not sure", "ok :P", "I can't :'(", "thanks!! :)", "see http://example.com/a",
+    "meeting at 10:30", "deadline moved again :-(", "love it <3", "not sure ;)",
+)
+
+
+def make_texts(count, min_words, max_words, seed):
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        words = []
+        for _ in range(rng.randint(min_words, max_words)):
+            roll = rng.random()
+            if roll < 0.08:
+                words.append(rng.choice(OPINION_WORDS))
+            elif roll < 0.11:
+                words.extend([rng.choice(MODIFIERS), rng.choice(OPINION_WORDS)])
+            elif roll < 0.13:
+                words.extend([rng.choice(NEGATIONS), rng.choice(OPINION_WORDS)])
+            elif roll < 0.14:
+                words.append(rng.choice(EMOTICONS))
+            else:
+                words.append(rng.choice(synthetic_notion.VOCABULARY))
+        texts.append(" ".join(words) + (" !" if rng.random() < 0.1 else "."))
+    return texts
+
+
+def throughput(name, fn, texts):
+    start = time.perf_counter()
+    result = fn(texts)
+    seconds = time.perf_counter() - start
+    return {"path": name, "texts": len(texts), "seconds": round(seconds, 4),
+            "texts_per_sec": round(len(texts) / seconds, 1)}, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=5000)
+    parser.add_argument("--min-words", type=int, default=20)
+    parser.add_argument("--max-words", type=int, default=120)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    from textblob import TextBlob
+    from tools.sentiment_engine import SentimentEngine, SentimentLexicon, label
+
+    texts = make_texts(args.texts, args.min_words, args.max_words, args.seed)
+
+    start = time.perf_counter()
+    lexicon = SentimentLexicon.from_textblob()
+    compile_s = time.perf_counter() - start
+
+    def run_textblob(batch):
+        return [TextBlob(text).sentiment.polarity for text in batch]
+
+    def run_single(batch):
+        engine = SentimentEngine(lexicon, cache_size=0)
+        return [engine.polarity(text) for text in batch]
+
+    engine = SentimentEngine(lexicon, cache_size=len(texts))
+
+    def run_batches(batch):
+        scores = []
+        for i in range(0, len(batch), args.batch_size):
+            scores.extend(engine.polarities(batch[i:i + args.batch_size]))
+        return scores
+
+    textblob_result, textblob_scores = throughput("textblob", run_textblob, texts)
+    single_result, _ = throughput("engine_single", run_single, texts)
+    batch_result, engine_scores = throughput("engine_batch", run_batches, texts)
+    cached_result, _ = throughput("engine_cached", run_batches, texts)
+    results = [textblob_result, single_result, batch_result, cached_result]
+    for result in results:
+        result["speedup"] = round(result["texts_per_sec"] / textblob_result["texts_per_sec"], 1)
+
+    agreement = sum(label(a) == label(b) for a, b in zip(textblob_scores, engine_scores)) / len(texts)
+    chat_textblob = run_textblob(CHAT_TEXTS)
+    chat_engine = SentimentEngine(lexicon, cache_size=0).polarities(list(CHAT_TEXTS))
+    chat_mismatches = [
+        {"text": text, "textblob": label(a), "engine": label(b)}
+        for text, a, b in zip(CHAT_TEXTS, chat_textblob, chat_engine) if label(a) != label(b)
+    ]
+    chat_agreement = 1 - len(chat_mismatches) / len(CHAT_TEXTS)
+    print(f"{'path':>14} {'texts/s':>12} {'speedup':>8}")
+    for result in results:
+        print(f"{result['path']:>14} {result['texts_per_sec']:>12.1f} {result['speedup']:>7.1f}x")
+    print(f"\nLexicon compiled in {compile_s * 1000:.0f} ms ({len(lexicon)} words); "
+          f"labels agree with TextBlob on {agreement:.1%} of the texts "
+          f"and on {chat_agreement:.0%} of the {len(CHAT_TEXTS)} chat-style texts with emoticons.")
+    for mismatch in chat_mismatches:
+        print(f"  {mismatch['text']!r}: textblob={mismatch['textblob']} engine={mismatch['engine']}")
+
+    report = {
+        "benchmark": "sentiment",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "params": {key: value for key, value in vars(args).items() if key != "out"},
+        "lexicon_compile_ms": round(compile_s * 1000, 1),
+        "label_agreement": round(agreement, 4),
+        "chat_label_agreement": round(chat_agreement, 4),
+        "chat_mismatches": chat_mismatches,
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
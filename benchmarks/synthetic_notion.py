@@ -0,0 +1,138 @@
+"""
+Synthetic Notion-shaped data for the offline benchmarks.
+
+Pages look like the results of the Notion "query a database" API and use every property type that
+connect_notion.extract_notion_rows handles (title, rich_text, number, url, date, select, multi_select,
+checkbox, email, phone_number, people, files). Text is drawn from a fixed English vocabulary so the
+GloVe (or synthetic) embeddings find most tokens, like they would for real notes.
+
+Also provides offline stand-ins for the two external dependencies of the ingestion pipeline:
+an in-memory Upstash REST API and a random word-vector model.
+"""
+
+import json
+import random
+
+import numpy as np
+
+VOCABULARY = (
+    "the project meeting notes customer revenue sales quarter report plan budget team product market "
+    "launch review design feature release deadline strategy growth goal metric user feedback price cost "
+    "contract partner invoice payment order delivery support issue bug fix test deploy server data model "
+    "analysis research idea summary decision action owner status risk priority week month year today "
+    "tomorrow monday friday january march june september december office remote travel hiring interview "
+    "candidate salary training workshop conference presentation slide document draft final approved "
+    "pending blocked done open closed high low medium urgent small large new old first last next previous "
+    "north south europe asia america germany india london berlin paris tokyo city country region global "
+    "local online offline email phone call chat message update change improve reduce increase discuss "
+    "agree share send receive create build write read learn teach help need want plan schedule finish"
+).split()
+
+STATUSES = ["Not started", "In progress", "Blocked", "Done"]
+TAGS = ["sales", "finance", "engineering", "marketing", "hr", "legal", "ops", "research"]
+PEOPLE = ["Alex Kim", "Sam Lee", "Jordan Patel", "Taylor Chen", "Morgan Diaz", "Riley Novak"]
+
+
+def _words(rng, low, high):
+    return " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(low, high)))
+
+
+def _text(plain):
+    return [{"type": "text", "text": {"content": plain}, "plain_text": plain}]
+
+
+def generate_page(rng, index):
+    """One Notion page object with one property of every supported type."""
+    day = 1 + index % 28
+    return {
+        "object": "page",
+        "id": f"{index:08x}-0000-4000-8000-{rng.getrandbits(48):012x}",
+        "properties": {
+            "Name": {"id": "title", "type": "title", "title": _text(_words(rng, 2, 8))},
+            "Notes": {"id": "n", "type": "rich_text", "rich_text": _text(_words(rng, 20, 120))},
+            "Amount": {"id": "a", "type": "number", "number": round(rng.uniform(0, 100000), 2)},
+            "Link": {"id": "l", "type": "url", "url": f"https://example.com/{rng.choice(VOCABULARY)}/{index}"},
+            "Due": {"id": "d", "type": "date", "date": {"start": f"2025-{1 + index % 12:02d}-{day:02d}", "end": None}},
+            "Status": {"id": "s", "type": "select", "select": {"name": rng.choice(STATUSES)}},
+            "Tags": {"id": "t", "type": "multi_select", "multi_select": [{"name": tag} for tag in rng.sample(TAGS, rng.randint(0, 3))]},
+            "Done": {"id": "c", "type": "checkbox", "checkbox": rng.random() < 0.5},
+            "Email": {"id": "e", "type": "email", "email": f"user{index}@example.com"},
+            "Phone": {"id": "p", "type": "phone_number", "phone_number": f"+49 30 {index:07d}"},
+            "Owner": {"id": "o", "type": "people", "people": [{"object": "user", "name": rng.choice(PEOPLE)}]},
+            "Attachments": {"id": "f", "type": "files", "files": [{"name": f"{rng.choice(VOCABULARY)}.pdf"}]},
+        },
+    }
+
+
+def notion_responses(rows, batch_size=10000, seed=0):
+    """Yields Notion query responses ({"results": [...]}) with `rows` pages in total, `batch_size` per response."""
+    rng = random.Random(seed)
+    for start in range(0, rows, batch_size):
+        pages = [generate_page(rng, index) for index in range(start, min(rows, start + batch_size))]
+        yield {"object": "list", "results": pages, "has_more": start + batch_size < rows}
+
+
+def sample_queries(count, seed=1):
+    rng = random.Random(seed)
+    return [_words(rng, 3, 10) for _ in range(count)]
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.status_code = status_code
+        self._payload = payload
+        self.text = json.dumps(payload)
+
+    def json(self):
+        return self._payload
+
+
+class FakeUpstash:
+    """
+    In-memory stand-in for the Upstash REST API with the call shapes used by the data loaders:
+    POST ["KEYS", "*"], POST ["SET", key, value], POST ["GET"/"MGET", key, ...], POST /set/{key} with a
+    JSON body, GET /get/{key}.
+    Notion database queries (POST api.notion.com/...) are answered with `notion_response`.
+    Patch it over a module's `requests` attribute.
+    """
+
+    def __init__(self, notion_response=None):
+        self.store = {}
+        self.notion_response = notion_response or {"object": "list", "results": [], "has_more": False}
+
+    def set(self, key, value):
+        self.store[key] = value if isinstance(value, str) else json.dumps(value)
+
+    def post(self, url, headers=None, json=None, **kwargs):
+        if "api.notion.com" in url:
+            return FakeResponse(self.notion_response)
+        if "/set/" in url:
+            self.set(url.rsplit("/set/", 1)[1], json)
+            return FakeResponse({"result": "OK"})
+        command = json[0].upper()
+        if command == "KEYS":
+            return FakeResponse({"result": list(self.store)})
+        if command == "SET":
+            self.set(json[1], json[2])
+            return FakeResponse({"result": "OK"})
+        if command == "GET":
+            return FakeResponse({"result": self.store.get(json[1])})
+        if command == "MGET":
+            return FakeResponse({"result": [self.store.get(key) for key in json[1:]]})
+        return FakeResponse({"error": f"unsupported command {command}"}, status_code=400)
+
+    def get(self, url, headers=None, **kwargs):
+        return FakeResponse({"result": self.store.get(url.rsplit("/get/", 1)[1])})
+
+
+class SyntheticKeyedVectors:
+    """Random word vectors with the small gensim KeyedVectors surface used by Word2VecEmbeddings."""
+
+    def __init__(self, words=VOCABULARY, vector_size=50, seed=0):
+        generator = np.random.default_rng(seed)
+        self.vector_size = vector_size
+        self.key_to_index = {word: i for i, word in enumerate(dict.fromkeys(words))}
+        self.vectors = generator.standard_normal((len(self.key_to_index), vector_size)).astype("float32")
+
+    def get_vector(self, key):
+        return self.vectors[self.key_to_index[key]]
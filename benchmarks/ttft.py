@@ -0,0 +1,113 @@
+"""
+Time-to-first-token (TTFT) measurement for /chat/stream vs. total latency of /chat.
+
+Run the backend against the local stub LLM, then point this script at it:
+
+    TRUENOTION_STUB_LLM=1 STUB_LLM_LATENCY_MS=300 STUB_LLM_TOKENS_PER_SEC=50 uvicorn app:app
+    python benchmarks/ttft.py --url http://127.0.0.1:8000 --runs 20 --question "/stdllm hello"
+
+Reports p50/p95 of: first SSE event (sources), first token, full stream, and blocking /chat.
+
+Requests are sent with Cache-Control: no-cache, so every run goes through the LLM path instead of
+the answer and semantic caches (--cached measures cache hits instead). Each sample records whether
+it was served from a cache (X-Cache / X-Semantic-Cache of /chat, "cached" of the stream's done event).
+"""
+
+import sys
+import json
+import time
+import argparse
+import statistics
+
+import requests
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def cache_headers(cached):
+    return {} if cached else {"Cache-Control": "no-cache"}
+
+
+def measure_stream(url, question, cached=False):
+    start = time.perf_counter()
+    first_event = first_token = None
+    hit = False
+    with requests.post(
+        f"{url}/chat/stream", json={"question": question, "history": []}, headers=cache_headers(cached), stream=True
+    ) as response:
+        response.raise_for_status()
+        event = None
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                now = time.perf_counter() - start
+                if first_event is None:
+                    first_event = now
+                if event == "token" and first_token is None:
+                    first_token = now
+                if event == "error":
+                    raise RuntimeError(json.loads(line[len("data: "):]).get("detail"))
+                if event == "done":
+                    hit = bool(json.loads(line[len("data: "):]).get("cached"))
+    return first_event, first_token, time.perf_counter() - start, hit
+
+
+def measure_blocking(url, question, cached=False):
+    start = time.perf_counter()
+    response = requests.post(f"{url}/chat", json={"question": question, "history": []}, headers=cache_headers(cached))
+    response.raise_for_status()
+    hit = response.headers.get("X-Cache") == "HIT" or response.headers.get("X-Semantic-Cache") == "HIT"
+    return time.perf_counter() - start, hit
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--question", default="What is in my notes?")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--cached", action="store_true", help="allow cache hits (no Cache-Control: no-cache)")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args(argv)
+
+    samples = {"first_event": [], "first_token": [], "stream_total": [], "chat_total": []}
+    hits = {"stream": [], "chat": []}
+    for _ in range(args.runs):
+        first_event, first_token, total, stream_hit = measure_stream(args.url, args.question, args.cached)
+        samples["first_event"].append(first_event)
+        if first_token is not None:
+            samples["first_token"].append(first_token)
+        samples["stream_total"].append(total)
+        hits["stream"].append(stream_hit)
+        chat_total, chat_hit = measure_blocking(args.url, args.question, args.cached)
+        samples["chat_total"].append(chat_total)
+        hits["chat"].append(chat_hit)
+
+    results = {
+        name: {
+            "p50_ms": None if not values else round(statistics.median(values) * 1000, 1),
+            "p95_ms": None if not values else round(percentile(values, 95) * 1000, 1),
+            "n": len(values),
+            "cache_hits": sum(hits["chat" if name == "chat_total" else "stream"]),
+        }
+        for name, values in samples.items()
+    }
+    results["samples"] = {endpoint: ["HIT" if hit else "MISS" for hit in values] for endpoint, values in hits.items()}
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        for name, stats in results.items():
+            if name == "samples":
+                continue
+            print(f"{name:>13}: p50={stats['p50_ms']} ms  p95={stats['p95_ms']} ms  (n={stats['n']}, cache hits={stats['cache_hits']})")
+
+
+if __name__ == "__main__":
+    main()
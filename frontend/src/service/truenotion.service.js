@@ -2,6 +2,11 @@ import { DOMAIN } from "./backend_domain";
 
 const BACKEND_URL = DOMAIN+'/chat'; 
 
+// Conversation mode is resolved per request on the backend; echo back the last one to keep it sticky
+let currentMode = null;
+// Conversation history is kept server-side: only the session id and the new question are sent
+let sessionId = null;
+
 const sendToTrueNotion = async ({ message, history }) => {
   try {
     const response = await fetch(BACKEND_URL, {
@@ -11,11 +16,29 @@ const sendToTrueNotion = async ({ message, history }) => {
       },
       body: JSON.stringify({
         question: message,
-        history: history.map(m => [m.parts[0].text, ""])  // optionally adapt if needed
+        session_id: sessionId,
+        mode: currentMode
       })
     });
 
+    if (response.status === 429 || response.status === 503) {
+      const retryAfter = response.headers.get('Retry-After') || 'a few';
+      const error = await response.json().catch(() => ({}));
+      if (response.status === 503 && error.detail && error.detail.status) {
+        // Backend is still warming up (index / agents loading)
+        return `TrueNotion AI is still starting up.. Please try again in ${retryAfter} seconds.`;
+      }
+      // Not admitted: too many requests are waiting for the language model
+      return `TrueNotion AI is busy right now.. Please try again in ${retryAfter} seconds.`;
+    }
+
     const data = await response.json();
+    if (!response.ok) {
+      console.error("TrueNotion backend returned an error:", response.status, data.detail);
+      return "Sorry, something went wrong on the backend.. Please try again after sometime :(";
+    }
+    if (data.mode) currentMode = data.mode;
+    if (data.session_id) sessionId = data.session_id;
     return data.answer;
   } catch (error) {
     console.error("Error communicating with TrueNotion backend:", error);
@@ -26,15 +26,17 @@ Standalone python file
 
 """
 
-from util import suppress
+from util import suppress, startup_profile
+if startup_profile.requested():
+    # --profile-startup: record import times and init stages, print a breakdown and exit
+    startup_profile.enable()
 suppress.all()
 suppress.langchain_warnings()
 import os
 import json
 from datetime import datetime
-from crewai import Crew
 from agents import load_default_agent
-from src import process, data_loader
+from src import process, data_loader, chat_modes, enrichment, embeddings
 from src.banner import print_banner
 
 print("Initializing..")
@@ -71,6 +73,7 @@ def load_rag_config():
 
 def initialize_agent():
     """Initializes and returns a Crew instance with the default data analysis agent."""
+    from crewai import Crew
     load_default_agent.ConfigLoader()  # Loads any necessary config
     llm_setup = load_default_agent.LLMSetup()
     agent_factory = load_default_agent.DataAnalysisAgentFactory(llm_setup.llm)
@@ -90,7 +93,9 @@ def initialize_system(rag_parameters):
     chunk_size = rag_parameters.get("chunk_size")
     memory = rag_parameters.get("memory")
     # This call is assumed to initialize and return the document retriever used to fetch context.
-    retriever, loaded_files_reference = process.initialize_system(adjusted_k=k, adjusted_chunk_size=chunk_size)
+    retriever, loaded_files_reference = process.initialize_system(
+        adjusted_k=k, adjusted_chunk_size=chunk_size, embedding_backend=embeddings.backend_name(rag_parameters)
+    )
     # Extend the log for reference (printed here for debugging purposes)
     loaded_files_reference.extend([
         "RAG Parameters:",
@@ -102,6 +107,7 @@ def initialize_system(rag_parameters):
 def chat_loop():
     """Runs an interactive chat loop with the user."""
     global chat_history, crew_instance, retriever, memory, disable_agent, history_str, history_mode
+    current_mode = None
     print("Welcome to TrueNotion AI chat!")
     print("\nType your question below. Type 'exit' to quit.\n")
 
@@ -116,25 +122,17 @@ def chat_loop():
             print("Exiting chat. Thanks for using.. Goodbye!")
             break 
         
-        # Handle conversation modes
-        if "/stdllm" in user_input: 
-            disable_agent= True
-            history_mode= True
-        elif "/stdllm-nh" in user_input:
-            disable_agent= True
-            history_mode= False
-        elif "/truN" in user_input:
-            disable_agent= False
-            history_mode= True
-        elif "/truN-nh" in user_input:
-            disable_agent= False
-            history_mode= False
+        # Handle conversation modes (the selected mode sticks until another marker is typed)
+        mode, user_input = chat_modes.parse_chat_mode(user_input, current_mode)
+        current_mode = mode.name
+        disable_agent = mode.disable_agent
+        history_mode = mode.history_mode
 
         if not disable_agent:
             # Get the relevant documents (context) for the query
             try:
                 retrieved_docs = retriever.get_relevant_documents(user_input)
-                context = "\n\n".join([doc.page_content for doc in retrieved_docs])
+                context = enrichment.format_context(retrieved_docs)
             except Exception as e:
                 print("Error retrieving document context:", e)
                 context = ""
@@ -157,16 +155,20 @@ def chat_loop():
                 "timestamp": now_str,
             }
             
-            # Kick off the agent to get an answer
+            # Kick off the agent to get an answer (tool-free configs: one direct LLM call, see fast_path_eligible)
             try:
-                result = crew_instance.kickoff(inputs=inputs)
-                reply = result.tasks_output[0]
+                if load_default_agent.fast_path_eligible():
+                    reply = load_default_agent.DirectAgentResponse(inputs)
+                else:
+                    if crew_instance is None:
+                        crew_instance = initialize_agent()
+                    result = crew_instance.kickoff(inputs=inputs)
+                    reply = result.tasks_output[0]
                 safe_reply = str(reply) if reply is not None else "Sorry, something went wrong. Please try again."
             except Exception as e:
                 safe_reply = f"Encountered an error: {e}"
         
         else:
-            user_input= user_input.replace("/stdllm", "")
             query = f"I'm User. My query is: {user_input}, My Conversation History is: {history_str}"
             try:
                 if history_mode:
@@ -183,14 +185,24 @@ def chat_loop():
         
 def main():
     # Load the configuration parameters
-    rag_parameters = load_rag_config()
+    with startup_profile.stage("load_rag_config"):
+        rag_parameters = load_rag_config()
     
     # Initialize the retriever and log file reference using configuration parameters
-    initialize_system(rag_parameters)
+    with startup_profile.stage("initialize_system"):
+        initialize_system(rag_parameters)
     
-    # Initialize the Crew instance (the agent)
+    # Load the agent config (Upstash or default); the Crew (CrewAI) is only built when the fast path cannot answer
     global crew_instance
-    crew_instance = initialize_agent()
+    with startup_profile.stage("agent_config"):
+        load_default_agent.init()
+    if not load_default_agent.fast_path_eligible():
+        with startup_profile.stage("initialize_agent"):
+            crew_instance = initialize_agent()
+
+    if startup_profile.enabled():
+        startup_profile.print_report()
+        return
     
     # Start the interactive chat loop
     chat_loop()
@@ -0,0 +1,215 @@
+"""
+Admission control for LLM-bound work (crew kickoffs and standard LLM calls).
+
+At most `max_concurrency` LLM calls run at once; further requests wait in a bounded priority queue
+instead of all hitting Mistral together and triggering provider 429s. Waiting is bounded too:
+
+- queue full: rejected immediately with 429 + Retry-After (a waiting request of a lower priority
+  class is shed with 503 to make room for a higher priority one)
+- waited longer than the class deadline: rejected with 503 + Retry-After
+
+Priority classes are "interactive" (default) and "batch"; batch requests may only fill half of the
+queue so they never crowd out interactive users. Retry-After is estimated from the recent LLM call
+duration and the number of requests ahead.
+
+Configuration: ADMISSION_MAX_CONCURRENCY (default: the crew pool size), ADMISSION_MAX_QUEUE,
+ADMISSION_INTERACTIVE_TIMEOUT_S, ADMISSION_BATCH_TIMEOUT_S.
+"""
+
+import os
+import math
+import time
+import heapq
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+
+from util import metrics
+
+DEFAULT_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+INTERACTIVE_TIMEOUT_S = float(os.getenv("ADMISSION_INTERACTIVE_TIMEOUT_S", "20"))
+BATCH_TIMEOUT_S = float(os.getenv("ADMISSION_BATCH_TIMEOUT_S", "120"))
+
+# Lower value = served first
+PRIORITIES = {"interactive": 0, "batch": 1}
+DEFAULT_PRIORITY = "interactive"
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is not admitted; app.py turns it into a 429/503 with Retry-After."""
+
+    def __init__(self, status_code, reason, retry_after_s):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+
+
+class _Waiter:
+    __slots__ = ("priority", "future", "enqueued_at")
+
+    def __init__(self, priority, future):
+        self.priority = priority
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+class Ticket:
+    """One admitted LLM slot; release() is idempotent so error paths may call it again."""
+
+    __slots__ = ("_controller", "_started", "released")
+
+    def __init__(self, controller):
+        self._controller = controller
+        self._started = time.perf_counter()
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self._controller._release(time.perf_counter() - self._started)
+
+
+class AdmissionController:
+    def __init__(self, max_concurrency, max_queue=DEFAULT_MAX_QUEUE,
+                 timeouts_s=None, default_service_s=5.0):
+        if max_concurrency < 1:
+            raise ValueError("AdmissionController max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeouts_s = timeouts_s or {"interactive": INTERACTIVE_TIMEOUT_S, "batch": BATCH_TIMEOUT_S}
+        self.active = 0
+        self._heap = []  # (priority value, sequence, waiter); cancelled waiters are skipped lazily
+        self._queued = {name: 0 for name in PRIORITIES}
+        self._sequence = itertools.count()
+        # Exponentially weighted mean duration of admitted calls, for Retry-After estimates
+        self._service_s = default_service_s
+        self.admitted = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls, default_concurrency):
+        return cls(int(os.getenv("ADMISSION_MAX_CONCURRENCY", str(default_concurrency))))
+
+    @staticmethod
+    def parse_priority(value):
+        """Validates a priority class name (None -> the default class); raises ValueError otherwise."""
+        name = (value or DEFAULT_PRIORITY).strip().lower()
+        if name not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{value}', expected one of: {', '.join(PRIORITIES)}")
+        return name
+
+    @property
+    def queue_depth(self):
+        return sum(self._queued.values())
+
+    def _queue_limit(self, priority):
+        return self.max_queue if PRIORITIES[priority] == 0 else self.max_queue // 2
+
+    def retry_after_s(self, ahead=None):
+        """Rough time until a new request would be admitted: waves of `max_concurrency` calls ahead of it."""
+        ahead = self.queue_depth if ahead is None else ahead
+        waves = (ahead + 1) / self.max_concurrency
+        return max(1, math.ceil(waves * self._service_s))
+
+    def _reject(self, priority, result, status_code, reason):
+        self.rejected += 1
+        metrics.ADMISSION_DECISIONS.labels(priority=priority, result=result).inc()
+        return AdmissionRejected(status_code, reason, self.retry_after_s())
+
+    def _shed_for(self, priority):
+        """Drops the newest waiter of the lowest class below `priority`; True when one was shed."""
+        candidates = [
+            (value, sequence, waiter) for value, sequence, waiter in self._heap
+            if not waiter.future.done() and value > PRIORITIES[priority]
+        ]
+        if not candidates:
+            return False
+        entry = max(candidates)
+        waiter = entry[2]
+        self._dequeue(waiter)
+        waiter.future.set_exception(
+            self._reject(waiter.priority, "shed", 503, "Request was shed in favour of higher priority traffic.")
+        )
+        return True
+
+    def _dequeue(self, waiter):
+        self._queued[waiter.priority] -= 1
+        metrics.ADMISSION_QUEUE_WAIT_SECONDS.labels(priority=waiter.priority).observe(time.perf_counter() - waiter.enqueued_at)
+
+    async def acquire(self, priority=DEFAULT_PRIORITY):
+        """Waits for a slot and returns a Ticket; raises AdmissionRejected when the queue is full or the wait times out."""
+        if self.active < self.max_concurrency and self.queue_depth == 0:
+            return self._admit(priority, waited=False)
+
+        if self._queued[priority] >= self._queue_limit(priority) or self.queue_depth >= self.max_queue:
+            if not (self.queue_depth >= self.max_queue and self._shed_for(priority)):
+                raise self._reject(priority, "queue_full", 429, "Too many requests are waiting for the language model.")
+
+        waiter = _Waiter(priority, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._heap, (PRIORITIES[priority], next(self._sequence), waiter))
+        self._queued[priority] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self.timeouts_s[priority])
+        except asyncio.TimeoutError:
+            if waiter.future.done() and not waiter.future.cancelled() and waiter.future.exception() is None:
+                # The slot was handed over just as the deadline passed: use it
+                return self._admitted_ticket(priority)
+            if not waiter.future.done():
+                waiter.future.cancel()
+                self._dequeue(waiter)
+                raise self._reject(priority, "timeout", 503, "Timed out waiting for the language model.")
+            raise waiter.future.exception()
+        except asyncio.CancelledError:
+            # The client went away; give a slot we were already handed to the next waiter
+            if waiter.future.done() and not waiter.future.cancelled() and waiter.future.exception() is None:
+                self._release(None)
+            elif not waiter.future.done():
+                waiter.future.cancel()
+                self._dequeue(waiter)
+            raise
+        return self._admitted_ticket(priority)
+
+    def _admit(self, priority, waited):
+        self.active += 1
+        if not waited:
+            metrics.ADMISSION_QUEUE_WAIT_SECONDS.labels(priority=priority).observe(0.0)
+        return self._admitted_ticket(priority)
+
+    def _admitted_ticket(self, priority):
+        self.admitted += 1
+        metrics.ADMISSION_DECISIONS.labels(priority=priority, result="admitted").inc()
+        return Ticket(self)
+
+    def _release(self, duration_s):
+        if duration_s is not None:
+            self._service_s = 0.8 * self._service_s + 0.2 * duration_s
+        # Hand the slot straight to the highest priority waiter, so `active` never dips below the limit
+        while self._heap:
+            _, _, waiter = heapq.heappop(self._heap)
+            if waiter.future.done():
+                continue
+            self._dequeue(waiter)
+            waiter.future.set_result(True)
+            return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def admit(self, priority=DEFAULT_PRIORITY):
+        """Holds one LLM slot for the enclosed block."""
+        ticket = await self.acquire(priority)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def stats(self):
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self.active,
+            "max_queue": self.max_queue,
+            "queued": dict(self._queued),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "mean_service_s": round(self._service_s, 3),
+        }
@@ -0,0 +1,183 @@
+"""
+Exact-match answer cache for /chat (both the /stdllm and the /truN modes).
+
+Keys are derived from the normalized (mode, question, history window, index fingerprint, agent config
+version). Lookups go to an in-process LRU first and then to an optional shared Upstash Redis tier
+(enable with ANSWER_CACHE_SHARED=1) so several backend instances can share answers.
+
+Because the index and agent config versions are part of the key, entries produced with old inputs
+can never be served; the local LRU is additionally cleared when they change, and shared entries
+expire through their TTL.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+import requests
+
+from util import metrics
+
+KEY_PREFIX = "truenotion:answer:"
+DEFAULT_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2048"))
+DEFAULT_TTL_S = int(os.getenv("ANSWER_CACHE_TTL_S", "3600"))
+SHARED_TIMEOUT_S = float(os.getenv("ANSWER_CACHE_SHARED_TIMEOUT_S", "0.5"))
+
+
+def normalize_question(question):
+    return " ".join(question.split()).casefold()
+
+
+def make_key(mode, question, history_window, index_version, agent_config_version):
+    payload = json.dumps(
+        [
+            mode,
+            normalize_question(question),
+            [[normalize_question(str(q)), str(a)] for q, a in history_window],
+            index_version,
+            agent_config_version,
+        ],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def config_version(config):
+    """Stable hash of a JSON-serializable config (e.g. the agent/task config)."""
+    return hashlib.sha256(json.dumps(config, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+
+class LocalLRU:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_s=DEFAULT_TTL_S):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            answer, expires_at = entry
+            if time.time() > expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return answer
+
+    def set(self, key, answer):
+        with self._lock:
+            self._entries[key] = (answer, time.time() + self.ttl_s)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class UpstashTier:
+    """Shared cache tier on Upstash Redis (REST API). Failures are logged and treated as misses."""
+
+    def __init__(self, url, token, ttl_s=DEFAULT_TTL_S, timeout_s=SHARED_TIMEOUT_S):
+        self.url = url
+        self.ttl_s = ttl_s
+        self.timeout_s = timeout_s
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.errors = 0
+
+    def get(self, key):
+        try:
+            with metrics.EXTERNAL_CALL_SECONDS.labels(service="upstash", operation="answer_cache_get").time():
+                response = requests.post(self.url, headers=self.headers, json=["GET", KEY_PREFIX + key], timeout=self.timeout_s)
+            if response.status_code != 200:
+                raise Exception(response.text)
+            raw_value = response.json().get("result")
+            return json.loads(raw_value)["answer"] if raw_value else None
+        except Exception as e:
+            self.errors += 1
+            print(f"Answer cache: shared tier GET failed: {e}")
+            return None
+
+    def set(self, key, answer):
+        try:
+            value = json.dumps({"answer": answer}, ensure_ascii=False)
+            with metrics.EXTERNAL_CALL_SECONDS.labels(service="upstash", operation="answer_cache_set").time():
+                response = requests.post(
+                    self.url, headers=self.headers, json=["SET", KEY_PREFIX + key, value, "EX", self.ttl_s], timeout=self.timeout_s
+                )
+            if response.status_code != 200:
+                raise Exception(response.text)
+        except Exception as e:
+            self.errors += 1
+            print(f"Answer cache: shared tier SET failed: {e}")
+
+
+class AnswerCache:
+    def __init__(self, local=None, shared=None):
+        self.local = local if local is not None else LocalLRU()
+        self.shared = shared
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        shared = None
+        if os.getenv("ANSWER_CACHE_SHARED", "").lower() in ("1", "true", "yes"):
+            url = os.getenv("UPSTASH_REDIS_REST_URL")
+            token = os.getenv("UPSTASH_REDIS_REST_TOKEN")
+            if url and token:
+                shared = UpstashTier(url, token)
+            else:
+                print("Answer cache: ANSWER_CACHE_SHARED is set but Upstash credentials are missing; using local tier only.")
+        return cls(shared=shared)
+
+    def get(self, key):
+        """Returns (answer, tier) where tier is 'local', 'shared' or None on a miss. May block on the shared tier."""
+        answer = self.local.get(key)
+        if answer is not None:
+            self.local_hits += 1
+            return answer, "local"
+        if self.shared is not None:
+            answer = self.shared.get(key)
+            if answer is not None:
+                self.local.set(key, answer)
+                self.shared_hits += 1
+                return answer, "shared"
+        self.misses += 1
+        return None, None
+
+    def set(self, key, answer):
+        self.local.set(key, answer)
+        if self.shared is not None:
+            self.shared.set(key, answer)
+
+    def evict_local(self):
+        self.local.clear()
+
+    def stats(self):
+        lookups = self.local_hits + self.shared_hits + self.misses
+        return {
+            "entries": len(self.local),
+            "max_entries": self.local.max_entries,
+            "ttl_s": self.local.ttl_s,
+            "shared_tier": self.shared is not None,
+            "local_hits": self.local_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.local_hits + self.shared_hits) / lookups, 4) if lookups else 0.0,
+            "evictions": self.local.evictions,
+            "shared_errors": self.shared.errors if self.shared is not None else 0,
+        }
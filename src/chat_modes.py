@@ -0,0 +1,56 @@
+"""
+Conversation mode handling shared by the FastAPI backend (app.py) and the standalone CLI (main.py).
+
+Modes are selected with markers typed in the question:
+- '/stdllm'    : Standard LLM mode
+- '/stdllm-nh' : Standard LLM mode (no memory)
+- '/truN'      : True Notion mode (agent + retrieved context)
+- '/truN-nh'   : True Notion mode (no memory)
+
+Mode state is resolved per request and never stored in module globals, so concurrent users cannot
+overwrite each other's mode.
+"""
+
+# Longer markers first, so '/stdllm-nh' is not mistaken for '/stdllm'
+MODE_MARKERS = [
+    ("/stdllm-nh", "stdllm-nh"),
+    ("/stdllm", "stdllm"),
+    ("/truN-nh", "truN-nh"),
+    ("/truN", "truN"),
+]
+
+MODES = {
+    # name: (disable_agent, history_mode)
+    "truN": (False, True),
+    "truN-nh": (False, False),
+    "stdllm": (True, True),
+    "stdllm-nh": (True, False),
+}
+
+DEFAULT_MODE = "truN"
+
+
+class ChatMode:
+    __slots__ = ("name", "disable_agent", "history_mode")
+
+    def __init__(self, name=DEFAULT_MODE):
+        if name not in MODES:
+            raise ValueError(f"Unknown chat mode '{name}'. Expected one of {list(MODES)}")
+        self.name = name
+        self.disable_agent, self.history_mode = MODES[name]
+
+    def __repr__(self):
+        return f"ChatMode({self.name})"
+
+
+def parse_chat_mode(user_input, current_mode=None):
+    """
+    Resolves the mode for one question and strips the mode marker from it.
+    A marker in the question wins over `current_mode` (e.g. the mode a client echoed back),
+    which in turn wins over the default mode.
+    Returns (ChatMode, cleaned_question).
+    """
+    for marker, name in MODE_MARKERS:
+        if marker in user_input:
+            return ChatMode(name), user_input.replace(marker, "").strip()
+    return ChatMode(current_mode or DEFAULT_MODE), user_input
@@ -0,0 +1,239 @@
+"""
+Columnar chunk store used by the custom FAISS vectorstore (src/vectorstore.py: glove / deepinfra backends).
+
+Instead of keeping one Document object (with its own __dict__ and metadata dict) per chunk, all
+chunk texts live in a single contiguous UTF-8 buffer addressed by an offsets array. Source keys and
+page ids are interned and stored per chunk as integer codes. Document-like `Chunk` views are only
+created on access, e.g. for the top-k results of a search.
+
+Extra per-chunk metadata (e.g. the ingest-time enrichment of src/enrichment.py) is kept as named
+columns: numeric ones as float64 arrays, anything else as a list of JSON-serializable values.
+
+A store can be saved to a directory and loaded back memory-mapped, so several processes can share
+the same pages read-only.
+"""
+
+import os
+import json
+from array import array
+
+import numpy as np
+
+_BUFFER_FILE = "buffer.bin"
+_OFFSETS_FILE = "offsets.npy"
+_SOURCE_CODES_FILE = "source_codes.npy"
+_PAGE_CODES_FILE = "page_codes.npy"
+_TABLES_FILE = "tables.json"
+_COLUMNS_FILE = "columns.json"
+
+
+class Chunk:
+    """Lightweight read-only view on one row of a ChunkStore (mimics the Document interface)."""
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store, row):
+        self._store = store
+        self._row = row
+
+    @property
+    def row(self):
+        return self._row
+
+    @property
+    def page_content(self):
+        return self._store.text(self._row)
+
+    @property
+    def metadata(self):
+        return self._store.metadata(self._row)
+
+    def __repr__(self):
+        return f"Document(metadata={self.metadata})"
+
+
+class ChunkStore:
+    """Append-only, array-backed storage for document chunks."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._offsets = array("q", [0])
+        self._source_codes = array("i")
+        self._page_codes = array("i")
+        self._sources = []
+        self._pages = []
+        self._source_index = {}
+        self._page_index = {}
+        self._columns = {}
+        self._read_only = False
+
+    @classmethod
+    def from_documents(cls, documents):
+        """
+        Builds a store from any iterable of objects with `page_content` and `metadata`. Metadata fields
+        other than 'id' and 'source_key' (e.g. enrichment) become columns (None where a chunk lacks one).
+        """
+        store = cls()
+        extra = {}  # column name -> values of the rows so far
+        for row, doc in enumerate(documents):
+            metadata = doc.metadata or {}
+            store.append(doc.page_content, metadata)
+            for name, value in metadata.items():
+                if name not in ("id", "source_key"):
+                    extra.setdefault(name, [None] * row).append(value)
+            for values in extra.values():
+                if len(values) == row:
+                    values.append(None)
+        for name, values in extra.items():
+            store.set_column(name, values)
+        return store
+
+    # -----------------------------
+    # Building
+    # -----------------------------
+    @staticmethod
+    def _intern(value, table, index):
+        code = index.get(value)
+        if code is None:
+            code = len(table)
+            table.append(value)
+            index[value] = code
+        return code
+
+    def append(self, text, metadata):
+        """Adds one chunk. Only the 'id' and 'source_key' metadata fields are stored."""
+        if self._read_only:
+            raise RuntimeError("ChunkStore was loaded read-only and cannot be modified.")
+        metadata = metadata or {}
+        self._buffer += text.encode("utf-8")
+        self._offsets.append(len(self._buffer))
+        self._source_codes.append(self._intern(metadata.get("source_key", ""), self._sources, self._source_index))
+        self._page_codes.append(self._intern(metadata.get("id", ""), self._pages, self._page_index))
+
+    def set_column(self, name, values):
+        """Adds or replaces a metadata column with one value per chunk (also on read-only stores)."""
+        if name in ("id", "source_key"):
+            raise ValueError(f"'{name}' is a built-in ChunkStore field and cannot be used as a column name.")
+        if len(values) != len(self):
+            raise ValueError(f"Column '{name}' has {len(values)} values for {len(self)} chunks.")
+        values = list(values)
+        if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+            self._columns[name] = np.asarray(values, dtype=np.float64)
+        else:
+            self._columns[name] = values
+
+    # -----------------------------
+    # Access
+    # -----------------------------
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, row):
+        size = len(self)
+        if row < 0:
+            row += size
+        if not 0 <= row < size:
+            raise IndexError("ChunkStore index out of range")
+        return Chunk(self, row)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield Chunk(self, row)
+
+    def text(self, row):
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        return bytes(self._buffer[start:end]).decode("utf-8")
+
+    def iter_texts(self):
+        """Yields chunk texts in row order without creating Chunk views."""
+        for row in range(len(self)):
+            yield self.text(row)
+
+    def metadata(self, row):
+        metadata = {
+            "id": self._pages[self._page_codes[row]],
+            "source_key": self._sources[self._source_codes[row]],
+        }
+        for name, values in self._columns.items():
+            value = values[row]
+            metadata[name] = float(value) if isinstance(values, np.ndarray) else value
+        return metadata
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    def column(self, name):
+        """All values of a metadata column in row order (a float64 array for numeric columns), e.g. for filters."""
+        return self._columns[name]
+
+    def take(self, rows):
+        """Returns Chunk views for the given row ids, skipping FAISS padding (-1) and out-of-range ids."""
+        size = len(self)
+        return [Chunk(self, int(row)) for row in rows if 0 <= row < size]
+
+    @property
+    def nbytes(self):
+        """Approximate resident size of the columnar data in bytes."""
+        return (
+            len(self._buffer)
+            + len(self._offsets) * 8
+            + len(self._source_codes) * 4
+            + len(self._page_codes) * 4
+            + sum(values.nbytes if isinstance(values, np.ndarray) else len(json.dumps(values)) for values in self._columns.values())
+        )
+
+    # -----------------------------
+    # Persistence
+    # -----------------------------
+    def save(self, path):
+        """Writes the store to a directory as flat binary/.npy files plus a small JSON table file."""
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, _BUFFER_FILE), "wb") as f:
+            f.write(bytes(self._buffer))
+        np.save(os.path.join(path, _OFFSETS_FILE), np.asarray(self._offsets, dtype=np.int64))
+        np.save(os.path.join(path, _SOURCE_CODES_FILE), np.asarray(self._source_codes, dtype=np.int32))
+        np.save(os.path.join(path, _PAGE_CODES_FILE), np.asarray(self._page_codes, dtype=np.int32))
+        with open(os.path.join(path, _TABLES_FILE), "w", encoding="utf-8") as f:
+            json.dump({"sources": self._sources, "pages": self._pages}, f, ensure_ascii=False)
+        columns = {}
+        for name, values in self._columns.items():
+            if isinstance(values, np.ndarray):
+                filename = f"column_{len(columns)}.npy"
+                np.save(os.path.join(path, filename), values)
+                columns[name] = {"file": filename}
+            else:
+                columns[name] = {"values": values}
+        with open(os.path.join(path, _COLUMNS_FILE), "w", encoding="utf-8") as f:
+            json.dump(columns, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Loads a saved store. With mmap=True the arrays are memory-mapped read-only."""
+        mmap_mode = "r" if mmap else None
+        store = cls()
+        buffer_path = os.path.join(path, _BUFFER_FILE)
+        if mmap and os.path.getsize(buffer_path) > 0:
+            store._buffer = np.memmap(buffer_path, dtype=np.uint8, mode="r")
+        else:
+            with open(buffer_path, "rb") as f:
+                store._buffer = bytearray(f.read())
+        store._offsets = np.load(os.path.join(path, _OFFSETS_FILE), mmap_mode=mmap_mode)
+        store._source_codes = np.load(os.path.join(path, _SOURCE_CODES_FILE), mmap_mode=mmap_mode)
+        store._page_codes = np.load(os.path.join(path, _PAGE_CODES_FILE), mmap_mode=mmap_mode)
+        with open(os.path.join(path, _TABLES_FILE), "r", encoding="utf-8") as f:
+            tables = json.load(f)
+        store._sources = tables["sources"]
+        store._pages = tables["pages"]
+        store._source_index = {value: code for code, value in enumerate(store._sources)}
+        store._page_index = {value: code for code, value in enumerate(store._pages)}
+        columns_path = os.path.join(path, _COLUMNS_FILE)
+        if os.path.exists(columns_path):  # stores saved before metadata columns existed have none
+            with open(columns_path, "r", encoding="utf-8") as f:
+                for name, column in json.load(f).items():
+                    if "file" in column:
+                        store._columns[name] = np.load(os.path.join(path, column["file"]), mmap_mode=mmap_mode)
+                    else:
+                        store._columns[name] = column["values"]
+        store._read_only = True
+        return store
@@ -0,0 +1,190 @@
+"""
+Versioned agent/RAG config with hot reload.
+
+The live `agent_config` and `rag_config` are kept in memory together with their version (a content
+hash, see answer_cache.config_version). Writers publish the version under a small Upstash key next to
+the config (`truenotion:config_version:<key>`); every instance polls those keys with a single MGET
+every CONFIG_POLL_INTERVAL_S seconds and only fetches a config when its version changed.
+
+Changes are applied by type through the handlers registered with `on_change(key, handler)`; the
+handler receives (old, new) and returns a short description of what it did. The classification
+helpers below tell handlers which parts changed:
+
+    rag_config     memory -> applies instantly, k -> new retriever over the same vector store,
+                   chunk_size (or anything else) -> re-chunking and re-embedding
+    agent_config   agent/task prompts -> rebuild the Crew, llm -> model settings of the direct calls
+"""
+
+import os
+import time
+import threading
+from collections import deque
+
+import requests
+
+from src.answer_cache import config_version
+from util import metrics
+
+VERSION_KEY_PREFIX = "truenotion:config_version:"
+POLL_INTERVAL_S = float(os.getenv("CONFIG_POLL_INTERVAL_S", "15"))
+REQUEST_TIMEOUT_S = 2.0
+HISTORY_SIZE = 20
+
+# rag_config keys that only change how requests use the index, by cost of applying them
+INSTANT_RAG_KEYS = {"memory"}
+RETRIEVER_RAG_KEYS = {"k"}
+
+
+def changed_keys(old, new):
+    old, new = old or {}, new or {}
+    return {key for key in set(old) | set(new) if old.get(key) != new.get(key)}
+
+
+def rag_change_kind(old, new):
+    """'unchanged', 'instant' (memory), 'retriever' (k) or 'reindex' (chunk_size and anything else)."""
+    changed = changed_keys(old, new)
+    if not changed:
+        return "unchanged"
+    if changed <= INSTANT_RAG_KEYS:
+        return "instant"
+    if changed <= INSTANT_RAG_KEYS | RETRIEVER_RAG_KEYS:
+        return "retriever"
+    return "reindex"
+
+
+def agent_change_kinds(old, new):
+    """Subset of {'prompts', 'llm'}: agent/task definitions and LLM settings that changed."""
+    changed = changed_keys(old, new)
+    kinds = set()
+    if changed - {"llm"}:
+        kinds.add("prompts")
+    if "llm" in changed:
+        kinds.add("llm")
+    return kinds
+
+
+class ConfigManager:
+    def __init__(self, fetch_fn, url=None, token=None, poll_interval_s=POLL_INTERVAL_S):
+        # fetch_fn(key) returns the config stored under `key` (raises when it is missing)
+        self.fetch_fn = fetch_fn
+        self.url = url if url is not None else os.getenv("UPSTASH_REDIS_REST_URL")
+        self.token = token if token is not None else os.getenv("UPSTASH_REDIS_REST_TOKEN")
+        self.poll_interval_s = poll_interval_s
+        self._configs = {}  # key -> {"version", "data", "applied_at"}
+        self._handlers = {}
+        self._history = deque(maxlen=HISTORY_SIZE)
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.polls = 0
+        self.poll_errors = 0
+
+    def on_change(self, key, handler):
+        self._handlers[key] = handler
+
+    def set_initial(self, key, data):
+        """Records the config loaded at startup without running the change handler."""
+        with self._lock:
+            self._configs[key] = {"version": config_version(data), "data": data, "applied_at": time.time()}
+
+    def get(self, key):
+        entry = self._configs.get(key)
+        return entry["data"] if entry else None
+
+    def version(self, key):
+        entry = self._configs.get(key)
+        return entry["version"] if entry else None
+
+    def apply(self, key, data, source="local"):
+        """Applies `data` as the new config for `key` when its version differs; returns the handler's result."""
+        version = config_version(data)
+        with self._lock:
+            current = self._configs.get(key)
+            if current is not None and current["version"] == version:
+                return "unchanged"
+            old = current["data"] if current else None
+            # Live before the handler runs, so work it starts in the background (re-indexing) sees it
+            self._configs[key] = {"version": version, "data": data, "applied_at": time.time()}
+            handler = self._handlers.get(key)
+            try:
+                result = handler(old, data) if handler is not None else "stored"
+            except Exception:
+                if current is None:
+                    del self._configs[key]
+                else:
+                    self._configs[key] = current
+                raise
+            self._history.append({
+                "key": key, "version": version, "previous_version": current["version"] if current else None,
+                "source": source, "result": result, "applied_at": time.time(),
+            })
+        print(f"Config '{key}' is now version {version} ({source}: {result}).")
+        return result
+
+    # --- Upstash version keys ---------------------------------------------------------------
+
+    def _command(self, operation, payload):
+        with metrics.EXTERNAL_CALL_SECONDS.labels(service="upstash", operation=operation).time():
+            response = requests.post(
+                self.url, headers={"Authorization": f"Bearer {self.token}"}, json=payload, timeout=REQUEST_TIMEOUT_S
+            )
+        if response.status_code != 200:
+            raise Exception(f"Upstash {operation} failed: {response.text}")
+        return response.json().get("result")
+
+    def publish(self, key, data):
+        """Announces a new config version to every instance (call after the config itself was uploaded)."""
+        self._command("set", ["SET", VERSION_KEY_PREFIX + key, config_version(data)])
+
+    def remote_versions(self):
+        keys = list(self._handlers)
+        values = self._command("mget", ["MGET"] + [VERSION_KEY_PREFIX + key for key in keys])
+        return dict(zip(keys, values or []))
+
+    def poll_once(self):
+        """Fetches and applies every config whose published version differs from the live one."""
+        self.polls += 1
+        applied = {}
+        for key, version in self.remote_versions().items():
+            if version is None or version == self.version(key):
+                continue
+            applied[key] = self.apply(key, self.fetch_fn(key), source="poll")
+        return applied
+
+    def refresh(self):
+        """Re-reads every config from the store (ignoring version keys) and applies what changed."""
+        applied = {}
+        for key in list(self._handlers):
+            try:
+                data = self.fetch_fn(key)
+            except KeyError:
+                applied[key] = "not stored"
+                continue
+            applied[key] = self.apply(key, data, source="refresh")
+        return applied
+
+    def start(self):
+        if self._thread is not None or not self.url or self.poll_interval_s <= 0:
+            return
+        self._thread = threading.Thread(target=self._run, name="config-poller", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval_s):
+            try:
+                self.poll_once()
+            except Exception as e:
+                self.poll_errors += 1
+                print(f"Config poll failed: {e}")
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        return {
+            "configs": {key: {"version": entry["version"], "applied_at": entry["applied_at"]} for key, entry in self._configs.items()},
+            "poll_interval_s": self.poll_interval_s,
+            "polls": self.polls,
+            "poll_errors": self.poll_errors,
+            "history": list(self._history),
+        }
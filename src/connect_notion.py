@@ -2,6 +2,7 @@ import os
 import requests
 import json
 from dotenv import load_dotenv
+from util import metrics
 
 if "MISTRAL_API_KEY" not in os.environ:
     # For running locally or docker run,
@@ -87,19 +88,28 @@ def save_to_upstash_redis(key, data):
         "Authorization": f"Bearer {UPSTASH_REDIS_REST_TOKEN}",
         "Content-Type": "application/json"
     }
-    response = requests.post(url, headers=headers, json={"0": json.dumps(data)})
+    with metrics.EXTERNAL_CALL_SECONDS.labels(service="upstash", operation="set").time():
+        response = requests.post(url, headers=headers, json={"0": json.dumps(data)})
     if response.status_code != 200:
         raise Exception(f"Failed to store data in Upstash: {response.text}")
     print(f"Data successfully saved to Upstash under key: {key}")
 
-def extract_pages(num_pages=None):
+def query_database(num_pages=None):
+    """Queries the Notion database and returns its rows parsed by extract_notion_rows."""
     url = f"https://api.notion.com/v1/databases/{DATABASE_ID}/query"
     page_size = 1000 if num_pages is None else num_pages
     payload = {"page_size": page_size}
-    response = requests.post(url, json=payload, headers=headers)
+    with metrics.EXTERNAL_CALL_SECONDS.labels(service="notion", operation="query_database").time():
+        response = requests.post(url, json=payload, headers=headers)
+    if response.status_code != 200:
+        # An error body has no results: never mistake it for an empty database
+        raise Exception(f"Failed to query the Notion database: {response.text}")
 
     notion_data = response.json()
-    parsed_data = extract_notion_rows(notion_data)
+    return extract_notion_rows(notion_data)
+
+def extract_pages(num_pages=None):
+    parsed_data = query_database(num_pages)
 
     # Save notion data on upstash
     save_to_upstash_redis("notion_database", parsed_data)
@@ -2,10 +2,10 @@ import os
 import json
 import requests
 from dotenv import load_dotenv
-from langchain.docstore.document import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain.vectorstores import FAISS
+from util import metrics
+from src import embeddings, vectorstore
+
+# LangChain modules are imported inside the functions that need them to keep cold start fast
 
 # Load environment variables
 load_dotenv()
@@ -21,7 +21,7 @@ HEADERS = {
 }
 
 def list_upstash_keys():
-    """Fetch all keys from Upstash Redis, excluding 'agent_config' and 'rag_config'."""
+    """Fetch all keys from Upstash Redis, excluding 'agent_config', 'rag_config' and internal 'truenotion:' keys."""
     url = f"{UPSTASH_REDIS_REST_URL}"
     headers = {
         "Authorization": f"Bearer {UPSTASH_REDIS_REST_TOKEN}",
@@ -29,25 +29,55 @@ def list_upstash_keys():
     }
     payload = ["KEYS", "*"]
 
-    response = requests.post(url, headers=headers, json=payload)
+    with metrics.EXTERNAL_CALL_SECONDS.labels(service="upstash", operation="keys").time():
+        response = requests.post(url, headers=headers, json=payload)
     if response.status_code != 200:
         raise Exception(f"Failed to list keys: {response.text}")
 
     keys = response.json().get("result", [])
 
-    # Exclude 'agent_config' and 'rag_config'
+    # Exclude 'agent_config', 'rag_config' and internal keys (e.g. cached answers)
     exclude_keys = {"agent_config", "rag_config"}
-    return [key for key in keys if key not in exclude_keys]
+    return [key for key in keys if key not in exclude_keys and not key.startswith("truenotion:")]
 
 def get_upstash_json_by_key(key):
     """Get and parse JSON value for a specific key."""
     url = f"{UPSTASH_REDIS_REST_URL}/get/{key}"
-    response = requests.get(url, headers=HEADERS)
+    with metrics.EXTERNAL_CALL_SECONDS.labels(service="upstash", operation="get").time():
+        response = requests.get(url, headers=HEADERS)
     if response.status_code != 200:
         raise Exception(f"Failed to fetch key {key}: {response.text}")
     raw_value = response.json().get("result")
     return json.loads(raw_value) if raw_value else []
 
+def documents_from_entries(entries, key):
+    """One Document per dataset entry (a Notion row: id + properties) stored under `key`."""
+    from langchain.docstore.document import Document
+
+    return [
+        Document(
+            page_content=json.dumps(entry['properties'], ensure_ascii=False, indent=2),
+            metadata={
+                "id": entry.get("id", ""),
+                "source_key": key
+            }
+        )
+        for entry in entries
+    ]
+
+def load_documents_by_key(key):
+    """Documents of one dataset key in Upstash ([] when the value is not in the dataset format)."""
+    try:
+        json_data = get_upstash_json_by_key(key)['0']
+    except (KeyError, TypeError):
+        # Skipping the key if '0' is not present (Please ensure the file is in correct format)'
+        return []
+
+    data = json.loads(json_data)
+    if not isinstance(data, list):
+        raise ValueError(f"Expected a list from key {key}, got {type(data)}")
+    return documents_from_entries(data, key)
+
 def load_dataset_from_upstash():
     """
     Loads and combines documents from all JSON values stored in Upstash Redis
@@ -56,26 +86,7 @@ def load_dataset_from_upstash():
     keys = list_upstash_keys()  # Fetch all keys
 
     for key in keys:
-        try:
-            json_data = get_upstash_json_by_key(key)['0']
-        except KeyError:
-            # Skipping the key if '0' is not present (Please ensure the file is in correct format)'
-            continue
-
-        data = json.loads(json_data)
-        if not isinstance(data, list):
-            raise ValueError(f"Expected a list from key {key}, got {type(data)}")
-
-        for entry in data:
-            text = json.dumps(entry['properties'], ensure_ascii=False, indent=2)
-            doc = Document(
-                page_content=text,
-                metadata={
-                    "id": entry.get("id", ""),
-                    "source_key": key
-                }
-            )
-            all_documents.append(doc)
+        all_documents.extend(load_documents_by_key(key))
 
     return all_documents, keys
 
@@ -83,6 +94,9 @@ def chunk_documents(documents, chunk_size=1000, chunk_overlap=50):
     """
     Splits documents into smaller chunks to improve retrieval performance.
     """
+    from langchain.docstore.document import Document
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap
@@ -95,13 +109,73 @@ def chunk_documents(documents, chunk_size=1000, chunk_overlap=50):
     return chunked_docs
 
 
-def create_vectorstore(documents):
+def get_embeddings():
+    """The LangChain sentence-transformers embeddings of the huggingface backend, loaded once per process."""
+    return embeddings.get_backend("huggingface").langchain
+
+def create_vectorstore(documents, backend=None):
+    """
+    Creates a vectorstore by embedding document chunks with an embedding backend (src/embeddings.py,
+    default EMBEDDING_BACKEND). The huggingface backend (local sentence-transformers model) indexes
+    into LangChain's FAISS store, the others into the ChunkStore-based FAISS store (src/vectorstore.py).
+    Both take the vectors of unchanged chunks from the embedding cache (embeddings.embed_chunks).
+    """
+    backend = backend or embeddings.get_backend()
+    if isinstance(backend, embeddings.SentenceTransformerEmbeddings):
+        from langchain.vectorstores import FAISS
+
+        texts = [doc.page_content for doc in documents]
+        vectors = embeddings.embed_chunks(backend, texts, vectorstore.EMBED_BATCH_SIZE)
+        return FAISS.from_embeddings(list(zip(texts, vectors)), backend.langchain, metadatas=[doc.metadata for doc in documents])
+    return vectorstore.build(documents, backend)
+
+def update_vectorstore(store, remove, documents, backend=None):
+    """
+    Returns a copy of a vectorstore built by create_vectorstore without the chunks whose metadata
+    matches `remove(metadata)` and with the chunks `documents` added; `store` itself is not modified,
+    so requests can keep searching it. Only the added chunks are embedded.
     """
-    Creates a vectorstore by embedding document chunks using a local sentence-transformers model.
+    backend = backend or embeddings.get_backend()
+    if not hasattr(store, "docstore"):
+        return vectorstore.update(store, remove, documents, backend)
+    import faiss
+    from langchain.vectorstores import FAISS
+
+    docstore = type(store.docstore)(dict(store.docstore._dict))
+    updated = FAISS(store.embedding_function, faiss.clone_index(store.index), docstore, dict(store.index_to_docstore_id))
+    removed = [doc_id for doc_id, doc in docstore._dict.items() if remove(doc.metadata)]
+    if removed:
+        updated.delete(removed)
+    if documents:
+        texts = [doc.page_content for doc in documents]
+        vectors = embeddings.embed_chunks(backend, texts, vectorstore.EMBED_BATCH_SIZE)
+        updated.add_embeddings(list(zip(texts, vectors)), metadatas=[doc.metadata for doc in documents])
+    return updated
+
+def save_vectorstore(store, path):
+    """Persists a vectorstore built by create_vectorstore to a directory."""
+    if hasattr(store, "save_local"):
+        store.save_local(path)
+    else:
+        vectorstore.save(store, path)
+
+def load_vectorstore(path, backend=None):
     """
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    vectorstore = FAISS.from_documents(documents, embeddings)
-    return vectorstore
+    Loads a vectorstore written by save_vectorstore, embedding queries with `backend` (the one it was
+    built with). The FAISS vectors are memory-mapped read-only, so processes loading the same files
+    share their pages. LangChain stores hold a pickled docstore (a per-process copy): only load
+    artifacts this backend wrote itself.
+    """
+    import faiss
+
+    backend = backend or embeddings.get_backend()
+    if vectorstore.is_saved(path):
+        return vectorstore.load(path, backend)
+    from langchain.vectorstores import FAISS
+
+    store = FAISS.load_local(path, backend.langchain, allow_dangerous_deserialization=True)
+    store.index = faiss.read_index(os.path.join(path, "index.faiss"), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    return store
 
 def upload_agent_config_to_upstash(filepath="agents/agent_config.json", key="agent_config"):
     """
@@ -120,7 +194,8 @@ def upload_agent_config_to_upstash(filepath="agents/agent_config.json", key="age
     url = f"{UPSTASH_REDIS_REST_URL}"
     payload = ["SET", key, json_str]
 
-    response = requests.post(url, headers=HEADERS, json=payload)
+    with metrics.EXTERNAL_CALL_SECONDS.labels(service="upstash", operation="set").time():
+        response = requests.post(url, headers=HEADERS, json=payload)
     if response.status_code != 200:
         raise Exception(f"Failed to upload config to Upstash: {response.text}")
     print(f"Successfully uploaded '{key}' to Upstash.")
@@ -0,0 +1,260 @@
+"""
+Embedding backends: one interface for the models that turn chunks and queries into vectors.
+
+A backend provides
+
+    model_id             identifier of the model (part of the index fingerprint)
+    dim                  vector dimension
+    embed_batch(texts)   float32 array of shape (len(texts), dim)
+    embed_query(text)    float32 array of shape (dim,)
+
+Built-in backends:
+
+    huggingface   sentence-transformers/all-MiniLM-L6-v2 run locally (LangChain HuggingFaceEmbeddings),
+                  indexed in LangChain's FAISS store (data_loader)
+    glove         local GloVe word vectors (models/glove-wiki-gigaword-50, memory-mapped), averaged per text
+    deepinfra     DeepInfra's OpenAI-compatible embeddings API (DEEPINFRA_TOKEN), batched requests
+
+The "embedding_backend" key of rag_config selects the backend an index is built with (default:
+EMBEDDING_BACKEND, else "huggingface"); changing it re-indexes. `register(name, factory)` adds a
+backend. Each backend is created once per process on first use and shared by all indexes.
+benchmarks/embeddings.py compares their throughput, latency and memory.
+
+Index builds embed chunks through `embed_chunks`, which caches vectors in memory by model and chunk
+content hash (EMBEDDING_CACHE_MB), so a rebuild after a data sync only embeds new or changed chunks.
+"""
+
+import os
+import abc
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from util import metrics
+
+DEFAULT_BACKEND = os.getenv("EMBEDDING_BACKEND", "huggingface")
+GLOVE_MODEL_PATH = os.path.join("models", "glove-wiki-gigaword-50", "glove-wiki-gigaword-50.model")
+HUGGINGFACE_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DEEPINFRA_MODEL = os.getenv("DEEPINFRA_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+# Texts per embeddings API request
+DEEPINFRA_BATCH_SIZE = int(os.getenv("DEEPINFRA_EMBEDDING_BATCH_SIZE", "128"))
+CACHE_MB = float(os.getenv("EMBEDDING_CACHE_MB", "256"))
+
+
+class EmbeddingBackend(abc.ABC):
+    """Base of the backends: subclasses set model_id and dim and implement embed_batch (instantiating one that does not fails)."""
+
+    model_id = None
+    dim = None
+
+    @abc.abstractmethod
+    def embed_batch(self, texts):
+        """Float32 array of shape (len(texts), dim)."""
+
+    def embed_query(self, text):
+        return self.embed_batch([text])[0]
+
+    def encode(self, text):
+        """SentenceTransformer-style alias of embed_query."""
+        return self.embed_query(text)
+
+
+class WordVectorEmbeddings(EmbeddingBackend):
+    """
+    Mean of the word vectors of a text's whitespace tokens (zero vector when none is known), for
+    gensim KeyedVectors such as GloVe or word2vec. A batch is one gather over the vector table.
+    """
+
+    def __init__(self, model, model_id="glove-wiki-gigaword-50", batch_size=512):
+        self.model = model
+        self.model_id = model_id
+        self.dim = model.vector_size
+        self.batch_size = batch_size
+
+    def embed_batch(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype="float32")
+        lookup = self.model.key_to_index.get
+        for start in range(0, len(texts), self.batch_size):
+            ids, counts = [], []
+            for text in texts[start:start + self.batch_size]:
+                known = [i for i in map(lookup, text.split()) if i is not None]
+                ids.extend(known)
+                counts.append(len(known))
+            counts = np.asarray(counts)
+            rows = np.flatnonzero(counts)
+            if rows.size == 0:
+                continue
+            # Per-text sums of the gathered vectors: reduceat over the start offset of each non-empty text
+            offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))[rows]
+            sums = np.add.reduceat(self.model.vectors[np.asarray(ids)], offsets, axis=0)
+            vectors[start + rows] = sums / counts[rows, None]
+        return vectors
+
+
+class SentenceTransformerEmbeddings(EmbeddingBackend):
+    """A local sentence-transformers model through LangChain's HuggingFaceEmbeddings (`langchain`)."""
+
+    def __init__(self, model_name=HUGGINGFACE_MODEL):
+        from langchain.embeddings import HuggingFaceEmbeddings
+
+        self.model_id = model_name
+        self.langchain = HuggingFaceEmbeddings(model_name=model_name)
+        self.dim = self.langchain.client.get_sentence_embedding_dimension()
+
+    def embed_batch(self, texts):
+        return np.asarray(self.langchain.embed_documents(list(texts)), dtype="float32").reshape(len(texts), self.dim)
+
+    def embed_query(self, text):
+        return np.asarray(self.langchain.embed_query(text), dtype="float32")
+
+
+class DeepInfraEmbeddings(EmbeddingBackend):
+    """DeepInfra's OpenAI-compatible embeddings API; a batch is sent as requests of `batch_size` texts."""
+
+    def __init__(self, model_name=DEEPINFRA_MODEL, batch_size=DEEPINFRA_BATCH_SIZE):
+        token = os.getenv("DEEPINFRA_TOKEN")
+        if not token:
+            raise ValueError("Missing DEEPINFRA_TOKEN in environment")
+        from openai import OpenAI
+
+        self.client = OpenAI(api_key=token, base_url="https://api.deepinfra.com/v1/openai")
+        self.model_id = model_name
+        self.batch_size = batch_size
+        self._dim = None
+
+    @property
+    def dim(self):
+        if self._dim is None:
+            self._dim = len(self.embed_query("dimension"))
+        return self._dim
+
+    def embed_batch(self, texts):
+        texts = list(texts)
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            response = self.client.embeddings.create(
+                model=self.model_id, input=texts[start:start + self.batch_size], encoding_format="float"
+            )
+            vectors.extend(item.embedding for item in sorted(response.data, key=lambda item: item.index))
+        embeddings = np.asarray(vectors, dtype="float32")
+        if embeddings.size:
+            self._dim = embeddings.shape[1]
+        return embeddings
+
+    def embed_query(self, text):
+        response = self.client.embeddings.create(model=self.model_id, input=text, encoding_format="float")
+        return np.asarray(response.data[0].embedding, dtype="float32")
+
+
+def load_glove(model_path=GLOVE_MODEL_PATH):
+    """The local GloVe model, memory-mapped read-only (processes loading it share its pages)."""
+    from gensim.models import KeyedVectors
+
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Local model file not found at {model_path}")
+    return WordVectorEmbeddings(KeyedVectors.load(model_path, mmap="r"))
+
+
+_factories = OrderedDict([
+    ("huggingface", SentenceTransformerEmbeddings),
+    ("glove", load_glove),
+    ("deepinfra", DeepInfraEmbeddings),
+])
+_backends = {}
+_lock = threading.Lock()
+
+
+def register(name, factory):
+    """Adds (or replaces) the backend `name`; `factory()` creates it on first use."""
+    with _lock:
+        _factories[name] = factory
+        _backends.pop(name, None)
+
+
+def names():
+    return list(_factories)
+
+
+def backend_name(rag_parameters=None):
+    """The backend rag_config selects ("embedding_backend"), else EMBEDDING_BACKEND."""
+    return (rag_parameters or {}).get("embedding_backend") or DEFAULT_BACKEND
+
+
+def get_backend(name=None):
+    """The process-wide instance of a backend (default: EMBEDDING_BACKEND); ValueError for unknown names."""
+    name = name or DEFAULT_BACKEND
+    backend = _backends.get(name)
+    if backend is not None:
+        return backend
+    with _lock:
+        if name not in _factories:
+            raise ValueError(f"Unknown embedding backend '{name}' (registered: {', '.join(_factories)})")
+        if name not in _backends:
+            _backends[name] = _factories[name]()
+        return _backends[name]
+
+
+class EmbeddingCache:
+    """LRU of chunk vectors keyed by model id and chunk content hash, bounded in bytes; survives index rebuilds."""
+
+    def __init__(self, max_bytes=int(CACHE_MB * 2**20)):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()  # (model id, chunk hash) -> float32 vector
+        self._lock = threading.Lock()
+
+    def get_many(self, model_id, hashes):
+        with self._lock:
+            found = {}
+            for chunk_hash in hashes:
+                vector = self._entries.get((model_id, chunk_hash))
+                if vector is not None:
+                    self._entries.move_to_end((model_id, chunk_hash))
+                    found[chunk_hash] = vector
+            return found
+
+    def put_many(self, model_id, items):
+        with self._lock:
+            for chunk_hash, vector in items.items():
+                previous = self._entries.pop((model_id, chunk_hash), None)
+                if previous is not None:
+                    self.nbytes -= previous.nbytes
+                self._entries[(model_id, chunk_hash)] = vector
+                self.nbytes += vector.nbytes
+            while self.nbytes > self.max_bytes and self._entries:
+                _, vector = self._entries.popitem(last=False)
+                self.nbytes -= vector.nbytes
+
+    def stats(self):
+        return {"entries": len(self._entries), "bytes": self.nbytes, "max_bytes": self.max_bytes}
+
+
+cache = EmbeddingCache()
+
+
+def embed_chunks(backend, texts, batch_size=256):
+    """
+    Embeddings of the chunk texts as a float32 array of shape (len(texts), dim). Vectors of chunks
+    embedded before with the same model come from the cache; every distinct new chunk is embedded
+    once, in batches of `batch_size`.
+    """
+    hashes = [hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest() for text in texts]
+    cached = cache.get_many(backend.model_id, hashes) if cache.max_bytes > 0 else {}
+    missing = list(dict.fromkeys(h for h in hashes if h not in cached))
+    metrics.EMBEDDING_CHUNKS.labels(model=backend.model_id, result="cached").inc(len(texts) - len(missing))
+    metrics.EMBEDDING_CHUNKS.labels(model=backend.model_id, result="embedded").inc(len(missing))
+    if missing:
+        text_by_hash = dict(zip(hashes, texts))
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            vectors = np.asarray(backend.embed_batch([text_by_hash[h] for h in batch]), dtype="float32")
+            # Copies, so a cached row does not keep its whole batch array alive
+            computed = {h: vector.copy() for h, vector in zip(batch, vectors)}
+            cached.update(computed)
+            if cache.max_bytes > 0:
+                cache.put_many(backend.model_id, computed)
+    if not hashes:
+        return np.zeros((0, backend.dim), dtype="float32")
+    return np.stack([cached[h] for h in hashes])
@@ -0,0 +1,245 @@
+"""
+Ingest-time enrichment: runs registered analyzers over every chunk once, between chunking and
+indexing, and stores their outputs as chunk metadata (metadata columns of the template ChunkStore,
+metadata keys of LangChain Documents).
+
+Retrieved chunks then carry e.g. their sentiment, language and keywords, which are shown to the agent
+next to each chunk (`format_context`), so it does not need a tool call per request to get them.
+
+An analyzer has a `name`, a `version` (bump it when its output changes), the metadata `columns` it
+produces and `analyze(texts)`, which scores a batch of texts and returns one list of values per
+column. Register more with `register(analyzer)`. ENRICHMENT_ANALYZERS selects the analyzers by name
+(default: all registered, "" disables enrichment).
+
+Analyzers and batches run in parallel on ENRICHMENT_WORKERS threads. Outputs are cached in memory
+by analyzer version and chunk content hash (ENRICHMENT_CACHE_SIZE chunks per analyzer), so a rebuild
+only analyzes new or changed chunks.
+"""
+
+import os
+import re
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from util import metrics
+
+WORKERS = int(os.getenv("ENRICHMENT_WORKERS", str(min(4, os.cpu_count() or 1))))
+BATCH_SIZE = int(os.getenv("ENRICHMENT_BATCH_SIZE", "512"))
+CACHE_SIZE = int(os.getenv("ENRICHMENT_CACHE_SIZE", "200000"))
+IN_CONTEXT = os.getenv("ENRICHMENT_CONTEXT", "1").lower() not in ("0", "false", "no")
+
+_WORD_RE = re.compile(r"[^\W\d_]+", re.UNICODE)
+MIN_STOPWORDS = 2
+
+STOPWORDS = {
+    "en": "the and of to in is that for it with as was on be by this are or at from have not an but they which you we",
+    "de": "der die und in den von zu das mit sich des auf für ist im dem nicht ein eine als auch es an werden aus er",
+    "fr": "le la les de des et en un une du est que qui dans pour pas sur au avec ce il elle ne se plus par sont",
+    "es": "el la de que y en los del se las por un una para con no es al lo como más pero sus le ya o este",
+    "it": "il di che e la per un in una non sono del le si con da al della dei gli ma come anche nel questo",
+    "pt": "o a de que e do da em um para foi não uma os no se na por mais as dos como mas ao ele das",
+    "nl": "de het een en van in is dat op te zijn met voor niet die er aan ook als bij door maar om naar",
+}
+STOPWORDS = {language: set(words.split()) for language, words in STOPWORDS.items()}
+_STOPWORD_LANGUAGES = {}
+for _language, _words in STOPWORDS.items():
+    for _word in _words:
+        _STOPWORD_LANGUAGES.setdefault(_word, []).append(_language)
+# Parts of URLs and e-mail addresses (Notion url/email properties) are not content words
+_IGNORED = set(_STOPWORD_LANGUAGES) | {"http", "https", "www", "com", "org", "net", "io", "html"}
+
+
+class SentimentAnalyzer:
+    name = "sentiment"
+    version = 1
+    columns = ("sentiment", "sentiment_polarity")
+
+    def analyze(self, texts):
+        from tools.sentiment_engine import default_engine, label
+
+        polarities = default_engine().polarities(texts)
+        return [[label(polarity) for polarity in polarities], [round(polarity, 4) for polarity in polarities]]
+
+
+class LanguageAnalyzer:
+    """Language by stopword profile (ISO 639-1 code, "und" with fewer than MIN_STOPWORDS stopwords)."""
+
+    name = "language"
+    version = 1
+    columns = ("language",)
+
+    def analyze(self, texts):
+        languages = []
+        for text in texts:
+            scores = Counter()
+            for word, count in Counter(_WORD_RE.findall(text.lower())).items():
+                for language in _STOPWORD_LANGUAGES.get(word, ()):
+                    scores[language] += count
+            best = scores.most_common(1)
+            languages.append(best[0][0] if best and best[0][1] >= MIN_STOPWORDS else "und")
+        return [languages]
+
+
+class KeywordAnalyzer:
+    """Most frequent content words, and capitalized names found mid-sentence (not "Key": labels) as entities."""
+
+    name = "keywords"
+    version = 1
+    columns = ("keywords", "entities")
+    top_n = 5
+
+    _entity_re = re.compile(r"(?<![.!?]\s)(?<!^)\b([A-Z][\w-]+(?:\s+[A-Z][\w-]+)*)(?![\w-]*[\"']?\s*:)")
+
+    def analyze(self, texts):
+        keywords, entities = [], []
+        for text in texts:
+            words = [word for word in _WORD_RE.findall(text.lower()) if len(word) > 2 and word not in _IGNORED]
+            keywords.append([word for word, _ in Counter(words).most_common(self.top_n)])
+            names = dict.fromkeys(match.strip() for match in self._entity_re.findall(text))
+            entities.append([name for name in names if name.lower() not in _IGNORED][:self.top_n])
+        return [keywords, entities]
+
+
+_registry = OrderedDict()
+
+
+def register(analyzer):
+    """Adds (or replaces) an analyzer by name."""
+    _registry[analyzer.name] = analyzer
+    return analyzer
+
+
+for _analyzer in (SentimentAnalyzer(), LanguageAnalyzer(), KeywordAnalyzer()):
+    register(_analyzer)
+
+
+def enabled_analyzers():
+    selected = os.getenv("ENRICHMENT_ANALYZERS")
+    if selected is None:
+        return list(_registry.values())
+    names = [name.strip() for name in selected.split(",") if name.strip()]
+    unknown = [name for name in names if name not in _registry]
+    if unknown:
+        raise ValueError(f"Unknown enrichment analyzers: {', '.join(unknown)} (registered: {', '.join(_registry)})")
+    return [_registry[name] for name in names]
+
+
+def signature(analyzers=None):
+    """Names and versions of the analyzers, e.g. 'sentiment@1,language@1' (part of the index fingerprint)."""
+    analyzers = enabled_analyzers() if analyzers is None else analyzers
+    return ",".join(f"{analyzer.name}@{analyzer.version}" for analyzer in analyzers)
+
+
+class EnrichmentCache:
+    """Per-analyzer LRU of column values keyed by chunk content hash; survives index rebuilds."""
+
+    def __init__(self, max_entries=CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = {}  # analyzer key -> OrderedDict(chunk hash -> tuple of column values)
+        self._lock = threading.Lock()
+
+    def get_many(self, analyzer_key, hashes):
+        with self._lock:
+            entries = self._entries.setdefault(analyzer_key, OrderedDict())
+            found = {}
+            for chunk_hash in hashes:
+                values = entries.get(chunk_hash)
+                if values is not None:
+                    entries.move_to_end(chunk_hash)
+                    found[chunk_hash] = values
+            return found
+
+    def put_many(self, analyzer_key, items):
+        with self._lock:
+            entries = self._entries.setdefault(analyzer_key, OrderedDict())
+            entries.update(items)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def stats(self):
+        return {key: len(entries) for key, entries in self._entries.items()}
+
+
+cache = EnrichmentCache()
+
+
+def chunk_hash(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def _texts(chunks):
+    return list(chunks.iter_texts()) if hasattr(chunks, "iter_texts") else [chunk.page_content for chunk in chunks]
+
+
+def analyze(texts, analyzers=None, workers=WORKERS, batch_size=BATCH_SIZE):
+    """Returns {column: [value per text]} for the analyzers, using and filling the chunk-hash cache."""
+    analyzers = enabled_analyzers() if analyzers is None else analyzers
+    hashes = [chunk_hash(text) for text in texts]
+    text_by_hash = dict(zip(hashes, texts))
+    columns = {}
+    jobs = []
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="enrichment") as executor:
+        for analyzer in analyzers:
+            key = f"{analyzer.name}@{analyzer.version}"
+            cached = cache.get_many(key, hashes)
+            # Every distinct uncached chunk is analyzed once
+            missing = list(dict.fromkeys(h for h in hashes if h not in cached))
+            metrics.ENRICHMENT_CHUNKS.labels(analyzer=analyzer.name, result="cached").inc(len(texts) - len(missing))
+            metrics.ENRICHMENT_CHUNKS.labels(analyzer=analyzer.name, result="analyzed").inc(len(missing))
+            futures = [
+                (missing[i:i + batch_size], executor.submit(analyzer.analyze, [text_by_hash[h] for h in missing[i:i + batch_size]]))
+                for i in range(0, len(missing), batch_size)
+            ]
+            jobs.append((analyzer, key, cached, futures))
+
+        for analyzer, key, cached, futures in jobs:
+            results = dict(cached)
+            for batch_hashes, future in futures:
+                computed = dict(zip(batch_hashes, zip(*future.result())))
+                cache.put_many(key, computed)
+                results.update(computed)
+            for position, column in enumerate(analyzer.columns):
+                columns[column] = [results[h][position] for h in hashes]
+    return columns
+
+
+def enrich(chunks, analyzers=None):
+    """Analyzes every chunk and stores the outputs as metadata columns; returns the column names added."""
+    analyzers = enabled_analyzers() if analyzers is None else analyzers
+    if not analyzers or len(chunks) == 0:
+        return []
+    columns = analyze(_texts(chunks), analyzers)
+    if hasattr(chunks, "set_column"):
+        for name, values in columns.items():
+            chunks.set_column(name, values)
+    else:
+        # LangChain chunks of one document share its metadata dict: give each chunk its own
+        for row, chunk in enumerate(chunks):
+            chunk.metadata = {**chunk.metadata, **{name: values[row] for name, values in columns.items()}}
+    return list(columns)
+
+
+def describe(metadata, analyzers=None):
+    """One-line summary of a chunk's enrichment metadata, e.g. '[sentiment: negative | keywords: budget, risk]'."""
+    analyzers = enabled_analyzers() if analyzers is None else analyzers
+    parts = []
+    for analyzer in analyzers:
+        for column in analyzer.columns:
+            value = metadata.get(column)
+            if value is None or value == [] or column.endswith("_polarity"):
+                continue
+            parts.append(f"{column}: {', '.join(map(str, value)) if isinstance(value, list) else value}")
+    return f"[{' | '.join(parts)}]" if parts else ""
+
+
+def format_context(documents):
+    """Retrieved chunks joined for the prompt, each preceded by its enrichment summary (ENRICHMENT_CONTEXT=0: text only)."""
+    if not IN_CONTEXT:
+        return "\n\n".join(doc.page_content for doc in documents)
+    blocks = []
+    for doc in documents:
+        summary = describe(doc.metadata)
+        blocks.append(f"{summary}\n{doc.page_content}" if summary else doc.page_content)
+    return "\n\n".join(blocks)
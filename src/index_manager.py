@@ -0,0 +1,238 @@
+"""
+Versioned retriever reference with atomic hot-swap, plus background index rebuild jobs.
+
+Requests take a snapshot of the live index once (`IndexHandle.current()`) and keep using it until
+they finish, even if a rebuild swaps in a new version meanwhile. Rebuilds run on a single background
+worker; once the new index is swapped in, a weakref.finalize callback records when the old one is
+released (the worker does not wait for it).
+
+Built indexes can be persisted as artifact directories (`save_index` / `load_index`):
+
+    vectorstore/    data_loader.save_vectorstore output (FAISS index + chunks)
+    meta.json       rag_parameters, fingerprint, loaded_files_reference, built_at
+"""
+
+import os
+import json
+import time
+import uuid
+import weakref
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# How long in-flight requests may keep the previous index before a job reports it as not released
+RELEASE_TIMEOUT_S = 120
+
+VECTORSTORE_DIR = "vectorstore"
+META_FILE = "meta.json"
+
+
+class IndexSnapshot:
+    __slots__ = ("version", "retriever", "loaded_files_reference", "rag_parameters", "fingerprint", "tenant", "__weakref__")
+
+    def __init__(self, version, retriever, loaded_files_reference, rag_parameters, fingerprint=None, tenant=None):
+        self.version = version
+        self.retriever = retriever
+        self.loaded_files_reference = loaded_files_reference
+        self.rag_parameters = rag_parameters
+        # Content hash of the indexed data; unlike `version` it is comparable across processes
+        self.fingerprint = fingerprint
+        # Set on the per-tenant indexes of src/tenants.py (None: the process's own index)
+        self.tenant = tenant
+
+
+class IndexHandle:
+    """Holds the live IndexSnapshot. Reading is lock-free; swapping is serialized."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._current = IndexSnapshot(0, None, [], {})
+        self._listeners = []
+
+    def current(self):
+        return self._current
+
+    @property
+    def version(self):
+        return self._current.version
+
+    def add_swap_listener(self, listener):
+        """Registers `listener(snapshot)`, called after every swap (e.g. to evict caches)."""
+        self._listeners.append(listener)
+
+    def update_parameters(self, rag_parameters):
+        """
+        Replaces the RAG parameters of the live index in place (same version, no swap listeners) for
+        changes that do not affect the indexed data or retrieval, e.g. the conversation memory window.
+        """
+        with self._lock:
+            previous = self._current
+            self._current = IndexSnapshot(
+                previous.version, previous.retriever, previous.loaded_files_reference, rag_parameters, previous.fingerprint
+            )
+        return self._current
+
+    def swap(self, retriever, loaded_files_reference, rag_parameters, fingerprint=None):
+        """Publishes a new index version and returns a weak reference to the previous index."""
+        with self._lock:
+            previous = self._current
+            self._current = IndexSnapshot(
+                previous.version + 1, retriever, loaded_files_reference, rag_parameters, fingerprint
+            )
+            current = self._current
+        for listener in self._listeners:
+            try:
+                listener(current)
+            except Exception as e:
+                print(f"Index swap listener failed: {e}")
+        return _weak_index_ref(previous)
+
+
+def _weak_index_ref(snapshot):
+    # Track the vectorstore when available (LangChain retrievers are pydantic models without weakref support)
+    target = getattr(snapshot.retriever, "vectorstore", None) or snapshot.retriever
+    if target is None:
+        return None
+    try:
+        return weakref.ref(target)
+    except TypeError:
+        return weakref.ref(snapshot)
+
+
+class RebuildJobs:
+    """
+    Runs index rebuilds in the background, one at a time. Requesting a rebuild while one is queued
+    or running returns the existing job instead of starting another.
+    """
+
+    def __init__(self, handle, build_fn, max_history=20):
+        self.handle = handle
+        self.build_fn = build_fn
+        self.max_history = max_history
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="index-rebuild")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._active_job_id = None
+        self._listeners = []
+
+    def add_listener(self, listener):
+        """Calls `listener(job)` after every rebuild finished (succeeded or failed)."""
+        self._listeners.append(listener)
+
+    def _notify(self, job):
+        for listener in self._listeners:
+            try:
+                listener(dict(job))
+            except Exception as e:
+                print(f"Rebuild listener failed: {e}")
+
+    def submit(self, build_fn=None, kind="full"):
+        """Queues a rebuild with `build_fn` (default: the full build); returns (job, created)."""
+        with self._lock:
+            if self._active_job_id is not None:
+                return self._jobs[self._active_job_id], False
+            job = {
+                "job_id": uuid.uuid4().hex,
+                "kind": kind,
+                "status": "queued",
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "version": None,
+                "previous_version": self.handle.version,
+                "old_index_released": None,
+                "old_index_released_at": None,
+                "error": None,
+            }
+            self._jobs[job["job_id"]] = job
+            self._active_job_id = job["job_id"]
+            self._trim_history()
+        self._executor.submit(self._run, job, build_fn or self.build_fn)
+        return job, True
+
+    def get(self, job_id):
+        job = self._jobs.get(job_id)
+        if not job:
+            return None
+        job = dict(job)
+        if (job["status"] == "succeeded" and job["old_index_released"] is None
+                and time.time() - job["finished_at"] > RELEASE_TIMEOUT_S):
+            job["old_index_released"] = False
+        return job
+
+    def _trim_history(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in ("succeeded", "failed")]
+        for job_id in finished[:max(0, len(self._jobs) - self.max_history)]:
+            del self._jobs[job_id]
+
+    def _run(self, job, build_fn):
+        job["status"] = "running"
+        job["started_at"] = time.time()
+        try:
+            old_ref = self.handle.swap(*build_fn())
+            job["version"] = self.handle.version
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+            job["finished_at"] = time.time()
+            with self._lock:
+                self._active_job_id = None
+            print(f"Index rebuild failed: {e}")
+            self._notify(job)
+            return
+
+        # New index is live; the old one's release is recorded whenever the last request drops it
+        job["status"] = "succeeded"
+        job["finished_at"] = time.time()
+        with self._lock:
+            self._active_job_id = None
+        print(f"Index version {job['version']} is live.")
+        on_release(old_ref, lambda: _record_release(job))
+        self._notify(job)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def on_release(ref, callback):
+    """Calls `callback()` once the object behind the weak reference `ref` is garbage collected (now if it already is)."""
+    target = ref() if ref is not None else None
+    if target is None:
+        callback()
+        return
+    weakref.finalize(target, callback)
+
+
+def _record_release(job):
+    # Runs in whichever thread drops the last reference to the old index, so it only records
+    job["old_index_released"] = True
+    job["old_index_released_at"] = time.time()
+
+
+def save_index(path, retriever, loaded_files_reference, rag_parameters, fingerprint=None):
+    """Persists a built index as an artifact directory; meta.json is written last and marks it complete."""
+    from src import data_loader
+
+    data_loader.save_vectorstore(retriever.vectorstore, os.path.join(path, VECTORSTORE_DIR))
+    meta = {
+        "rag_parameters": rag_parameters,
+        "fingerprint": fingerprint,
+        "loaded_files_reference": loaded_files_reference,
+        "built_at": time.time(),
+    }
+    with open(os.path.join(path, META_FILE), "w") as f:
+        json.dump(meta, f, indent=2)
+
+
+def load_index(path):
+    """Loads an artifact directory; returns (retriever, loaded_files_reference, rag_parameters, fingerprint)."""
+    from src import data_loader, embeddings
+
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    rag_parameters = meta["rag_parameters"]
+    # Queries are embedded with the backend the index was built with
+    backend = embeddings.get_backend(embeddings.backend_name(rag_parameters))
+    vectorstore = data_loader.load_vectorstore(os.path.join(path, VECTORSTORE_DIR), backend=backend)
+    retriever = vectorstore.as_retriever(search_kwargs={"k": rag_parameters.get("k")})
+    return retriever, meta.get("loaded_files_reference", []), rag_parameters, meta.get("fingerprint")
@@ -1,11 +1,33 @@
 import os
-from src import data_loader, connect_notion
+import json
+import hashlib
+from src import data_loader, connect_notion, enrichment, embeddings
+from src.sync_scheduler import NOTION_KEY
+from util import metrics, request_profile
 
-def initialize_system(adjusted_k = 10, adjusted_chunk_size= 1000):
+def fingerprint_documents(documents, *params):
+    """Content hash of the loaded documents and indexing parameters (stable across processes and restarts)."""
+    h = hashlib.sha256()
+    for param in params:
+        h.update(f"{param}\x1e".encode("utf-8"))
+    for doc in documents:
+        h.update(doc.metadata.get("source_key", "").encode("utf-8"))
+        h.update(str(doc.metadata.get("id", "")).encode("utf-8"))
+        h.update(doc.page_content.encode("utf-8"))
+        h.update(b"\x1e")
+    return h.hexdigest()
+
+def initialize_system(adjusted_k = 10, adjusted_chunk_size= 1000, with_fingerprint=False, embedding_backend=None):
     """
-    Loads documents, chunks them, and creates a vector store retriever.
+    Loads documents, chunks them, and creates a vector store retriever with the given embedding
+    backend (src/embeddings.py, default EMBEDDING_BACKEND).
+    With with_fingerprint=True, also returns a content fingerprint of the indexed data (documents, chunk
+    size, embedding model and enrichment analyzers; k only affects retrieval, so a k change can reuse
+    the same vector store).
     """
-    connect_notion.extract_pages()
+    backend = embeddings.get_backend(embedding_backend)
+    with metrics.INDEX_BUILD_SECONDS.labels(stage="notion_sync").time():
+        connect_notion.extract_pages()
 
     data_folder = os.path.join(os.getcwd(), "data")
     json_files = [
@@ -18,7 +40,8 @@ def initialize_system(adjusted_k = 10, adjusted_chunk_size= 1000):
         print("No JSON files found in local 'data' directory... fetching from upstash")
 
     print("=== Loading Datasets ===")
-    documents, keys = data_loader.load_dataset_from_upstash()
+    with metrics.INDEX_BUILD_SECONDS.labels(stage="load_datasets").time():
+        documents, keys = data_loader.load_dataset_from_upstash()
     print(f"Loaded {len(documents)} documents.")
 
     if not documents and not json_files:
@@ -27,14 +50,128 @@ def initialize_system(adjusted_k = 10, adjusted_chunk_size= 1000):
     #documents = data_loader.load_dataset_from_multiple_files(json_files)
     #print(f"Loaded {len(documents)} documents from {len(json_files)} file(s).")
 
-    print(f"\nUsing k={adjusted_k}, chunk_size={adjusted_chunk_size}.")
+    print(f"\nUsing k={adjusted_k}, chunk_size={adjusted_chunk_size}, embeddings={backend.model_id}.")
     print("\n=== Chunking Documents ===")
-    chunked_docs = data_loader.chunk_documents(documents, chunk_size=adjusted_chunk_size)
+    with metrics.INDEX_BUILD_SECONDS.labels(stage="chunking").time():
+        chunked_docs = data_loader.chunk_documents(documents, chunk_size=adjusted_chunk_size)
     print(f"Created {len(chunked_docs)} document chunks.")
 
+    print("\n=== Enriching Chunks ===")
+    with metrics.INDEX_BUILD_SECONDS.labels(stage="enrichment").time():
+        columns = enrichment.enrich(chunked_docs)
+    print(f"Added metadata: {', '.join(columns) or 'none'}.")
+
     print("\n=== Creating Vectorstore ===")
-    vectorstore = data_loader.create_vectorstore(chunked_docs)
+    with metrics.INDEX_BUILD_SECONDS.labels(stage="vectorstore").time():
+        vectorstore = data_loader.create_vectorstore(chunked_docs, backend=backend)
     retriever = vectorstore.as_retriever(search_kwargs={"k": adjusted_k})
     print("Vectorstore created and documents indexed.")
 
-    return retriever, keys
\ No newline at end of file
+    if with_fingerprint:
+        return retriever, keys, fingerprint_documents(documents, adjusted_chunk_size, backend.model_id, enrichment.signature())
+    return retriever, keys
+
+def update_system(retriever, changes, adjusted_k=10, adjusted_chunk_size=1000, loaded_files_reference=(), fingerprint=None,
+                  embedding_backend=None):
+    """
+    Incremental re-index for the data sync (src/sync_scheduler.py): applies `changes`
+    ({"notion": {"added", "changed", "removed"}: page ids, "upstash": ...: dataset keys}) to a copy of
+    the retriever's vector store. Only the added or changed pages and keys are loaded, chunked,
+    enriched and embedded; the chunks of changed or removed ones are deleted. The live store is not
+    modified. Returns (retriever, keys, fingerprint) like initialize_system; the fingerprint chains the
+    previous one with the changed documents.
+    """
+    backend = embeddings.get_backend(embedding_backend)
+    notion = changes.get("notion", {})
+    upstash = changes.get("upstash", {})
+    stale_pages = set(notion.get("changed", [])) | set(notion.get("removed", []))
+    stale_keys = set(upstash.get("changed", [])) | set(upstash.get("removed", []))
+
+    documents = []
+    if notion:
+        pages = set(notion.get("added", [])) | set(notion.get("changed", []))
+        with metrics.INDEX_BUILD_SECONDS.labels(stage="notion_sync").time():
+            rows = connect_notion.query_database()
+            connect_notion.save_to_upstash_redis(NOTION_KEY, rows)
+        documents.extend(data_loader.documents_from_entries([row for row in rows if row["id"] in pages], NOTION_KEY))
+    keys = [key for key in loaded_files_reference if key not in upstash.get("removed", [])]
+    with metrics.INDEX_BUILD_SECONDS.labels(stage="load_datasets").time():
+        for key in upstash.get("added", []) + upstash.get("changed", []):
+            documents.extend(data_loader.load_documents_by_key(key))
+            if key not in keys:
+                keys.append(key)
+
+    with metrics.INDEX_BUILD_SECONDS.labels(stage="chunking").time():
+        chunked_docs = data_loader.chunk_documents(documents, chunk_size=adjusted_chunk_size)
+    with metrics.INDEX_BUILD_SECONDS.labels(stage="enrichment").time():
+        enrichment.enrich(chunked_docs)
+
+    def remove(metadata):
+        source_key = metadata.get("source_key")
+        return source_key in stale_keys or (source_key == NOTION_KEY and metadata.get("id") in stale_pages)
+
+    with metrics.INDEX_BUILD_SECONDS.labels(stage="vectorstore").time():
+        vectorstore = data_loader.update_vectorstore(retriever.vectorstore, remove, chunked_docs, backend=backend)
+    print(f"Re-indexed {len(documents)} changed documents ({len(chunked_docs)} chunks), "
+          f"dropped the chunks of {len(stale_pages)} pages and {len(stale_keys)} keys.")
+
+    described = {source: {kind: sorted(items) for kind, items in kinds.items()} for source, kinds in changes.items()}
+    fingerprint = fingerprint_documents(documents, fingerprint, json.dumps(described, sort_keys=True))
+    return vectorstore.as_retriever(search_kwargs={"k": adjusted_k}), keys, fingerprint
+
+def retrieve_with_embedding(retriever, query):
+    """
+    Returns (documents, query_embedding) for the custom template retrievers and for LangChain FAISS retrievers.
+    The embedding is None when the retriever does not expose it.
+    """
+    if hasattr(retriever, "get_relevant_documents_with_embedding"):
+        # Template retrievers time their embedding and FAISS search stages themselves
+        with request_profile.span("Retriever.get_relevant_documents", k=retriever.k):
+            return retriever.get_relevant_documents_with_embedding(query)
+
+    vectorstore = getattr(retriever, "vectorstore", None)
+    embeddings = getattr(vectorstore, "embeddings", None)
+    if embeddings is None or not hasattr(vectorstore, "similarity_search_by_vector"):
+        with metrics.CHAT_STAGE_SECONDS.labels(stage="retrieval").time(), request_profile.span("Retriever.get_relevant_documents"):
+            return retriever.get_relevant_documents(query), None
+
+    k = retriever.search_kwargs.get("k", 4)
+    with request_profile.span("Retriever.get_relevant_documents", k=k):
+        with metrics.CHAT_STAGE_SECONDS.labels(stage="query_embedding").time(), request_profile.span("query_embedding"):
+            query_embedding = embeddings.embed_query(query)
+        with metrics.CHAT_STAGE_SECONDS.labels(stage="faiss_search").time(), request_profile.span("faiss_search"):
+            return vectorstore.similarity_search_by_vector(query_embedding, k=k), query_embedding
+
+def index_stats(retriever):
+    """
+    Size of the vector store behind a retriever: number of chunks, FAISS vectors, embedding dimension
+    and an estimate of its resident memory (vectors + chunk text). Works for the LangChain FAISS store
+    and the template stores; unknown values are None.
+    """
+    vectorstore = getattr(retriever, "vectorstore", None)
+    index = getattr(vectorstore, "index", None)
+    vectors = getattr(index, "ntotal", None)
+    dimension = getattr(index, "d", None)
+    index_bytes = vectors * dimension * 4 if vectors is not None and dimension is not None else None  # float32 flat index
+
+    chunks, text_bytes = None, None
+    documents = getattr(vectorstore, "documents", None)  # template stores (ChunkStore)
+    if documents is not None:
+        chunks = len(documents)
+        text_bytes = documents.nbytes if hasattr(documents, "nbytes") else None
+    else:
+        docstore = getattr(getattr(vectorstore, "docstore", None), "_dict", None)  # LangChain InMemoryDocstore
+        if docstore is not None:
+            chunks = len(docstore)
+            text_bytes = sum(len(doc.page_content.encode("utf-8")) for doc in docstore.values())
+
+    resident_bytes = None
+    if index_bytes is not None or text_bytes is not None:
+        resident_bytes = (index_bytes or 0) + (text_bytes or 0)
+    return {
+        "chunks": chunks,
+        "vectors": vectors,
+        "dimension": dimension,
+        "index_bytes": index_bytes,
+        "resident_bytes": resident_bytes,
+    }
@@ -0,0 +1,163 @@
+"""
+Semantic response cache for /chat.
+
+Answers are stored together with the (normalized) query embedding computed during retrieval and a
+hash of the retrieved context. A later question is served from the cache when its embedding is
+within the cosine threshold of a stored one *and* it retrieved exactly the same context, so a
+paraphrase only reuses an answer that was grounded on the same chunks.
+
+The cache is bounded (least recently used entries are evicted), entries expire after a TTL and
+everything is dropped when the index version changes.
+"""
+
+import os
+import time
+import hashlib
+import threading
+
+import numpy as np
+
+DEFAULT_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+DEFAULT_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+DEFAULT_TTL_S = float(os.getenv("SEMANTIC_CACHE_TTL_S", "3600"))
+
+
+def context_hash(documents, *extra):
+    """
+    Hashes the retrieved chunk set (order-independent) plus any extra inputs that shape the
+    answer, such as the conversation mode and history.
+    """
+    digests = sorted(
+        hashlib.sha1(
+            "\x1f".join([
+                str(doc.metadata.get("source_key", "")),
+                str(doc.metadata.get("id", "")),
+                doc.page_content,
+            ]).encode("utf-8")
+        ).hexdigest()
+        for doc in documents
+    )
+    h = hashlib.sha256()
+    for part in digests + [str(e) for e in extra]:
+        h.update(part.encode("utf-8"))
+        h.update(b"\x1e")
+    return h.hexdigest()
+
+
+class SemanticCache:
+    def __init__(self, threshold=DEFAULT_THRESHOLD, max_entries=DEFAULT_MAX_ENTRIES, ttl_s=DEFAULT_TTL_S):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._index_version = None
+        self._reset()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _reset(self):
+        self._vectors = None  # (max_entries, dim) matrix of unit-length query embeddings
+        self._hashes = [None] * self.max_entries
+        self._answers = [None] * self.max_entries
+        self._created = np.zeros(self.max_entries)
+        self._last_used = np.zeros(self.max_entries)
+        self._used = np.zeros(self.max_entries, dtype=bool)
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype="float32").ravel()
+        norm = float(np.linalg.norm(vector))
+        if norm == 0.0 or not np.isfinite(norm):
+            return None
+        return vector / norm
+
+    def _check_version(self, index_version):
+        if index_version != self._index_version:
+            if self._index_version is not None and self._used.any():
+                self.invalidations += 1
+            self._index_version = index_version
+            self._reset()
+
+    def invalidate(self):
+        """Drops all entries (e.g. after the agent configuration changed)."""
+        with self._lock:
+            if self._used.any():
+                self.invalidations += 1
+            self._reset()
+
+    def lookup(self, embedding, ctx_hash, index_version):
+        """Returns the cached answer for a similar query with the same context, or None."""
+        vector = self._normalize(embedding) if embedding is not None else None
+        with self._lock:
+            self._check_version(index_version)
+            if vector is None or self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                self.misses += 1
+                return None
+
+            now = time.time()
+            expired = self._used & (now - self._created > self.ttl_s)
+            if expired.any():
+                self.expirations += int(expired.sum())
+                for slot in np.flatnonzero(expired):
+                    self._free(slot)
+
+            candidates = [slot for slot in np.flatnonzero(self._used) if self._hashes[slot] == ctx_hash]
+            if candidates:
+                similarities = self._vectors[candidates] @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    slot = candidates[best]
+                    self._last_used[slot] = now
+                    self.hits += 1
+                    return self._answers[slot]
+            self.misses += 1
+            return None
+
+    def store(self, embedding, ctx_hash, index_version, answer):
+        vector = self._normalize(embedding) if embedding is not None else None
+        if vector is None:
+            return
+        with self._lock:
+            self._check_version(index_version)
+            if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                self._reset()
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype="float32")
+
+            free = np.flatnonzero(~self._used)
+            if len(free):
+                slot = int(free[0])
+            else:
+                slot = int(np.argmin(self._last_used))
+                self.evictions += 1
+
+            now = time.time()
+            self._vectors[slot] = vector
+            self._hashes[slot] = ctx_hash
+            self._answers[slot] = answer
+            self._created[slot] = now
+            self._last_used[slot] = now
+            self._used[slot] = True
+
+    def _free(self, slot):
+        self._used[slot] = False
+        self._hashes[slot] = None
+        self._answers[slot] = None
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": int(self._used.sum()),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "ttl_s": self.ttl_s,
+            "index_version": self._index_version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
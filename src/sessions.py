@@ -0,0 +1,184 @@
+"""
+Server-side conversation sessions with rolling summarization.
+
+Clients send a `session_id` and only the new question. The session keeps the last `memory` turns
+verbatim; older turns are folded into an incrementally updated summary, so the prompt size stays
+flat however long the conversation gets.
+
+Storage is pluggable (SESSION_BACKEND=memory|upstash). The summarizer is any callable
+`(previous_summary, turns) -> summary`; the LLM summarizer falls back to a truncating one on error.
+"""
+
+import os
+import json
+import time
+import uuid
+import weakref
+import threading
+from collections import OrderedDict
+
+import requests
+
+from util import metrics
+
+KEY_PREFIX = "truenotion:session:"
+SESSION_TTL_S = int(os.getenv("SESSION_TTL_S", str(7 * 24 * 3600)))
+MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+SUMMARY_MAX_CHARS = int(os.getenv("SESSION_SUMMARY_MAX_CHARS", "1500"))
+
+
+def new_session(session_id=None):
+    return {"session_id": session_id or uuid.uuid4().hex, "summary": "", "turns": [], "updated_at": time.time()}
+
+
+class MemorySessionStore:
+    """In-process session store with LRU eviction and TTL."""
+
+    def __init__(self, max_sessions=MAX_SESSIONS, ttl_s=SESSION_TTL_S):
+        self.max_sessions = max_sessions
+        self.ttl_s = ttl_s
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if time.time() - session["updated_at"] > self.ttl_s:
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return json.loads(json.dumps(session))
+
+    def save(self, session):
+        session["updated_at"] = time.time()
+        with self._lock:
+            self._sessions[session["session_id"]] = json.loads(json.dumps(session))
+            self._sessions.move_to_end(session["session_id"])
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+class UpstashSessionStore:
+    """Session store on Upstash Redis (REST API), shared by all backend instances."""
+
+    def __init__(self, url, token, ttl_s=SESSION_TTL_S, timeout_s=2.0):
+        self.url = url
+        self.ttl_s = ttl_s
+        self.timeout_s = timeout_s
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    def _command(self, *command):
+        with metrics.EXTERNAL_CALL_SECONDS.labels(service="upstash", operation=f"session_{command[0].lower()}").time():
+            response = requests.post(self.url, headers=self.headers, json=list(command), timeout=self.timeout_s)
+        if response.status_code != 200:
+            raise Exception(f"Upstash session command failed: {response.text}")
+        return response.json().get("result")
+
+    def get(self, session_id):
+        raw_value = self._command("GET", KEY_PREFIX + session_id)
+        return json.loads(raw_value) if raw_value else None
+
+    def save(self, session):
+        session["updated_at"] = time.time()
+        self._command("SET", KEY_PREFIX + session["session_id"], json.dumps(session, ensure_ascii=False), "EX", self.ttl_s)
+
+    def delete(self, session_id):
+        self._command("DEL", KEY_PREFIX + session_id)
+
+
+def store_from_env():
+    backend = os.getenv("SESSION_BACKEND", "memory").lower()
+    if backend == "upstash":
+        url = os.getenv("UPSTASH_REDIS_REST_URL")
+        token = os.getenv("UPSTASH_REDIS_REST_TOKEN")
+        if url and token:
+            return UpstashSessionStore(url, token)
+        print("Sessions: SESSION_BACKEND=upstash but Upstash credentials are missing; using in-memory sessions.")
+    elif backend != "memory":
+        print(f"Sessions: unknown SESSION_BACKEND '{backend}', using in-memory sessions.")
+    return MemorySessionStore()
+
+
+def truncating_summarizer(previous_summary, turns, max_chars=SUMMARY_MAX_CHARS):
+    """Non-LLM fallback: appends the folded turns and keeps the most recent `max_chars` characters."""
+    text = " ".join([previous_summary] + [f"User asked: {q} AI answered: {a}" for q, a in turns]).strip()
+    return text[-max_chars:]
+
+
+def llm_summarizer(llm_fn, max_chars=SUMMARY_MAX_CHARS):
+    """Builds a summarizer that asks `llm_fn(prompt) -> str` to update the running summary."""
+
+    def summarize(previous_summary, turns):
+        transcript = "\n".join(f"User: {q}\nAI: {a}" for q, a in turns)
+        prompt = (
+            "Update the running summary of a conversation between a user and an AI assistant.\n"
+            f"Keep names, dates, facts and open questions. Answer with the summary only, at most {max_chars // 6} words.\n\n"
+            f"Current summary:\n{previous_summary or '(empty)'}\n\n"
+            f"New turns to fold in:\n{transcript}"
+        )
+        try:
+            summary = (llm_fn(prompt) or "").strip()
+        except Exception as e:
+            print(f"Sessions: LLM summarization failed ({e}), using truncating summarizer.")
+            return truncating_summarizer(previous_summary, turns, max_chars)
+        return summary[:max_chars] if summary else truncating_summarizer(previous_summary, turns, max_chars)
+
+    return summarize
+
+
+class SessionManager:
+    def __init__(self, store, summarizer=truncating_summarizer):
+        self.store = store
+        self.summarizer = summarizer
+        self._locks = weakref.WeakValueDictionary()
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, session_id):
+        # Per-session lock around read-modify-write so concurrent requests of one session do not lose turns
+        with self._locks_guard:
+            lock = self._locks.get(session_id)
+            if lock is None:
+                lock = self._locks[session_id] = threading.Lock()
+            return lock
+
+    def load(self, session_id=None):
+        """Returns the stored session, or a new (unsaved) one with a fresh id when it is missing or expired."""
+        session = self.store.get(session_id) if session_id else None
+        return session if session is not None else new_session()
+
+    def append_turn(self, session_id, question, answer):
+        lock = self._lock(session_id)
+        with lock:
+            session = self.store.get(session_id) or new_session(session_id)
+            session["turns"].append([question, answer])
+            self.store.save(session)
+            return session
+
+    def compact(self, session_id, memory):
+        """
+        Folds every turn beyond the last `memory` turns into the rolling summary.
+        The summarizer (possibly an LLM call) runs without holding the lock; if the session was
+        compacted concurrently in the meantime, this run is dropped and the next turn retries.
+        """
+        session = self.store.get(session_id)
+        keep = max(int(memory or 0), 0)
+        if session is None or len(session["turns"]) <= keep:
+            return session
+        overflow = session["turns"][:len(session["turns"]) - keep]
+        summary = self.summarizer(session["summary"], overflow)
+
+        lock = self._lock(session_id)
+        with lock:
+            current = self.store.get(session_id)
+            if current is None or current["summary"] != session["summary"] or current["turns"][:len(overflow)] != overflow:
+                return current
+            current["summary"] = summary
+            current["turns"] = current["turns"][len(overflow):]
+            self.store.save(current)
+            return current
@@ -0,0 +1,174 @@
+"""
+One index shared by all worker processes of a deployment (uvicorn --workers N, gunicorn -w N).
+
+Without it every worker syncs Notion, embeds and holds its own FAISS index and chunk list at startup.
+With SHARED_INDEX_DIR set, the worker that takes the builder lock builds the index and publishes it as
+a numbered generation of artifacts (index_manager.save_index); all workers, the builder included,
+attach to the published files memory-mapped read-only, so the vectors and chunk text are held once
+in the page cache (the template stores; LangChain's docstore stays a per-process copy):
+
+    SHARED_INDEX_DIR/
+        GENERATION              number of the live generation, replaced atomically
+        generations/00000042/   index artifacts of generation 42
+        builder.lock            held by the builder worker while it runs
+        publish.lock            serializes publishing
+
+Workers poll GENERATION every SHARED_INDEX_POLL_S seconds and swap to a newer generation as soon as
+they see it, so all of them answer from the same build within one poll interval. Re-indexing on a
+rag_config change is left to the builder; an explicit POST /initialize on any worker builds
+and publishes a new generation. The last SHARED_INDEX_KEEP generations are kept on disk; requests
+still holding an older index keep their mapping until they finish. Requires POSIX file locks.
+"""
+
+import os
+import time
+import shutil
+import threading
+
+from src.index_manager import save_index, load_index, META_FILE
+from util import metrics
+
+POLL_INTERVAL_S = float(os.getenv("SHARED_INDEX_POLL_S", "2"))
+KEEP_GENERATIONS = int(os.getenv("SHARED_INDEX_KEEP", "3"))
+# How long a worker waits at startup for the builder's first generation
+ATTACH_TIMEOUT_S = float(os.getenv("SHARED_INDEX_ATTACH_TIMEOUT_S", "1800"))
+
+GENERATION_FILE = "GENERATION"
+GENERATIONS_DIR = "generations"
+
+
+class SharedIndex:
+    def __init__(self, root, poll_interval_s=POLL_INTERVAL_S, keep=KEEP_GENERATIONS):
+        self.root = root
+        self.poll_interval_s = poll_interval_s
+        self.keep = max(2, keep)
+        self.generation = 0  # generation this process has attached (or published)
+        self.is_builder = False
+        self.attached_at = None
+        self.attach_seconds = None
+        self._builder_lock_file = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        os.makedirs(os.path.join(root, GENERATIONS_DIR), exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        """A SharedIndex on SHARED_INDEX_DIR, or None when the directory is not configured."""
+        root = os.getenv("SHARED_INDEX_DIR")
+        return cls(root) if root else None
+
+    def become_builder(self):
+        """Takes the builder lock if no other worker holds it; the lock is held until the process exits."""
+        import fcntl
+
+        if self.is_builder:
+            return True
+        lock_file = open(os.path.join(self.root, "builder.lock"), "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._builder_lock_file = lock_file
+        self.is_builder = True
+        return True
+
+    def latest_generation(self):
+        """Number of the live generation on disk, 0 before the first publish."""
+        try:
+            with open(os.path.join(self.root, GENERATION_FILE)) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _path(self, generation):
+        return os.path.join(self.root, GENERATIONS_DIR, f"{generation:08d}")
+
+    def publish(self, retriever, loaded_files_reference, rag_parameters, fingerprint=None):
+        """Writes a built index as the next generation, makes it live and returns its number."""
+        import fcntl
+
+        with open(os.path.join(self.root, "publish.lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            generation = self.latest_generation() + 1
+            staging = os.path.join(self.root, GENERATIONS_DIR, f".staging-{generation:08d}-{os.getpid()}")
+            shutil.rmtree(staging, ignore_errors=True)
+            with metrics.INDEX_BUILD_SECONDS.labels(stage="publish").time():
+                save_index(staging, retriever, loaded_files_reference, rag_parameters, fingerprint)
+            os.replace(staging, self._path(generation))
+            with self._lock:
+                # Claimed before it goes live, so this process's watcher does not attach it a second time
+                self.generation = generation
+                pointer = os.path.join(self.root, f".{GENERATION_FILE}-{os.getpid()}")
+                with open(pointer, "w") as f:
+                    f.write(str(generation))
+                os.replace(pointer, os.path.join(self.root, GENERATION_FILE))
+            self._prune(generation)
+        print(f"Published shared index generation {generation}.")
+        return generation
+
+    def _prune(self, latest):
+        for name in os.listdir(os.path.join(self.root, GENERATIONS_DIR)):
+            if name.isdigit() and int(name) <= latest - self.keep:
+                shutil.rmtree(os.path.join(self.root, GENERATIONS_DIR, name), ignore_errors=True)
+
+    def attach(self, generation):
+        """Loads a published generation (memory-mapped); returns (retriever, loaded_files_reference, rag_parameters, fingerprint)."""
+        start = time.perf_counter()
+        built = load_index(self._path(generation))
+        self.attach_seconds = time.perf_counter() - start
+        self.attached_at = time.time()
+        with self._lock:
+            self.generation = max(self.generation, generation)
+        return built
+
+    def wait_and_attach(self, timeout=ATTACH_TIMEOUT_S):
+        """Blocks until the builder published a generation, then attaches the latest one."""
+        deadline = time.monotonic() + timeout
+        while True:
+            generation = self.latest_generation()
+            if generation and os.path.exists(os.path.join(self._path(generation), META_FILE)):
+                return self.attach(generation)
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"No shared index was published to {self.root} within {timeout:.0f}s.")
+            time.sleep(self.poll_interval_s)
+
+    def start(self, on_generation):
+        """Polls for newer generations in the background and calls `on_generation(built)` with each one attached."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._watch, args=(on_generation,), name="shared-index", daemon=True)
+        self._thread.start()
+
+    def _watch(self, on_generation):
+        while not self._stop.wait(self.poll_interval_s):
+            with self._lock:
+                previous, generation = self.generation, self.latest_generation()
+                if generation <= previous:
+                    continue
+                self.generation = generation
+            try:
+                on_generation(self.attach(generation))
+                print(f"Switched to shared index generation {generation}.")
+            except Exception as e:
+                print(f"Attaching shared index generation {generation} failed: {e}")
+                with self._lock:
+                    # Retried on the next poll
+                    if self.generation == generation:
+                        self.generation = previous
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        return {
+            "dir": self.root,
+            "role": "builder" if self.is_builder else "worker",
+            "pid": os.getpid(),
+            "generation": self.generation,
+            "latest_generation": self.latest_generation(),
+            "attached_at": self.attached_at,
+            "attach_seconds": round(self.attach_seconds, 4) if self.attach_seconds is not None else None,
+            "poll_interval_s": self.poll_interval_s,
+        }
@@ -0,0 +1,77 @@
+"""
+Single-flight coalescing of identical in-flight requests.
+
+Concurrent callers that use the same key share one computation: the first caller starts it, later
+callers wait for the same result instead of running their own retrieval and LLM call. The shared
+computation runs as its own task, so a caller that goes away does not cancel it for the others.
+When a computation finishes, the number of callers that shared it is recorded in
+truenotion_single_flight_waiters_per_flight.
+"""
+
+import asyncio
+
+from util import metrics
+
+
+class _Call:
+    __slots__ = ("task", "waiters", "callers")
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+        self.callers = 0  # callers that joined this computation, including the first
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+        self.executions = 0
+        self.coalesced = 0
+        self.max_waiters = 0
+
+    async def do(self, key, fn):
+        """
+        Runs `fn()` (a coroutine function) once per key at a time.
+        Returns (result, shared) where shared is True when the result came from another caller's run.
+        """
+        call = self._calls.get(key)
+        shared = call is not None
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            self.executions += 1
+            call.task.add_done_callback(lambda task, key=key, call=call: self._finish(key, call, task))
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        call.callers += 1
+        self.max_waiters = max(self.max_waiters, call.waiters)
+        try:
+            return await asyncio.shield(call.task), shared
+        finally:
+            call.waiters -= 1
+
+    def _finish(self, key, call, task):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        metrics.SINGLE_FLIGHT_WAITERS.observe(call.callers)
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every waiter went away
+            task.exception()
+
+    def waiters(self):
+        """Current number of waiters per in-flight key (keys shortened for display)."""
+        return {key[:16]: call.waiters for key, call in self._calls.items()}
+
+    def total_waiters(self):
+        return sum(call.waiters for call in self._calls.values())
+
+    def stats(self):
+        return {
+            "in_flight": len(self._calls),
+            "waiters": self.waiters(),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "max_waiters": self.max_waiters,
+        }
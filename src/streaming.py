@@ -0,0 +1,108 @@
+"""
+Helpers for Server-Sent Events (SSE) streaming of chat answers (/chat/stream).
+
+Generation runs in worker threads (CrewAI kickoff) or as a task on the event loop (the LLM
+router's async streams). Tokens are handed over through a TokenChannel and written to the client
+as SSE events:
+
+    event: sources   {"sources": [...], "mode": ...}   (always the first event)
+    event: token     {"token": "..."}
+    event: done      {"answer": "...", "mode": ...}
+    event: error     {"detail": "..."}
+"""
+
+import json
+import asyncio
+import threading
+from contextlib import contextmanager
+
+_DONE = object()
+
+# CrewAI emits stream chunk events on a global bus; chunks are routed to the sink bound to the
+# worker thread that runs the kickoff, so concurrent streams never mix.
+_thread_sink = threading.local()
+_listener_lock = threading.Lock()
+_listener_registered = False
+
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class TokenChannel:
+    """Thread-safe producer / async consumer channel for generated tokens."""
+
+    def __init__(self, loop):
+        self._loop = loop
+        self._queue = asyncio.Queue()
+
+    def put(self, token):
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, token)
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, _DONE)
+
+    async def __aiter__(self):
+        while True:
+            token = await self._queue.get()
+            if token is _DONE:
+                return
+            yield token
+
+
+class FinalAnswerFilter:
+    """
+    Drops the agent's ReAct scaffolding ('Thought: ...') and only forwards text that follows
+    the 'Final Answer:' marker.
+    """
+
+    MARKER = "Final Answer:"
+
+    def __init__(self, forward):
+        self._forward = forward
+        self._buffer = ""
+        self._open = False
+
+    def __call__(self, chunk):
+        if self._open:
+            self._forward(chunk)
+            return
+        self._buffer += chunk
+        position = self._buffer.find(self.MARKER)
+        if position >= 0:
+            self._open = True
+            rest = self._buffer[position + len(self.MARKER):].lstrip()
+            self._buffer = ""
+            if rest:
+                self._forward(rest)
+
+    @property
+    def forwarded_anything(self):
+        return self._open
+
+
+def _register_crew_listener():
+    global _listener_registered
+    with _listener_lock:
+        if _listener_registered:
+            return
+        from crewai.utilities.events import crewai_event_bus, LLMStreamChunkEvent
+
+        @crewai_event_bus.on(LLMStreamChunkEvent)
+        def _forward_chunk(source, event):
+            sink = getattr(_thread_sink, "sink", None)
+            if sink is not None and event.chunk and event.tool_call is None:
+                sink(event.chunk)
+
+        _listener_registered = True
+
+
+@contextmanager
+def crew_stream_sink(sink):
+    """Routes CrewAI stream chunks emitted on the current thread to `sink` for the duration of the block."""
+    _register_crew_listener()
+    _thread_sink.sink = sink
+    try:
+        yield
+    finally:
+        _thread_sink.sink = None
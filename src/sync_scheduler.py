@@ -0,0 +1,282 @@
+"""
+Background data sync: keeps the index fresh after Notion edits without /initialize calls or restarts.
+
+A scheduler thread polls the data sources every SYNC_INTERVAL_S seconds (0 disables polling; pushes
+still work) and keeps a content hash per item of each source:
+
+    notion    pages of the Notion database (one query, hashed per page id)
+    upstash   the other dataset keys in Upstash (e.g. uploaded data/*.json files)
+
+Comparing two snapshots gives the pages and keys that were added, changed or removed. Edits come in
+bursts, so changes are debounced: the re-index starts once the sources were quiet for SYNC_DEBOUNCE_S
+seconds, or at the latest SYNC_MAX_DELAY_S seconds after the first pending change. An edit that is
+reverted before then cancels out. A push (`notify`, e.g. from the Notion webhook endpoint) polls
+right away instead of waiting for the next interval.
+
+The re-index is a background rebuild (`on_change(changes)`) in which only new or changed chunks are
+embedded (embeddings.embed_chunks) and enriched (enrichment cache); unchanged chunks reuse their
+vectors. `on_change` returns None when it cannot start now (a rebuild is already running); the
+changes then stay pending and are retried when that rebuild finishes (`retry_deferred`), or after a
+delay that backs off from SYNC_DEBOUNCE_S (at least MIN_RETRY_S seconds).
+
+Poll intervals get +-SYNC_JITTER random jitter so replicas do not poll in lockstep. Failed polls back
+off exponentially from SYNC_BACKOFF_BASE_S up to SYNC_MAX_BACKOFF_S seconds.
+"""
+
+import os
+import json
+import hmac
+import time
+import random
+import hashlib
+import threading
+from collections import deque
+
+from util import metrics
+
+INTERVAL_S = float(os.getenv("SYNC_INTERVAL_S", "300"))
+JITTER = float(os.getenv("SYNC_JITTER", "0.1"))
+DEBOUNCE_S = float(os.getenv("SYNC_DEBOUNCE_S", "30"))
+MAX_DELAY_S = float(os.getenv("SYNC_MAX_DELAY_S", "300"))
+BACKOFF_BASE_S = float(os.getenv("SYNC_BACKOFF_BASE_S", "30"))
+MAX_BACKOFF_S = float(os.getenv("SYNC_MAX_BACKOFF_S", "1800"))
+# HMAC key of Notion's X-Notion-Signature header (the subscription's verification token)
+WEBHOOK_SECRET = os.getenv("SYNC_WEBHOOK_SECRET")
+HISTORY_SIZE = 20
+MIN_RETRY_S = 1.0
+
+# Written by every rebuild from the Notion query itself; covered by the notion source
+NOTION_KEY = "notion_database"
+
+
+def content_hash(value):
+    return hashlib.blake2b(json.dumps(value, sort_keys=True, ensure_ascii=False).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def notion_pages():
+    """{page id: content hash} of the pages of the Notion database."""
+    from src import connect_notion
+
+    return {row["id"]: content_hash(row["properties"]) for row in connect_notion.query_database()}
+
+
+def upstash_datasets():
+    """{key: content hash} of the dataset keys in Upstash, except the Notion rows."""
+    from src import data_loader
+
+    return {key: content_hash(data_loader.get_upstash_json_by_key(key)) for key in data_loader.list_upstash_keys() if key != NOTION_KEY}
+
+
+def verify_signature(body, signature, secret=WEBHOOK_SECRET):
+    """True when `signature` ("sha256=<hex>") is the HMAC-SHA256 of the raw request body under `secret`."""
+    if not secret or not signature:
+        return False
+    expected = "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature, expected)
+
+
+class SyncScheduler:
+    def __init__(self, on_change, sources=None, interval_s=INTERVAL_S, debounce_s=DEBOUNCE_S, max_delay_s=MAX_DELAY_S,
+                 jitter=JITTER, backoff_base_s=BACKOFF_BASE_S, max_backoff_s=MAX_BACKOFF_S):
+        # on_change(changes) starts the re-index and returns a description, or None to retry later
+        self.on_change = on_change
+        self.sources = sources if sources is not None else {"notion": notion_pages, "upstash": upstash_datasets}
+        self.interval_s = interval_s
+        self.debounce_s = debounce_s
+        self.max_delay_s = max(max_delay_s, debounce_s)
+        self.jitter = jitter
+        self.backoff_base_s = backoff_base_s
+        self.max_backoff_s = max_backoff_s
+        self._snapshots = {}  # source -> {item: content hash}
+        self._pending = {}  # source -> {item: content hash when the change was first seen (None: absent)}
+        self._pending_since = None
+        self._last_change_at = None
+        self._retry_at = None  # set while the re-index is deferred
+        self._deferrals = 0  # consecutive deferrals of the pending changes
+        self._history = deque(maxlen=HISTORY_SIZE)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.polls = 0
+        self.poll_errors = 0
+        self.failures = 0  # consecutive failed polls (or re-index starts), drives the backoff
+        self.pushes = 0
+        self.deferred = 0
+        self.last_poll_at = None
+        self.last_success_at = None
+        self.last_error = None
+        self.next_poll_at = None
+
+    # --- Change detection -------------------------------------------------------------------
+
+    def poll_once(self):
+        """Snapshots every source and records what changed since the previous poll; returns {source: count}."""
+        self.polls += 1
+        self.last_poll_at = time.time()
+        found = {}
+        try:
+            for source, snapshot_fn in self.sources.items():
+                snapshot = snapshot_fn()
+                with self._lock:
+                    previous = self._snapshots.get(source)
+                    self._snapshots[source] = snapshot
+                    if previous is None:
+                        continue  # first poll: the baseline the live index was built from
+                    changed = [item for item in set(previous) | set(snapshot) if previous.get(item) != snapshot.get(item)]
+                    if not changed:
+                        continue
+                    pending = self._pending.setdefault(source, {})
+                    for item in changed:
+                        pending.setdefault(item, previous.get(item))
+                    now = time.time()
+                    self._pending_since = self._pending_since or now
+                    self._last_change_at = now
+                found[source] = len(changed)
+        except Exception:
+            self.poll_errors += 1
+            metrics.SYNC_POLLS.labels(result="error").inc()
+            raise
+        self.last_success_at = time.time()
+        metrics.SYNC_POLLS.labels(result="changed" if found else "unchanged").inc()
+        return found
+
+    def pending_changes(self):
+        """Net changes since the live index: {source: {"added": [...], "changed": [...], "removed": [...]}}."""
+        changes = {}
+        with self._lock:
+            for source, items in self._pending.items():
+                current = self._snapshots.get(source, {})
+                kinds = {"added": [], "changed": [], "removed": []}
+                for item, base in items.items():
+                    now = current.get(item)
+                    if base == now:
+                        continue  # reverted
+                    kinds["added" if base is None else "removed" if now is None else "changed"].append(item)
+                if any(kinds.values()):
+                    changes[source] = kinds
+        return changes
+
+    def _due(self, now):
+        if self._pending_since is None:
+            return False
+        return now - self._last_change_at >= self.debounce_s or now - self._pending_since >= self.max_delay_s
+
+    def _clear_pending(self):
+        with self._lock:
+            self._pending = {}
+            self._pending_since = None
+            self._last_change_at = None
+            self._retry_at = None
+            self._deferrals = 0
+
+    def reindex_if_due(self):
+        """Starts the re-index for the pending changes once they are debounced; returns on_change's result."""
+        if not self._due(time.time()):
+            return None
+        changes = self.pending_changes()
+        if not changes:
+            self._clear_pending()
+            return None
+        pending_since = self._pending_since
+        result = self.on_change(changes)
+        if result is None:
+            self.deferred += 1
+            self._deferrals += 1
+            retry_s = max(self.debounce_s, MIN_RETRY_S) * 2 ** (self._deferrals - 1)
+            self._retry_at = time.time() + min(self.max_backoff_s, retry_s)
+            return None
+        self._clear_pending()
+        for source, kinds in changes.items():
+            for kind, items in kinds.items():
+                metrics.SYNC_CHANGES.labels(source=source, change=kind).inc(len(items))
+        self._history.append({
+            "changes": {source: {kind: len(items) for kind, items in kinds.items()} for source, kinds in changes.items()},
+            "pending_since": pending_since,
+            "started_at": time.time(),
+            "result": result,
+        })
+        print(f"Data sync: {self._history[-1]['changes']} -> {result}.")
+        return result
+
+    # --- Scheduling ------------------------------------------------------------------------
+
+    def notify(self, reason="push"):
+        """Polls right away, e.g. when a webhook reports an edit (the debounce still applies)."""
+        self.pushes += 1
+        print(f"Data sync requested ({reason}).")
+        self._wake.set()
+
+    def retry_deferred(self, *args):
+        """Retries a deferred re-index right away; registered as a listener for finished rebuilds."""
+        if self._retry_at is not None:
+            self._retry_at = None
+            self._wake.set()
+
+    def _next_delay(self):
+        if self.failures:
+            delay = min(self.max_backoff_s, self.backoff_base_s * 2 ** (self.failures - 1))
+        elif self._pending_since is not None:
+            # Poll again when the pending changes come due: further edits extend the quiet period
+            due_at = min(self._last_change_at + self.debounce_s, self._pending_since + self.max_delay_s)
+            if self._retry_at is not None:
+                # Deferred while a rebuild runs: not before the retry delay (or that rebuild's end)
+                due_at = max(due_at, self._retry_at)
+            delay = max(0.0, due_at - time.time())
+            if self.interval_s > 0:
+                delay = min(delay, self.interval_s)
+        elif self.interval_s > 0:
+            delay = self.interval_s
+        else:
+            return None  # pushes only
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="data-sync", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        delay = 0.0  # baseline snapshot right away
+        while True:
+            self.next_poll_at = time.time() + delay if delay is not None else None
+            self._wake.wait(delay)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            try:
+                self.poll_once()
+                self.reindex_if_due()
+                self.failures = 0
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                print(f"Data sync failed ({self.failures} in a row): {e}")
+            delay = self._next_delay()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def stats(self):
+        changes = self.pending_changes()
+        return {
+            "running": self._thread is not None and not self._stop.is_set(),
+            "interval_s": self.interval_s,
+            "debounce_s": self.debounce_s,
+            "max_delay_s": self.max_delay_s,
+            "sources": {source: len(snapshot) for source, snapshot in self._snapshots.items()},
+            "pending": {source: {kind: len(items) for kind, items in kinds.items()} for source, kinds in changes.items()},
+            "pending_since": self._pending_since,
+            "polls": self.polls,
+            "poll_errors": self.poll_errors,
+            "consecutive_failures": self.failures,
+            "pushes": self.pushes,
+            "deferred": self.deferred,
+            "last_poll_at": self.last_poll_at,
+            "last_success_at": self.last_success_at,
+            "next_poll_at": self.next_poll_at,
+            "last_error": self.last_error,
+            "history": list(self._history),
+        }
@@ -13,14 +13,8 @@ import os
 import json
 import requests
 from dotenv import load_dotenv
-from src import connect_notion
-
-# Custom Vectorstore
-import faiss
-import numpy as np
-
-# Remove local model dependency and use remote API for embeddings
-from openai import OpenAI
+from src import connect_notion, embeddings, vectorstore
+from src.chunk_store import ChunkStore
 
 # Define Document class
 class Document:
@@ -46,14 +40,8 @@ HEADERS = {
     "Authorization": f"Bearer {UPSTASH_REDIS_REST_TOKEN}"
 }
 
-# Initialize OpenAI client for remote embeddings from DeepInfra
-openai = OpenAI(
-    api_key=DEEPINFRA_TOKEN,
-    base_url="https://api.deepinfra.com/v1/openai",
-)
-
 def list_upstash_keys():
-    """Fetch all keys from Upstash Redis, excluding 'agent_config' and 'rag_config'."""
+    """Fetch all keys from Upstash Redis, excluding 'agent_config', 'rag_config' and internal 'truenotion:' keys."""
     url = f"{UPSTASH_REDIS_REST_URL}"
     headers = {
         "Authorization": f"Bearer {UPSTASH_REDIS_REST_TOKEN}",
@@ -64,9 +52,9 @@ def list_upstash_keys():
     if response.status_code != 200:
         raise Exception(f"Failed to list keys: {response.text}")
     keys = response.json().get("result", [])
-    # Exclude 'agent_config' and 'rag_config'
+    # Exclude 'agent_config', 'rag_config' and internal keys (e.g. cached answers)
     exclude_keys = {"agent_config", "rag_config"}
-    return [key for key in keys if key not in exclude_keys]
+    return [key for key in keys if key not in exclude_keys and not key.startswith("truenotion:")]
 
 def get_upstash_json_by_key(key):
     """Get and parse JSON value for a specific key."""
@@ -107,80 +95,37 @@ def chunk_documents(documents, chunk_size=1000, chunk_overlap=50):
     """ 
     Splits documents into smaller chunks to improve retrieval performance.
     This implementation splits the text into fixed-size chunks with overlap.
+    Chunks are stored in a columnar ChunkStore instead of one Document object per chunk.
     """
-    chunked_docs = []
+    chunked_docs = ChunkStore()
     for doc in documents:
         text = doc.page_content
         start = 0
         while start < len(text):
             end = start + chunk_size
             chunk = text[start:end]
-            chunked_docs.append(Document(page_content=chunk, metadata=doc.metadata))
+            chunked_docs.append(chunk, doc.metadata)
             start += chunk_size - chunk_overlap
     return chunked_docs
 
-# Define a VectorStore class using FAISS and remote OpenAI embeddings
-class VectorStore:
-    def __init__(self, index, documents, dim, embed_fn):
-        self.index = index
-        self.documents = documents
-        self.dim = dim
-        self.embed_fn = embed_fn
-
-    def retrieve(self, query, k=10):
-        # Compute the query embedding with the remote API
-        query_embedding = np.array(self.embed_fn(query), dtype="float32").reshape(1, self.dim)
-        distances, indices = self.index.search(query_embedding, k)
-        results = [self.documents[i] for i in indices[0] if i < len(self.documents)]
-        return results
-
-    def as_retriever(self, search_kwargs):
-        k = search_kwargs.get("k", 10)
-        return Retriever(vectorstore=self, k=k)
-
-# Define a Retriever class to mimic LangChain's retriever interface
-class Retriever:
-    def __init__(self, vectorstore, k):
-        self.vectorstore = vectorstore
-        self.k = k
-
-    def get_relevant_documents(self, query):
-        return self.vectorstore.retrieve(query, self.k)
+# FAISS vectorstore and retriever shared by all embedding backends (src/vectorstore.py)
+VectorStore = vectorstore.VectorStore
+Retriever = vectorstore.Retriever
 
 def create_vectorstore(documents):
     """
-    Creates a vectorstore by embedding document chunks using the remote OpenAI client.
-    This version uses the API response format as defined in the official documentation.
+    Creates a vectorstore by embedding document chunks with the remote DeepInfra API
+    (the deepinfra embedding backend, batched requests).
     """
-    embeddings = []
-    for doc in documents:
-        response = openai.embeddings.create(
-            model="sentence-transformers/all-MiniLM-L6-v2",
-            input=doc.page_content,
-            encoding_format="float"
-        )
-        # For string inputs, the official doc shows that the embedding is found in response.data[0].embedding
-        embedding = np.array(response.data[0].embedding, dtype="float32")
-        embeddings.append(embedding)
-    
-    embeddings_np = np.array(embeddings, dtype="float32")
-    if len(embeddings_np) == 0:
-        raise ValueError("No embeddings to index.")
-    dim = embeddings_np.shape[1]
-    index = faiss.IndexFlatL2(dim)
-    index.add(embeddings_np)
-    
-    # Define an embedding function for queries using the same remote API call.
-    def embed_fn(text):
-        response = openai.embeddings.create(
-            model="sentence-transformers/all-MiniLM-L6-v2",
-            input=text,
-            encoding_format="float"
-        )
-        return response.data[0].embedding
-    
-    vectorstore = VectorStore(index=index, documents=documents, dim=dim, embed_fn=embed_fn)
-    return vectorstore
+    return vectorstore.build(documents, embeddings.get_backend("deepinfra"))
+
+def save_vectorstore(store, path):
+    """Persists a vectorstore built by create_vectorstore to a directory (FAISS index + ChunkStore files)."""
+    vectorstore.save(store, path)
+
+def load_vectorstore(path):
+    """Loads a vectorstore written by save_vectorstore; the FAISS vectors and chunk store are memory-mapped read-only."""
+    return vectorstore.load(path, embeddings.get_backend("deepinfra"))
 
 def upload_agent_config_to_upstash(filepath="agents/agent_config.json", key="agent_config"):
     """
@@ -9,12 +9,8 @@ import os
 import json
 import requests
 from dotenv import load_dotenv
-from src import connect_notion
-
-# Custom Vectorstore
-import faiss
-import numpy as np
-from gensim.models import KeyedVectors
+from src import connect_notion, embeddings, vectorstore
+from src.chunk_store import ChunkStore
 
 # Define Document class
 class Document:
@@ -40,7 +36,7 @@ HEADERS = {
 
 
 def list_upstash_keys():
-    """Fetch all keys from Upstash Redis, excluding 'agent_config' and 'rag_config'."""
+    """Fetch all keys from Upstash Redis, excluding 'agent_config', 'rag_config' and internal 'truenotion:' keys."""
     url = f"{UPSTASH_REDIS_REST_URL}"
     headers = {
         "Authorization": f"Bearer {UPSTASH_REDIS_REST_TOKEN}",
@@ -54,9 +50,9 @@ def list_upstash_keys():
 
     keys = response.json().get("result", [])
 
-    # Exclude 'agent_config' and 'rag_config'
+    # Exclude 'agent_config', 'rag_config' and internal keys (e.g. cached answers)
     exclude_keys = {"agent_config", "rag_config"}
-    return [key for key in keys if key not in exclude_keys]
+    return [key for key in keys if key not in exclude_keys and not key.startswith("truenotion:")]
 
 
 def get_upstash_json_by_key(key):
@@ -105,96 +101,60 @@ def chunk_documents(documents, chunk_size=1000, chunk_overlap=50):
     """
     Splits documents into smaller chunks to improve retrieval performance.
     This implementation splits the text into fixed-size chunks with overlap.
+    Chunks are stored in a columnar ChunkStore instead of one Document object per chunk.
     """
-    chunked_docs = []
+    chunked_docs = ChunkStore()
     for doc in documents:
         text = doc.page_content
         start = 0
         while start < len(text):
             end = start + chunk_size
             chunk = text[start:end]
-            chunked_docs.append(Document(page_content=chunk, metadata=doc.metadata))
+            chunked_docs.append(chunk, doc.metadata)
             start += chunk_size - chunk_overlap
     return chunked_docs
 
 
-# Define a VectorStore class using FAISS and Word2Vec based embeddings
-class VectorStore:
-    def __init__(self, index, documents, model, dim):
-        self.index = index
-        self.documents = documents
-        self.model = model
-        self.dim = dim
-
-    def retrieve(self, query, k=10):
-        # Compute the query embedding using our Word2Vec-based model
-        query_embedding = self.model.encode(query)
-        query_embedding = np.array(query_embedding, dtype="float32").reshape(1, self.dim)
-        distances, indices = self.index.search(query_embedding, k)
-        results = [self.documents[i] for i in indices[0] if i < len(self.documents)]
-        return results
-
-    def as_retriever(self, search_kwargs):
-        k = search_kwargs.get("k", 10)
-        return Retriever(vectorstore=self, k=k)
-
-
-# Define a Retriever class to mimic LangChain's retriever interface
-class Retriever:
-    def __init__(self, vectorstore, k):
-        self.vectorstore = vectorstore
-        self.k = k
-
-    def get_relevant_documents(self, query):
-        return self.vectorstore.retrieve(query, self.k)
-
-
-# Define a wrapper for Word2Vec embeddings to mimic SentenceTransformer's encode method
-class Word2VecEmbeddings:
-    def __init__(self, model):
-        self.model = model
-        self.dim = self.model.vector_size
-
-    def encode(self, text):
-        # Simple tokenization by splitting on whitespace; more advanced tokenizing may be used.
-        tokens = text.split()
-        vectors = []
-        for token in tokens:
-            # For gensim 4.x, check using key_to_index
-            if token in self.model.key_to_index:
-                vectors.append(self.model.get_vector(token))
-        if not vectors:
-            # Return a zero vector if no token is in the vocabulary
-            return np.zeros(self.dim)
-        return np.mean(vectors, axis=0)
-
-
-def create_vectorstore(documents):
+# FAISS vectorstore and retriever shared by all embedding backends (src/vectorstore.py);
+# Word2VecEmbeddings is the GloVe embedding backend (src/embeddings.py)
+VectorStore = vectorstore.VectorStore
+Retriever = vectorstore.Retriever
+Word2VecEmbeddings = embeddings.WordVectorEmbeddings
+
+
+def load_glove_embeddings():
+    """
+    The local GloVe model (memory-mapped) as embedding backend, loaded once per process:
+    every vectorstore (rebuilds, tenant indexes) shares the same vocabulary.
+    """
+    return embeddings.get_backend("glove")
+
+
+def create_vectorstore(documents, model=None):
     """
-    Creates a vectorstore by embedding document chunks using a local lightweight GloVe model.
+    Creates a vectorstore by embedding document chunks in batches using a local lightweight GloVe model
+    (or the given embedding backend `model`, e.g. in benchmarks).
     Uses FAISS for vector similarity search.
     This function no longer performs any remote server action.
     """
-    # Load the local GloVe model from the designated directory.
-    model_path = os.path.join("models", "glove-wiki-gigaword-50", "glove-wiki-gigaword-50.model")
-    if not os.path.exists(model_path):
-        raise FileNotFoundError(f"Local model file not found at {model_path}")
-    glove_model = KeyedVectors.load(model_path, mmap='r')
-    model = Word2VecEmbeddings(glove_model)
-
-    embeddings = []
-    for doc in documents:
-        embedding = model.encode(doc.page_content)
-        embeddings.append(embedding)
-    embeddings_np = np.array(embeddings, dtype="float32")
-    if len(embeddings_np) == 0:
-        raise ValueError("No embeddings to index.")
-    dim = embeddings_np.shape[1]
-    # Create a FAISS index with controlled (single-threaded) behavior.
-    index = faiss.IndexFlatL2(dim)
-    index.add(embeddings_np)
-    vectorstore = VectorStore(index=index, documents=documents, model=model, dim=dim)
-    return vectorstore
+    if model is None:
+        model = load_glove_embeddings()
+    return vectorstore.build(documents, model)
+
+
+def save_vectorstore(store, path):
+    """Persists a vectorstore built by create_vectorstore to a directory (FAISS index + ChunkStore files)."""
+    vectorstore.save(store, path)
+
+
+def load_vectorstore(path, model=None):
+    """
+    Loads a vectorstore written by save_vectorstore. The FAISS vectors and the chunk store are
+    memory-mapped read-only, so processes loading the same files share their pages.
+    """
+    if model is None:
+        model = load_glove_embeddings()
+    return vectorstore.load(path, model)
 
 
 def upload_agent_config_to_upstash(filepath="agents/agent_config.json", key="agent_config"):
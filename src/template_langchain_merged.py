@@ -7,11 +7,10 @@ import os
 import json
 import requests
 from dotenv import load_dotenv
-from src import connect_notion
+from src import connect_notion, embeddings
 
 from langchain.docstore.document import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.embeddings import HuggingFaceEmbeddings
 from langchain.vectorstores import FAISS
 
 # Define our own Document class to replace LangChain's Document
@@ -37,7 +36,7 @@ HEADERS = {
 }
 
 def list_upstash_keys():
-    """Fetch all keys from Upstash Redis, excluding 'agent_config' and 'rag_config'."""
+    """Fetch all keys from Upstash Redis, excluding 'agent_config', 'rag_config' and internal 'truenotion:' keys."""
     url = f"{UPSTASH_REDIS_REST_URL}"
     headers = {
         "Authorization": f"Bearer {UPSTASH_REDIS_REST_TOKEN}",
@@ -50,9 +49,9 @@ def list_upstash_keys():
         raise Exception(f"Failed to list keys: {response.text}")
 
     keys = response.json().get("result", [])
-    # Exclude 'agent_config' and 'rag_config'
+    # Exclude 'agent_config', 'rag_config' and internal keys (e.g. cached answers)
     exclude_keys = {"agent_config", "rag_config"}
-    return [key for key in keys if key not in exclude_keys]
+    return [key for key in keys if key not in exclude_keys and not key.startswith("truenotion:")]
 
 def get_upstash_json_by_key(key):
     """Get and parse JSON value for a specific key."""
@@ -112,11 +111,11 @@ def chunk_documents(documents, chunk_size=1000, chunk_overlap=50):
 
 def create_vectorstore(documents):
     """
-    Creates a vectorstore by embedding document chunks using a HuggingFaceEmbeddings model from LangChain.
+    Creates a vectorstore by embedding document chunks using a HuggingFaceEmbeddings model from LangChain
+    (the huggingface embedding backend, loaded once per process).
     Uses FAISS for vector similarity search.
     """
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    vectorstore = FAISS.from_documents(documents, embeddings)
+    vectorstore = FAISS.from_documents(documents, embeddings.get_backend("huggingface").langchain)
     return vectorstore
 
 def upload_agent_config_to_upstash(filepath="agents/agent_config.json", key="agent_config"):
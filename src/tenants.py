@@ -0,0 +1,302 @@
+"""
+Multi-tenant index manager: one backend process serving the indexes of many workspaces.
+
+Every tenant (a Notion database + Upstash namespace) has its index persisted as an artifact
+directory (index_manager.save_index) under TENANT_ARTIFACTS_DIR/<tenant>/.
+
+Artifacts are built offline by running the normal index build with the tenant's credentials
+(NOTION_TOKEN, DATABASE_ID, UPSTASH_* in the environment):
+
+    python -m src.tenants build acme --k 10 --chunk-size 1000
+
+The first build of a tenant prints its access token (only a SHA-256 of it is kept, in the tenant's
+token.sha256); `python -m src.tenants token acme` issues a new one and revokes the old one.
+
+/chat and /chat/stream pick the tenant from the X-Tenant header (no header: the process's own index);
+the request must carry the tenant's token in X-Tenant-Token, otherwise it is refused before anything
+is loaded.
+A tenant's index is loaded on its first request and kept resident while the resident indexes fit in
+TENANT_RAM_BUDGET_MB; loading one more evicts the least recently used tenants first. Requests that
+already hold an evicted index keep using it until they finish.
+"""
+
+import os
+import re
+import hmac
+import time
+import hashlib
+import secrets
+import argparse
+import itertools
+import threading
+from collections import OrderedDict
+
+from src.index_manager import IndexSnapshot, save_index, load_index, META_FILE
+from util import metrics
+
+ARTIFACTS_DIR = os.getenv("TENANT_ARTIFACTS_DIR", os.path.join("artifacts", "tenants"))
+RAM_BUDGET_MB = float(os.getenv("TENANT_RAM_BUDGET_MB", "1024"))
+TENANT_HEADER = "X-Tenant"
+TENANT_TOKEN_HEADER = "X-Tenant-Token"
+TOKEN_FILE = "token.sha256"
+_TENANT_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+
+
+class UnknownTenant(Exception):
+    """No artifacts exist for the tenant."""
+
+
+class TenantForbidden(Exception):
+    """The request's tenant token is missing or does not match the tenant's."""
+
+
+def validate_tenant(tenant):
+    """Tenant ids name artifact directories: letters, digits, '-' and '_' only (ValueError otherwise)."""
+    if not _TENANT_RE.match(tenant or ""):
+        raise ValueError(f"Invalid tenant id '{tenant}': use up to 64 letters, digits, '-' or '_'.")
+    return tenant
+
+
+def save_tenant_index(root, tenant, retriever, loaded_files_reference, rag_parameters, fingerprint=None):
+    """Writes a built index as the tenant's artifacts (replacing the previous ones)."""
+    path = os.path.join(root, validate_tenant(tenant))
+    save_index(path, retriever, loaded_files_reference, rag_parameters, fingerprint)
+    return path
+
+
+def _token_hash(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def has_token(root, tenant):
+    return os.path.exists(os.path.join(root, tenant, TOKEN_FILE))
+
+
+def issue_token(root, tenant):
+    """Creates a new access token for the tenant (replacing, and so revoking, the previous one) and returns it."""
+    path = os.path.join(root, validate_tenant(tenant))
+    os.makedirs(path, exist_ok=True)
+    token = secrets.token_urlsafe(32)
+    with open(os.path.join(path, TOKEN_FILE), "w") as f:
+        f.write(_token_hash(token))
+    return token
+
+
+def _directory_bytes(path):
+    total = 0
+    for directory, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(directory, name))
+    return total
+
+
+class _Resident:
+    __slots__ = ("snapshot", "resident_bytes", "load_seconds", "loaded_at", "last_used", "requests")
+
+    def __init__(self, snapshot, resident_bytes, load_seconds):
+        self.snapshot = snapshot
+        self.resident_bytes = resident_bytes
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.requests = 0
+
+
+class TenantIndexManager:
+    def __init__(self, root=ARTIFACTS_DIR, ram_budget_bytes=RAM_BUDGET_MB * 1024 * 1024, load_fn=load_index):
+        self.root = root
+        self.ram_budget_bytes = ram_budget_bytes
+        self.load_fn = load_fn
+        self._resident = OrderedDict()  # tenant -> _Resident, least recently used first
+        self._lock = threading.Lock()
+        self._load_locks = {}  # tenant -> [lock, waiters] while a load is in flight, so concurrent first requests load a tenant once
+        self._versions = itertools.count(1)
+        self._evict_listeners = []
+        self.loads = 0
+        self.evictions = 0
+
+    def add_evict_listener(self, listener):
+        """Registers `listener(tenant)`, called after a tenant's index was evicted (e.g. to drop its caches)."""
+        self._evict_listeners.append(listener)
+
+    def exists(self, tenant):
+        return os.path.exists(os.path.join(self.root, tenant, META_FILE))
+
+    def authenticate(self, tenant, token):
+        """
+        Checks `token` against the tenant's token hash (TenantForbidden when it is missing or wrong, also for
+        tenants without artifacts, so tenant ids cannot be probed); ValueError for invalid tenant ids.
+        """
+        validate_tenant(tenant)
+        try:
+            with open(os.path.join(self.root, tenant, TOKEN_FILE)) as f:
+                expected = f.read().strip()
+        except FileNotFoundError:
+            expected = None
+        if not (expected and token and hmac.compare_digest(_token_hash(token), expected)):
+            raise TenantForbidden(f"A valid {TENANT_TOKEN_HEADER} is required for tenant '{tenant}'.")
+
+    def get_resident(self, tenant):
+        """The tenant's IndexSnapshot when it is resident (marked as most recently used), else None."""
+        with self._lock:
+            entry = self._resident.get(tenant)
+            if entry is None:
+                return None
+            self._resident.move_to_end(tenant)
+            entry.last_used = time.time()
+            entry.requests += 1
+        metrics.TENANT_INDEX_REQUESTS.labels(result="resident").inc()
+        return entry.snapshot
+
+    def get(self, tenant):
+        """The tenant's IndexSnapshot, loading it from its artifacts first if needed (blocking)."""
+        validate_tenant(tenant)
+        snapshot = self.get_resident(tenant)
+        if snapshot is not None:
+            return snapshot
+        with self._lock:
+            load_lock = self._load_locks.setdefault(tenant, [threading.Lock(), 0])
+            load_lock[1] += 1
+        try:
+            with load_lock[0]:
+                snapshot = self.get_resident(tenant)
+                if snapshot is not None:
+                    return snapshot
+                return self._load(tenant)
+        finally:
+            # The last waiter drops the lock, so only tenants with a load in flight hold an entry
+            with self._lock:
+                load_lock[1] -= 1
+                if load_lock[1] == 0:
+                    del self._load_locks[tenant]
+
+    def _load(self, tenant):
+        if not self.exists(tenant):
+            raise UnknownTenant(f"No index artifacts for tenant '{tenant}'.")
+        path = os.path.join(self.root, tenant)
+        start = time.perf_counter()
+        retriever, loaded_files_reference, rag_parameters, fingerprint = self.load_fn(path)
+        load_seconds = time.perf_counter() - start
+        metrics.TENANT_INDEX_LOAD_SECONDS.observe(load_seconds)
+        metrics.TENANT_INDEX_REQUESTS.labels(result="loaded").inc()
+
+        from src import process
+
+        resident_bytes = process.index_stats(retriever).get("resident_bytes") or _directory_bytes(path)
+        snapshot = IndexSnapshot(next(self._versions), retriever, loaded_files_reference, rag_parameters, fingerprint, tenant=tenant)
+        entry = _Resident(snapshot, resident_bytes, load_seconds)
+        entry.requests = 1
+        with self._lock:
+            self._resident[tenant] = entry
+            self.loads += 1
+            evicted = self._evict_over_budget(keep=tenant)
+        for name in evicted:
+            self._notify_evicted(name)
+        print(f"Loaded index of tenant '{tenant}' in {load_seconds:.2f}s ({resident_bytes / 1e6:.1f} MB)"
+              + (f", evicted {', '.join(evicted)}." if evicted else "."))
+        return snapshot
+
+    def _evict_over_budget(self, keep):
+        """Drops least recently used tenants until the resident ones fit the budget (never `keep`)."""
+        evicted = []
+        while self.resident_bytes > self.ram_budget_bytes:
+            victim = next((tenant for tenant in self._resident if tenant != keep), None)
+            if victim is None:
+                break  # a single tenant above the budget stays resident
+            del self._resident[victim]
+            self.evictions += 1
+            evicted.append(victim)
+        return evicted
+
+    def _notify_evicted(self, tenant):
+        metrics.TENANT_INDEX_EVICTIONS.inc()
+        for listener in self._evict_listeners:
+            try:
+                listener(tenant)
+            except Exception as e:
+                print(f"Tenant evict listener failed: {e}")
+
+    def evict(self, tenant):
+        """Drops a tenant's resident index (its next request reloads the artifacts); True if it was resident."""
+        with self._lock:
+            entry = self._resident.pop(tenant, None)
+            if entry is not None:
+                self.evictions += 1
+        if entry is not None:
+            self._notify_evicted(tenant)
+        return entry is not None
+
+    @property
+    def resident_bytes(self):
+        return sum(entry.resident_bytes for entry in self._resident.values())
+
+    def resident(self):
+        """(tenant, resident bytes, last load seconds) of every resident tenant, for /metrics."""
+        with self._lock:
+            return [(tenant, entry.resident_bytes, entry.load_seconds) for tenant, entry in self._resident.items()]
+
+    def stats(self):
+        with self._lock:
+            tenants = {
+                tenant: {
+                    "resident_bytes": entry.resident_bytes,
+                    "load_seconds": round(entry.load_seconds, 4),
+                    "loaded_at": entry.loaded_at,
+                    "last_used": entry.last_used,
+                    "requests": entry.requests,
+                    "index_version": entry.snapshot.version,
+                }
+                for tenant, entry in reversed(self._resident.items())
+            }
+            return {
+                "artifacts_dir": self.root,
+                "ram_budget_bytes": int(self.ram_budget_bytes),
+                "resident_bytes": self.resident_bytes,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "tenants": tenants,
+            }
+
+
+def build(tenant, k, chunk_size, memory=4, embedding_backend=None, root=ARTIFACTS_DIR):
+    """Builds the tenant's index with the current environment's Notion/Upstash credentials and saves it."""
+    from src import process, embeddings
+
+    rag_parameters = {"k": k, "chunk_size": chunk_size, "memory": memory,
+                      "embedding_backend": embedding_backend or embeddings.DEFAULT_BACKEND}
+    retriever, loaded_files_reference, fingerprint = process.initialize_system(
+        adjusted_k=k, adjusted_chunk_size=chunk_size, with_fingerprint=True,
+        embedding_backend=rag_parameters["embedding_backend"],
+    )
+    return save_tenant_index(root, tenant, retriever, loaded_files_reference, rag_parameters, fingerprint)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build per-tenant index artifacts.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="build and save one tenant's index")
+    build_parser.add_argument("tenant")
+    build_parser.add_argument("--k", type=int, default=10)
+    build_parser.add_argument("--chunk-size", type=int, default=1000)
+    build_parser.add_argument("--memory", type=int, default=4)
+    build_parser.add_argument("--embedding-backend", help="embedding backend (default: EMBEDDING_BACKEND)")
+    build_parser.add_argument("--root", default=ARTIFACTS_DIR)
+    token_parser = subparsers.add_parser("token", help="issue a new access token for a tenant (revokes the old one)")
+    token_parser.add_argument("tenant")
+    token_parser.add_argument("--root", default=ARTIFACTS_DIR)
+    args = parser.parse_args(argv)
+
+    validate_tenant(args.tenant)
+    if args.command == "token":
+        print(f"New {TENANT_TOKEN_HEADER} of tenant '{args.tenant}': {issue_token(args.root, args.tenant)}")
+        return 0
+    path = build(args.tenant, args.k, args.chunk_size, memory=args.memory,
+                 embedding_backend=args.embedding_backend, root=args.root)
+    print(f"Saved index artifacts of tenant '{args.tenant}' to {path}")
+    if not has_token(args.root, args.tenant):
+        print(f"{TENANT_TOKEN_HEADER} of tenant '{args.tenant}' (shown once): {issue_token(args.root, args.tenant)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
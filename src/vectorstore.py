@@ -0,0 +1,122 @@
+"""
+FAISS vector store over a columnar ChunkStore, for any embedding backend (src/embeddings.py).
+
+Used by the GloVe and DeepInfra backends (and the templates); the huggingface backend keeps
+LangChain's FAISS store. Chunks are embedded with the backend's embed_batch in batches of
+EMBED_BATCH_SIZE (through the embedding cache), queries with embed_query.
+"""
+
+import os
+
+import numpy as np
+
+from src import embeddings
+from src.chunk_store import ChunkStore
+from util import metrics, request_profile
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+
+
+class VectorStore:
+    def __init__(self, index, documents, backend):
+        self.index = index
+        self.documents = documents
+        self.backend = backend
+        self.dim = index.d
+
+    def retrieve(self, query, k=10):
+        results, _ = self.retrieve_with_embedding(query, k)
+        return results
+
+    def retrieve_with_embedding(self, query, k=10):
+        """Like retrieve, but also returns the query embedding (reused e.g. by the semantic response cache)."""
+        with metrics.CHAT_STAGE_SECONDS.labels(stage="query_embedding").time(), request_profile.span("query_embedding"):
+            query_embedding = np.asarray(self.backend.embed_query(query), dtype="float32").reshape(1, self.dim)
+        with metrics.CHAT_STAGE_SECONDS.labels(stage="faiss_search").time(), request_profile.span("faiss_search"):
+            distances, indices = self.index.search(query_embedding, k)
+            # Chunk views are only materialized for the top-k hits
+            results = self.documents.take(indices[0])
+        return results, query_embedding[0]
+
+    def as_retriever(self, search_kwargs):
+        k = search_kwargs.get("k", 10)
+        return Retriever(vectorstore=self, k=k)
+
+
+# Mimics LangChain's retriever interface
+class Retriever:
+    def __init__(self, vectorstore, k):
+        self.vectorstore = vectorstore
+        self.k = k
+
+    def get_relevant_documents(self, query):
+        return self.vectorstore.retrieve(query, self.k)
+
+    def get_relevant_documents_with_embedding(self, query):
+        return self.vectorstore.retrieve_with_embedding(query, self.k)
+
+
+def build(documents, backend, batch_size=EMBED_BATCH_SIZE):
+    """
+    Embeds the chunks (a ChunkStore or Document-like objects) and indexes them in a FAISS IndexFlatL2.
+    Chunks embedded by an earlier build are taken from the embedding cache (embeddings.embed_chunks).
+    """
+    import faiss
+
+    if not isinstance(documents, ChunkStore):
+        documents = ChunkStore.from_documents(documents)
+    if len(documents) == 0:
+        raise ValueError("No embeddings to index.")
+
+    vectors = np.ascontiguousarray(embeddings.embed_chunks(backend, list(documents.iter_texts()), batch_size))
+    index = faiss.IndexFlatL2(vectors.shape[1])
+    index.add(vectors)
+    return VectorStore(index=index, documents=documents, backend=backend)
+
+
+def update(vectorstore, remove, documents, backend, batch_size=EMBED_BATCH_SIZE):
+    """
+    A new store without the chunks whose metadata matches `remove(metadata)` and with `documents`
+    added; the given store is left untouched. Kept chunks reuse their vectors from the FAISS index,
+    only the added chunks are embedded.
+    """
+    import faiss
+
+    kept = [chunk for chunk in vectorstore.documents if not remove(chunk.metadata)]
+    documents = list(documents)
+    chunks = ChunkStore.from_documents(kept + documents)
+    if len(chunks) == 0:
+        raise ValueError("No embeddings to index.")
+
+    rows = np.fromiter((chunk.row for chunk in kept), dtype=np.int64, count=len(kept))
+    kept_vectors = vectorstore.index.reconstruct_batch(rows) if len(rows) else np.zeros((0, vectorstore.dim), dtype="float32")
+    added_vectors = embeddings.embed_chunks(backend, [doc.page_content for doc in documents], batch_size)
+    index = faiss.IndexFlatL2(vectorstore.dim)
+    index.add(np.ascontiguousarray(np.vstack([kept_vectors, added_vectors]), dtype="float32"))
+    return VectorStore(index=index, documents=chunks, backend=backend)
+
+
+def save(vectorstore, path):
+    """Persists a vector store to a directory (FAISS index + ChunkStore files)."""
+    import faiss
+
+    os.makedirs(path, exist_ok=True)
+    faiss.write_index(vectorstore.index, os.path.join(path, "index.faiss"))
+    vectorstore.documents.save(os.path.join(path, "chunks"))
+
+
+def load(path, backend):
+    """
+    Loads a vector store written by save. The FAISS vectors and the chunk store are memory-mapped
+    read-only, so processes loading the same files share their pages.
+    """
+    import faiss
+
+    index = faiss.read_index(os.path.join(path, "index.faiss"), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    documents = ChunkStore.load(os.path.join(path, "chunks"), mmap=True)
+    return VectorStore(index=index, documents=documents, backend=backend)
+
+
+def is_saved(path):
+    """True when `path` holds a store written by save (rather than LangChain's save_local)."""
+    return os.path.isdir(os.path.join(path, "chunks"))
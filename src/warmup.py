@@ -0,0 +1,81 @@
+"""
+Startup warmup tracking for the FastAPI backend.
+
+The server starts listening immediately and warms up (rag_config, Notion/Upstash sync, embedding,
+FAISS, crew pool) in a background thread. `Warmup` records which stage is running so the
+/healthz and /readyz endpoints can report it, and requests that need the index are rejected
+with 503 + Retry-After until every stage has finished.
+"""
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+from util import startup_profile
+
+RETRY_AFTER_S = int(os.getenv("WARMUP_RETRY_AFTER_S", "5"))
+
+
+class Warmup:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.status = "starting"  # starting -> warming -> ready | failed
+        self.current_stage = None
+        self.stages = {}
+        self.error = None
+        self.started_at = time.time()
+        self.ready_at = None
+
+    @property
+    def ready(self):
+        return self.status == "ready"
+
+    @property
+    def failed(self):
+        return self.status == "failed"
+
+    @contextmanager
+    def stage(self, name):
+        """Marks `name` as the running stage and records its duration and outcome."""
+        with self._lock:
+            self.status = "warming"
+            self.current_stage = name
+            self.stages[name] = {"status": "running", "duration_s": None}
+        start = time.perf_counter()
+        try:
+            with startup_profile.stage(f"warmup:{name}"):
+                yield
+        except Exception as e:
+            with self._lock:
+                self.stages[name] = {"status": "failed", "duration_s": round(time.perf_counter() - start, 3)}
+                self.status = "failed"
+                self.error = f"{name}: {e}"
+            raise
+        with self._lock:
+            self.stages[name] = {"status": "done", "duration_s": round(time.perf_counter() - start, 3)}
+            self.current_stage = None
+
+    def mark_failed(self, error):
+        """Fails warmup on an error outside any stage (a failing stage has already recorded its own)."""
+        with self._lock:
+            if self.status != "failed":
+                self.status = "failed"
+                self.error = str(error)
+
+    def mark_ready(self):
+        with self._lock:
+            self.status = "ready"
+            self.current_stage = None
+            self.ready_at = time.time()
+
+    def report(self):
+        with self._lock:
+            return {
+                "status": self.status,
+                "stage": self.current_stage,
+                "stages": dict(self.stages),
+                "error": self.error,
+                "uptime_s": round(time.time() - self.started_at, 3),
+                "warmup_s": round(self.ready_at - self.started_at, 3) if self.ready_at else None,
+            }
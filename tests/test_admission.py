@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from src.admission import AdmissionController, AdmissionRejected
+
+
+def controller(max_concurrency=1, max_queue=4, timeouts_s=None):
+    return AdmissionController(max_concurrency, max_queue=max_queue,
+                               timeouts_s=timeouts_s or {"interactive": 5, "batch": 5}, default_service_s=2.0)
+
+
+async def waiting(admission, priority, order=None):
+    """Starts an acquire that queues; returns its task once it is waiting."""
+    async def acquire():
+        ticket = await admission.acquire(priority)
+        if order is not None:
+            order.append(priority)
+        return ticket
+
+    task = asyncio.ensure_future(acquire())
+    await asyncio.sleep(0)
+    return task
+
+
+def test_released_slot_goes_to_interactive_before_batch():
+    async def main():
+        admission = controller()
+        running = await admission.acquire()
+        order = []
+        batch = await waiting(admission, "batch", order)
+        interactive = await waiting(admission, "interactive", order)
+        assert admission.stats()["queued"] == {"interactive": 1, "batch": 1}
+
+        running.release()
+        (await interactive).release()
+        (await batch).release()
+        assert order == ["interactive", "batch"]
+        assert admission.active == 0
+
+    asyncio.run(main())
+
+
+def test_full_queue_sheds_batch_for_interactive_and_rejects_with_retry_after():
+    async def main():
+        admission = controller(max_queue=2)
+        running = await admission.acquire()
+        batch = await waiting(admission, "batch")
+        interactive = await waiting(admission, "interactive")
+
+        # Queue full: a new interactive request displaces the waiting batch one (503)
+        newest = await waiting(admission, "interactive")
+        with pytest.raises(AdmissionRejected) as shed:
+            await batch
+        assert shed.value.status_code == 503 and shed.value.retry_after_s >= 1
+
+        # Nothing left to shed: rejected right away (429), Retry-After grows with the queue
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire("interactive")
+        assert rejected.value.status_code == 429
+        assert rejected.value.retry_after_s == admission.retry_after_s() == 6
+
+        running.release()
+        (await interactive).release()
+        (await newest).release()
+        assert admission.active == 0
+
+    asyncio.run(main())
+
+
+def test_batch_may_only_fill_half_the_queue():
+    async def main():
+        admission = controller(max_queue=4)
+        running = await admission.acquire()
+        batches = [await waiting(admission, "batch") for _ in range(2)]
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire("batch")
+        assert rejected.value.status_code == 429
+        running.release()
+        for task in batches:
+            (await task).release()
+
+    asyncio.run(main())
+
+
+def test_wait_deadline_rejects_with_503():
+    async def main():
+        admission = controller(timeouts_s={"interactive": 0.05, "batch": 0.05})
+        running = await admission.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire()
+        assert rejected.value.status_code == 503
+        assert admission.queue_depth == 0
+        running.release()
+        assert admission.active == 0
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_leaves_the_queue_and_does_not_leak_a_slot():
+    async def main():
+        admission = controller()
+        running = await admission.acquire()
+        task = await waiting(admission, "interactive")
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert admission.queue_depth == 0
+        running.release()
+        assert admission.active == 0
+
+    asyncio.run(main())
+
+
+def test_unknown_priority_is_rejected():
+    assert AdmissionController.parse_priority(None) == "interactive"
+    assert AdmissionController.parse_priority(" Batch ") == "batch"
+    with pytest.raises(ValueError):
+        AdmissionController.parse_priority("urgent")
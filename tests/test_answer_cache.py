@@ -0,0 +1,57 @@
+from src.answer_cache import AnswerCache, LocalLRU, make_key, config_version
+from src.index_manager import IndexHandle
+
+
+class SharedTier:
+    def __init__(self):
+        self.entries = {}
+        self.errors = 0
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, answer):
+        self.entries[key] = answer
+
+
+def test_key_changes_with_index_and_agent_config_versions():
+    key = make_key("truN", "What is  TrueNotion?", [], "fp-1", config_version({"agent": 1}))
+    assert key == make_key("truN", "what is truenotion?", [], "fp-1", config_version({"agent": 1}))
+    assert key != make_key("truN", "what is truenotion?", [], "fp-2", config_version({"agent": 1}))
+    assert key != make_key("truN", "what is truenotion?", [], "fp-1", config_version({"agent": 2}))
+    assert key != make_key("stdllm", "what is truenotion?", [], "fp-1", config_version({"agent": 1}))
+
+
+def test_index_swap_clears_the_local_tier():
+    cache = AnswerCache(local=LocalLRU(max_entries=8))
+    handle = IndexHandle()
+    handle.add_swap_listener(lambda snapshot: cache.evict_local())  # as wired in app.py
+    key = make_key("truN", "question", [], handle.version, "agent")
+    cache.set(key, "answer")
+    assert cache.get(key) == ("answer", "local")
+
+    handle.swap(object(), [], {})
+    assert cache.get(key) == (None, None)
+    # Lookups after the swap use the new version, so old shared entries cannot match either
+    assert make_key("truN", "question", [], handle.version, "agent") != key
+
+
+def test_shared_tier_fills_the_local_tier():
+    shared = SharedTier()
+    cache = AnswerCache(local=LocalLRU(max_entries=8), shared=shared)
+    shared.set("key", "answer")
+    assert cache.get("key") == ("answer", "shared")
+    assert cache.get("key") == ("answer", "local")
+    assert cache.stats()["shared_hits"] == 1 and cache.stats()["local_hits"] == 1
+
+
+def test_local_tier_is_bounded_and_expires():
+    local = LocalLRU(max_entries=2, ttl_s=60)
+    for key in ("a", "b", "c"):
+        local.set(key, key)
+    assert local.get("a") is None and local.get("c") == "c"
+    assert local.evictions == 1
+
+    expired = LocalLRU(max_entries=2, ttl_s=-1)
+    expired.set("a", "a")
+    assert expired.get("a") is None
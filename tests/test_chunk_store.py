@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from src.chunk_store import ChunkStore
+
+
+def store():
+    chunks = ChunkStore()
+    chunks.append("Première page", {"id": "p1", "source_key": "notion_database"})
+    chunks.append("", {"id": "p1", "source_key": "notion_database"})
+    chunks.append("second page ✓", {"id": "p2", "source_key": "upload:report.pdf"})
+    chunks.set_column("sentiment_score", [0.5, 0.0, -0.25])
+    chunks.set_column("language", ["fr", None, "en"])
+    return chunks
+
+
+def test_texts_and_metadata_by_row():
+    chunks = store()
+    assert len(chunks) == 3
+    assert list(chunks.iter_texts()) == ["Première page", "", "second page ✓"]
+    assert chunks[-1].metadata == {"id": "p2", "source_key": "upload:report.pdf", "sentiment_score": -0.25, "language": "en"}
+    # Source keys and page ids are interned
+    assert chunks._pages == ["p1", "p2"] and chunks._sources == ["notion_database", "upload:report.pdf"]
+    assert isinstance(chunks.column("sentiment_score"), np.ndarray)
+    with pytest.raises(IndexError):
+        chunks[3]
+
+
+def test_take_skips_faiss_padding():
+    chunks = store()
+    assert [chunk.row for chunk in chunks.take(np.array([2, -1, 0, 7]))] == [2, 0]
+
+
+def test_saved_store_loads_memory_mapped_and_read_only(tmp_path):
+    chunks = store()
+    chunks.save(str(tmp_path))
+    loaded = ChunkStore.load(str(tmp_path), mmap=True)
+
+    assert isinstance(loaded._offsets, np.memmap)
+    assert [chunk.page_content for chunk in loaded] == [chunk.page_content for chunk in chunks]
+    assert [chunk.metadata for chunk in loaded] == [chunk.metadata for chunk in chunks]
+    with pytest.raises(RuntimeError):
+        loaded.append("more", {})
+    # Columns may still be added to a loaded store (e.g. enrichment of an older index)
+    loaded.set_column("language_score", [1, 2, 3])
+    assert loaded[1].metadata["language_score"] == 2.0
+
+
+def test_set_column_validates_name_and_length():
+    chunks = store()
+    with pytest.raises(ValueError):
+        chunks.set_column("id", ["a", "b", "c"])
+    with pytest.raises(ValueError):
+        chunks.set_column("language", ["fr"])
@@ -0,0 +1,85 @@
+import pytest
+
+from src.answer_cache import config_version
+from src.config_manager import ConfigManager, rag_change_kind, agent_change_kinds
+
+RAG = {"k": 10, "chunk_size": 1000, "memory": 4}
+AGENT = {"agent": {"role": "analyst"}, "task": {"description": "answer"}, "llm": {"standard": {"model": "a"}}}
+
+
+def test_rag_change_kinds():
+    assert rag_change_kind(RAG, dict(RAG)) == "unchanged"
+    assert rag_change_kind(RAG, {**RAG, "memory": 8}) == "instant"
+    assert rag_change_kind(RAG, {**RAG, "k": 5}) == "retriever"
+    assert rag_change_kind(RAG, {**RAG, "k": 5, "memory": 8}) == "retriever"
+    assert rag_change_kind(RAG, {**RAG, "chunk_size": 500}) == "reindex"
+    assert rag_change_kind(RAG, {**RAG, "k": 5, "embedding_backend": "glove"}) == "reindex"
+    assert rag_change_kind(None, RAG) == "reindex"
+
+
+def test_agent_change_kinds():
+    assert agent_change_kinds(AGENT, dict(AGENT)) == set()
+    assert agent_change_kinds(AGENT, {**AGENT, "agent": {"role": "writer"}}) == {"prompts"}
+    assert agent_change_kinds(AGENT, {**AGENT, "llm": {}}) == {"llm"}
+    assert agent_change_kinds(AGENT, {**AGENT, "task": {}, "llm": {}}) == {"prompts", "llm"}
+
+
+def manager(store):
+    configs = ConfigManager(lambda key: store[key], url="", token="")
+    calls = []
+    configs.on_change("rag_config", lambda old, new: calls.append(("rag_config", old, new)) or rag_change_kind(old, new))
+    configs.on_change("agent_config", lambda old, new: calls.append(("agent_config", old, new)) or sorted(agent_change_kinds(old, new)))
+    configs.set_initial("rag_config", RAG)
+    configs.set_initial("agent_config", AGENT)
+    return configs, calls
+
+
+def test_apply_dispatches_only_real_changes_to_the_keys_handler():
+    configs, calls = manager({})
+    assert configs.apply("rag_config", dict(RAG)) == "unchanged"
+    assert calls == []
+
+    assert configs.apply("rag_config", {**RAG, "memory": 8}) == "instant"
+    assert calls == [("rag_config", RAG, {**RAG, "memory": 8})]
+    assert configs.get("rag_config")["memory"] == 8
+    assert configs.version("rag_config") == config_version({**RAG, "memory": 8})
+    assert configs.stats()["history"][-1]["result"] == "instant"
+
+
+def test_failed_handler_keeps_the_previous_config():
+    configs = ConfigManager(lambda key: None, url="", token="")
+    configs.set_initial("rag_config", RAG)
+
+    def failing(old, new):
+        raise RuntimeError("retriever rebuild failed")
+
+    configs.on_change("rag_config", failing)
+    with pytest.raises(RuntimeError):
+        configs.apply("rag_config", {**RAG, "k": 5})
+    assert configs.get("rag_config") == RAG
+    assert configs.version("rag_config") == config_version(RAG)
+
+
+def test_poll_fetches_only_configs_whose_published_version_changed():
+    store = {"rag_config": {**RAG, "chunk_size": 500}, "agent_config": AGENT}
+    configs, calls = manager(store)
+    fetched = []
+    fetch = configs.fetch_fn
+    configs.fetch_fn = lambda key: fetched.append(key) or fetch(key)
+    configs.remote_versions = lambda: {
+        "rag_config": config_version(store["rag_config"]),
+        "agent_config": config_version(AGENT),
+    }
+
+    assert configs.poll_once() == {"rag_config": "reindex"}
+    assert fetched == ["rag_config"]
+    assert [key for key, _, _ in calls] == ["rag_config"]
+    assert configs.poll_once() == {}
+
+
+def test_refresh_applies_every_stored_config():
+    store = {"agent_config": {**AGENT, "llm": {"standard": {"model": "b"}}}}
+    configs, calls = manager(store)
+    applied = configs.refresh()
+    assert applied == {"rag_config": "not stored", "agent_config": ["llm"]}
+    assert [key for key, _, _ in calls] == ["agent_config"]
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+
+import pytest
+
+from agents.crew_pool import CrewPool
+
+
+class Crew:
+    def __init__(self, number):
+        self.number = number
+        self.inputs = []
+
+    def kickoff(self, inputs):
+        self.inputs.append(inputs)
+        return f"answer {self.number}"
+
+
+def make_pool(size):
+    numbers = iter(range(size))
+    return CrewPool(lambda: Crew(next(numbers)), size=size)
+
+
+def test_each_crew_is_lent_to_one_request_at_a_time():
+    async def main():
+        pool = make_pool(2)
+        async with pool.acquire() as first:
+            async with pool.acquire() as second:
+                assert first is not second
+                assert pool.in_flight == 2
+                # A third request waits until a crew comes back
+                waiting = asyncio.ensure_future(pool.kickoff({"q": 3}))
+                await asyncio.sleep(0.05)
+                assert not waiting.done()
+        assert await waiting in ("answer 0", "answer 1")
+        assert pool.in_flight == 0
+        pool.shutdown()
+
+    asyncio.run(main())
+
+
+def test_cancelled_request_keeps_the_crew_until_its_kickoff_returns():
+    started, finish = threading.Event(), threading.Event()
+
+    def blocking_kickoff():
+        started.set()
+        finish.wait(5)
+
+    async def request(pool):
+        async with pool.acquire():
+            await pool.run_in_executor(blocking_kickoff)
+
+    async def main():
+        pool = make_pool(1)
+        task = asyncio.ensure_future(request(pool))
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # The kickoff is still running on the executor thread: the crew must not be lent again
+        assert pool.in_flight == 1
+        finish.set()
+        async with pool.acquire() as crew:
+            assert crew.number == 0
+        assert pool.in_flight == 0
+        pool.shutdown()
+
+    asyncio.run(main())
+
+
+def test_retire_waits_for_checked_out_crews():
+    async def main():
+        pool = make_pool(1)
+        async with pool.acquire():
+            assert not await asyncio.to_thread(pool.retire, 0.05)
+        assert pool.in_flight == 0
+
+    asyncio.run(main())
+
+
+def test_pool_size_must_be_positive():
+    with pytest.raises(ValueError):
+        CrewPool(lambda: None, size=0)
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from src import embeddings
+from src.embeddings import EmbeddingBackend
+
+
+class Constant(EmbeddingBackend):
+    model_id = "test-constant"
+    dim = 4
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_batch(self, texts):
+        self.calls += 1
+        return np.ones((len(texts), self.dim), dtype="float32")
+
+
+def test_backend_without_embed_batch_fails_when_created(monkeypatch):
+    class Incomplete(EmbeddingBackend):
+        model_id = "test-incomplete"
+        dim = 4
+
+        def embed_query(self, text):
+            return np.zeros(self.dim, dtype="float32")
+
+    with pytest.raises(TypeError, match="embed_batch"):
+        Incomplete()
+
+    monkeypatch.setattr(embeddings, "_factories", dict(embeddings._factories))
+    embeddings.register("test-incomplete", Incomplete)
+    with pytest.raises(TypeError):
+        embeddings.get_backend("test-incomplete")
+
+
+def test_query_and_encode_default_to_embed_batch():
+    backend = Constant()
+    assert backend.embed_query("x").shape == (4,)
+    assert backend.encode("x").shape == (4,)
+    assert backend.calls == 2
+
+
+def test_embed_chunks_embeds_each_new_chunk_once(monkeypatch):
+    monkeypatch.setattr(embeddings, "cache", embeddings.EmbeddingCache(max_bytes=1 << 20))
+    backend = Constant()
+    vectors = embeddings.embed_chunks(backend, ["a", "b", "a"], batch_size=1)
+    assert vectors.shape == (3, 4) and backend.calls == 2
+    embeddings.embed_chunks(backend, ["a", "b"])
+    assert backend.calls == 2
+    assert embeddings.embed_chunks(backend, []).shape == (0, 4)
@@ -0,0 +1,58 @@
+import threading
+
+from src import index_manager
+from src.index_manager import IndexHandle, RebuildJobs
+
+
+class Store:
+    """Stands in for a vector store (weak-referenceable, like the real ones)."""
+
+
+class Retriever:
+    def __init__(self):
+        self.vectorstore = Store()
+
+
+def build():
+    return Retriever(), [], {"k": 1}
+
+
+def run(jobs, build_fn=None):
+    done = threading.Event()
+    jobs.add_listener(lambda job: done.set())
+    job, created = jobs.submit(build_fn)
+    assert created and done.wait(5)
+    return job
+
+
+def test_old_index_release_is_recorded_without_blocking_the_worker():
+    handle = IndexHandle()
+    handle.swap(*build())
+    jobs = RebuildJobs(handle, build)
+    in_flight = handle.current()  # a request still answering from the old index
+
+    first = run(jobs)
+    assert jobs.get(first["job_id"])["old_index_released"] is None
+    # The worker is free for the next rebuild while the old index is still held
+    second = run(jobs)
+    assert second["version"] == first["version"] + 1
+
+    del in_flight
+    assert jobs.get(first["job_id"])["old_index_released"] is True
+    assert jobs.get(first["job_id"])["old_index_released_at"] is not None
+    assert jobs.get(second["job_id"])["old_index_released"] is True
+    jobs.shutdown()
+
+
+def test_unreleased_old_index_is_reported_after_the_timeout(monkeypatch):
+    handle = IndexHandle()
+    handle.swap(*build())
+    jobs = RebuildJobs(handle, build)
+    in_flight = handle.current()
+
+    job = run(jobs)
+    monkeypatch.setattr(index_manager, "RELEASE_TIMEOUT_S", -1)
+    assert jobs.get(job["job_id"])["old_index_released"] is False
+    del in_flight
+    assert jobs.get(job["job_id"])["old_index_released"] is True
+    jobs.shutdown()
@@ -0,0 +1,113 @@
+import asyncio
+
+import httpx
+import pytest
+
+from agents import llm_client
+from agents.llm_client import LLMClient, OpenAICompatibleClient, ProviderHTTPError
+
+
+class ScriptedClient(LLMClient):
+    """Each attempt takes the next outcome: an exception is raised, anything else is the answer/tokens."""
+
+    provider = "test"
+
+    def __init__(self, outcomes, **kwargs):
+        super().__init__(**kwargs)
+        self.outcomes = list(outcomes)
+        self.attempts = 0
+
+    def _next(self):
+        self.attempts += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def _complete_once(self, messages, model, temperature):
+        return self._next()
+
+    async def _acomplete_once(self, messages, model, temperature):
+        return self._next()
+
+    def _stream_once(self, messages, model, temperature):
+        for token in self._next():
+            if isinstance(token, Exception):
+                raise token
+            yield token
+
+
+def http_error(status, retry_after=None):
+    headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+    return ProviderHTTPError(status, httpx.Response(status, headers=headers))
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(llm_client.time, "sleep", sleeps.append)
+    return sleeps
+
+
+def test_retryable_errors_are_retried_with_retry_after(sleeps):
+    client = ScriptedClient([http_error(429, retry_after=3), httpx.ConnectError("reset"), "answer"], max_retries=3)
+    assert client.complete("question", "model") == "answer"
+    assert client.attempts == 3
+    assert sleeps[0] >= 3
+
+
+def test_client_errors_and_exhausted_retries_are_raised(sleeps):
+    client = ScriptedClient([http_error(400)], max_retries=3)
+    with pytest.raises(ProviderHTTPError):
+        client.complete("question", "model")
+    assert client.attempts == 1
+
+    client = ScriptedClient([http_error(503)] * 3, max_retries=2)
+    with pytest.raises(ProviderHTTPError):
+        client.complete("question", "model")
+    assert client.attempts == 3
+
+
+def test_async_completion_retries(monkeypatch):
+    monkeypatch.setattr(llm_client, "BACKOFF_BASE_S", 0)
+    client = ScriptedClient([http_error(502), "answer"], max_retries=1)
+    assert asyncio.run(client.acomplete("question", "model")) == "answer"
+
+
+def test_stream_is_only_retried_before_its_first_token(sleeps):
+    client = ScriptedClient([[http_error(503)], ["a", "b"]], max_retries=2)
+    assert list(client.stream("question", "model")) == ["a", "b"]
+
+    client = ScriptedClient([["a", http_error(503)], ["a", "b"]], max_retries=2)
+    with pytest.raises(ProviderHTTPError):
+        list(client.stream("question", "model"))
+    assert client.attempts == 1
+
+
+def test_one_shared_client_per_endpoint():
+    groq = {"provider": "openai", "model": "a", "base_url": "https://api.groq.com/openai/v1", "api_key_env": "GROQ_API_KEY"}
+    assert llm_client.client_for(groq) is llm_client.client_for({**groq, "model": "b", "temperature": 0.2})
+    assert llm_client.client_for(groq) is not llm_client.client_for({**groq, "base_url": "https://api.deepinfra.com/v1/openai"})
+    with pytest.raises(ValueError):
+        llm_client.client_for({"provider": "carrier-pigeon", "model": "a"})
+
+
+def test_openai_compatible_calls_reuse_the_pooled_connection(monkeypatch):
+    monkeypatch.setenv("TEST_LLM_KEY", "secret")
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "answer"}}]})
+
+    client = OpenAICompatibleClient("https://llm.example/v1/", api_key_env="TEST_LLM_KEY")
+    client._http = httpx.Client(transport=httpx.MockTransport(handler))
+    client._async_http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    http = client._pools()[0]
+
+    assert client.complete("question", "model", system="be brief") == "answer"
+    assert client.complete("question", "model") == "answer"
+    assert client._pools()[0] is http
+    assert str(requests[0].url) == "https://llm.example/v1/chat/completions"
+    assert requests[0].headers["Authorization"] == "Bearer secret"
+    client.close()
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from agents import llm_router
+from agents.llm_router import LLMRouter
+
+
+class FakeClient:
+    """Streams `tokens` after `delay_s`; records whether the stream was cancelled or closed."""
+
+    def __init__(self, delay_s, tokens=("hello", " world"), error=None):
+        self.delay_s = delay_s
+        self.tokens = tokens
+        self.error = error
+        self.started = 0
+        self.cancelled = False
+        self.closed = False
+
+    async def astream(self, prompt, model, temperature, system=None):
+        self.started += 1
+        try:
+            await asyncio.sleep(self.delay_s)
+            if self.error is not None:
+                raise self.error
+            for token in self.tokens:
+                yield token
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        finally:
+            self.closed = True
+
+
+@pytest.fixture
+def clients(monkeypatch):
+    clients = {}
+    monkeypatch.setattr(llm_router.llm_client, "client_for", lambda target: clients[target["model"]])
+    monkeypatch.setattr(llm_router, "HEDGE_DEFAULT_DELAY_S", 0.05)
+    return clients
+
+
+def route(primary, *fallbacks, hedge=True):
+    # Model names are unique per test: latency windows are shared by every router in the process
+    return LLMRouter("standard", {"provider": "mistral", "model": primary, "hedge": hedge,
+                                  "fallbacks": [{"provider": "mistral", "model": model} for model in fallbacks]})
+
+
+def test_slow_primary_is_hedged_and_the_loser_cancelled(clients):
+    clients["hedge-slow"] = slow = FakeClient(delay_s=5)
+    clients["hedge-fast"] = fast = FakeClient(delay_s=0.01, tokens=("fast",))
+
+    answer = asyncio.run(route("hedge-slow", "hedge-fast").acomplete("question"))
+
+    assert answer == "fast"
+    assert slow.started == 1 and fast.started == 1
+    assert slow.cancelled and slow.closed
+    assert fast.closed
+
+
+def test_fast_primary_is_not_hedged(clients):
+    clients["nohedge-primary"] = primary = FakeClient(delay_s=0)
+    clients["nohedge-fallback"] = fallback = FakeClient(delay_s=0)
+
+    assert asyncio.run(route("nohedge-primary", "nohedge-fallback").acomplete("question")) == "hello world"
+    assert fallback.started == 0
+    assert primary.closed
+
+
+def test_error_before_first_token_falls_through(clients):
+    clients["error-primary"] = FakeClient(delay_s=0, error=RuntimeError("rate limited"))
+    clients["error-fallback"] = FakeClient(delay_s=0, tokens=("ok",))
+
+    assert asyncio.run(route("error-primary", "error-fallback", hedge=False).acomplete("question")) == "ok"
+
+
+def test_every_target_failing_raises_the_last_error(clients):
+    clients["fail-a"] = FakeClient(delay_s=0, error=RuntimeError("a"))
+    clients["fail-b"] = FakeClient(delay_s=0, error=RuntimeError("b"))
+
+    with pytest.raises(RuntimeError, match="b"):
+        asyncio.run(route("fail-a", "fail-b").acomplete("question"))
+
+
+def test_cancelled_request_cancels_every_attempt(clients):
+    clients["cancel-a"] = first = FakeClient(delay_s=5)
+    clients["cancel-b"] = second = FakeClient(delay_s=5)
+
+    async def main():
+        task = asyncio.ensure_future(route("cancel-a", "cancel-b").acomplete("question"))
+        await asyncio.sleep(0.2)  # past the hedge delay: both targets are running
+        assert first.started == 1 and second.started == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert first.cancelled and second.cancelled
+
+
+def test_unknown_routing_is_rejected():
+    with pytest.raises(ValueError):
+        LLMRouter("standard", {"model": "m", "routing": "fastest"})
@@ -0,0 +1,65 @@
+import numpy as np
+
+from src.semantic_cache import SemanticCache, context_hash
+
+
+class Doc:
+    def __init__(self, page_content, metadata):
+        self.page_content = page_content
+        self.metadata = metadata
+
+
+QUERY = np.array([1.0, 0.0, 0.0], dtype="float32")
+PARAPHRASE = np.array([0.99, 0.05, 0.0], dtype="float32")
+OTHER = np.array([0.0, 1.0, 0.0], dtype="float32")
+
+
+def test_paraphrase_hits_only_with_the_same_context():
+    cache = SemanticCache(threshold=0.95, max_entries=4)
+    cache.store(QUERY, "ctx", 1, "answer")
+    assert cache.lookup(PARAPHRASE, "ctx", 1) == "answer"
+    assert cache.lookup(PARAPHRASE, "other ctx", 1) is None
+    assert cache.lookup(OTHER, "ctx", 1) is None
+
+
+def test_index_version_change_drops_every_entry():
+    cache = SemanticCache(max_entries=4)
+    cache.store(QUERY, "ctx", 1, "old answer")
+    assert cache.lookup(QUERY, "ctx", 2) is None
+    assert cache.stats()["invalidations"] == 1
+    assert cache.stats()["entries"] == 0
+    # Back on the old version, the entry is gone too
+    assert cache.lookup(QUERY, "ctx", 1) is None
+
+    cache.store(QUERY, "ctx", 2, "new answer")
+    assert cache.lookup(QUERY, "ctx", 2) == "new answer"
+
+
+def test_invalidate_and_ttl():
+    cache = SemanticCache(max_entries=4, ttl_s=-1)
+    cache.store(QUERY, "ctx", 1, "answer")
+    assert cache.lookup(QUERY, "ctx", 1) is None
+    assert cache.stats()["expirations"] == 1
+
+    cache = SemanticCache(max_entries=4)
+    cache.store(QUERY, "ctx", 1, "answer")
+    cache.invalidate()
+    assert cache.lookup(QUERY, "ctx", 1) is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SemanticCache(max_entries=2)
+    cache.store(QUERY, "a", 1, "a")
+    cache.store(QUERY, "b", 1, "b")
+    assert cache.lookup(QUERY, "a", 1) == "a"
+    cache.store(QUERY, "c", 1, "c")
+    assert cache.lookup(QUERY, "b", 1) is None
+    assert cache.lookup(QUERY, "a", 1) == "a"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_context_hash_ignores_chunk_order_but_not_extra_inputs():
+    first, second = Doc("alpha", {"id": 1}), Doc("beta", {"id": 2})
+    assert context_hash([first, second], "truN") == context_hash([second, first], "truN")
+    assert context_hash([first, second], "truN") != context_hash([first, second], "stdllm")
+    assert context_hash([first], "truN") != context_hash([first, second], "truN")
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from src.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_run():
+    async def main():
+        flight = SingleFlight()
+        runs = []
+        release = asyncio.Event()
+
+        async def answer():
+            runs.append(1)
+            await release.wait()
+            return "answer"
+
+        callers = [asyncio.ensure_future(flight.do("key", answer)) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert flight.total_waiters() == 3
+        release.set()
+        results = await asyncio.gather(*callers)
+
+        assert len(runs) == 1
+        assert sorted(shared for _, shared in results) == [False, True, True]
+        assert {answer for answer, _ in results} == {"answer"}
+        assert flight.stats()["in_flight"] == 0
+        # The next call after the flight finished runs again
+        assert await flight.do("key", answer) == ("answer", False)
+        assert len(runs) == 2
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_run():
+    async def main():
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def answer():
+            await release.wait()
+            return "answer"
+
+        first = asyncio.ensure_future(flight.do("key", answer))
+        second = asyncio.ensure_future(flight.do("key", answer))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert flight.total_waiters() == 1
+
+        release.set()
+        assert await second == ("answer", True)
+        assert flight.executions == 1 and flight.coalesced == 1
+
+    asyncio.run(main())
+
+
+def test_error_reaches_every_waiter_and_is_not_cached():
+    async def main():
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def failing():
+            await release.wait()
+            raise RuntimeError("llm down")
+
+        callers = [asyncio.ensure_future(flight.do("key", failing)) for _ in range(2)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+        async def ok():
+            return "answer"
+
+        assert await flight.do("key", ok) == ("answer", False)
+
+    asyncio.run(main())
+
+
+def test_different_keys_run_separately():
+    async def main():
+        flight = SingleFlight()
+
+        async def answer():
+            await asyncio.sleep(0.01)
+            return "answer"
+
+        await asyncio.gather(flight.do("a", answer), flight.do("b", answer))
+        assert flight.executions == 2 and flight.coalesced == 0
+
+    asyncio.run(main())
@@ -0,0 +1,63 @@
+import time
+import threading
+
+from src.sync_scheduler import SyncScheduler
+
+
+class ChangingSource:
+    """A data source whose single page changes on every edit()."""
+
+    def __init__(self):
+        self.version = 0
+        self.calls = 0
+
+    def edit(self):
+        self.version += 1
+
+    def __call__(self):
+        self.calls += 1
+        return {"page": str(self.version)}
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_deferred_reindex_does_not_busy_poll():
+    source = ChangingSource()
+    rebuild_running = threading.Event()
+    rebuild_running.set()
+    started = []
+
+    def on_change(changes):
+        # Like rebuild_jobs.submit() while another rebuild is in flight
+        if rebuild_running.is_set():
+            return None
+        started.append(changes)
+        return "re-indexing"
+
+    scheduler = SyncScheduler(on_change, sources={"notion": source}, interval_s=0, debounce_s=0.05, jitter=0)
+    scheduler.start()
+    try:
+        assert wait_for(lambda: scheduler.polls >= 1)
+        source.edit()
+        scheduler.notify()
+        assert wait_for(lambda: scheduler.deferred >= 1)
+        time.sleep(1.0)
+        # Backed off from the debounce (>= MIN_RETRY_S), not one poll per loop iteration
+        assert source.calls <= 5
+        assert scheduler.deferred <= 3
+        assert not started
+
+        rebuild_running.clear()
+        scheduler.retry_deferred()
+        assert wait_for(lambda: started)
+        assert started[0] == {"notion": {"added": [], "changed": ["page"], "removed": []}}
+        assert scheduler.stats()["pending"] == {}
+    finally:
+        scheduler.stop()
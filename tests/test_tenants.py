@@ -0,0 +1,76 @@
+import json
+import os
+import threading
+
+import pytest
+
+from src.index_manager import META_FILE
+from src.tenants import TenantIndexManager, TenantForbidden, UnknownTenant, issue_token
+
+
+@pytest.fixture
+def root(tmp_path, monkeypatch):
+    # src.process (index size estimate on load) checks for credentials at import
+    for name in ("NOTION_TOKEN", "DATABASE_ID", "UPSTASH_REDIS_REST_URL", "UPSTASH_REDIS_REST_TOKEN"):
+        monkeypatch.setenv(name, os.environ.get(name, "test"))
+    for tenant in ("acme", "globex"):
+        os.makedirs(tmp_path / tenant)
+        (tmp_path / tenant / META_FILE).write_text(json.dumps({}))
+    return str(tmp_path)
+
+
+def test_authenticate_requires_the_tenants_own_token(root):
+    manager = TenantIndexManager(root=root)
+    acme = issue_token(root, "acme")
+    globex = issue_token(root, "globex")
+    manager.authenticate("acme", acme)
+    for token in (None, "", globex, acme + "x"):
+        with pytest.raises(TenantForbidden):
+            manager.authenticate("acme", token)
+    # Tenants without a token (or without artifacts) cannot be told apart from wrong tokens
+    with pytest.raises(TenantForbidden):
+        manager.authenticate("initech", acme)
+    with pytest.raises(ValueError):
+        manager.authenticate("../acme", acme)
+
+
+def test_reissued_token_revokes_the_old_one(root):
+    manager = TenantIndexManager(root=root)
+    old = issue_token(root, "acme")
+    new = issue_token(root, "acme")
+    manager.authenticate("acme", new)
+    with pytest.raises(TenantForbidden):
+        manager.authenticate("acme", old)
+
+
+def test_concurrent_first_requests_load_once_and_drop_the_load_lock(root):
+    release = threading.Event()
+    loads = []
+
+    def load_fn(path):
+        loads.append(path)
+        release.wait(5)
+        return object(), [], {"k": 1}, "fp"
+
+    manager = TenantIndexManager(root=root, load_fn=load_fn)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(manager.get("acme"))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while not loads:
+        release.wait(0.01)
+    assert list(manager._load_locks) == ["acme"]
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(loads) == 1
+    assert len({id(snapshot) for snapshot in results}) == 1
+    assert manager._load_locks == {}
+
+
+def test_failed_load_drops_the_load_lock(root):
+    manager = TenantIndexManager(root=root)
+    with pytest.raises(UnknownTenant):
+        manager.get("initech")
+    assert manager._load_locks == {}
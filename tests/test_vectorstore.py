@@ -0,0 +1,56 @@
+import numpy as np
+
+from src import vectorstore
+from src.chunk_store import ChunkStore
+
+
+class Doc:
+    def __init__(self, page_content, metadata):
+        self.page_content = page_content
+        self.metadata = metadata
+
+
+class CountingBackend:
+    """Deterministic 8-d vectors per text; counts how many texts were embedded."""
+
+    model_id = "test-counting"
+    dim = 8
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_batch(self, texts):
+        self.embedded.extend(texts)
+        return np.stack([self.embed_query(text) for text in texts])
+
+    def embed_query(self, text):
+        return np.random.default_rng(sum(text.encode("utf-8"))).standard_normal(self.dim).astype("float32")
+
+
+def page(page_id, text, sentiment="neutral"):
+    return Doc(text, {"id": page_id, "source_key": "notion_database", "sentiment": sentiment})
+
+
+def test_update_only_embeds_added_chunks_and_keeps_the_live_store():
+    backend = CountingBackend()
+    live = vectorstore.build([page("a", "alpha page"), page("b", "beta page"), page("c", "gamma page")], backend)
+    backend.embedded.clear()
+
+    updated = vectorstore.update(live, lambda metadata: metadata["id"] in {"b", "c"}, [page("b", "beta page, edited", "positive")], backend)
+
+    assert backend.embedded == ["beta page, edited"]
+    assert [chunk.page_content for chunk in updated.documents] == ["alpha page", "beta page, edited"]
+    assert updated.documents[1].metadata["sentiment"] == "positive"
+    assert updated.index.ntotal == 2
+    # Kept chunks keep their vectors, so an unchanged page is still found by its own text
+    assert updated.retrieve("alpha page", k=1)[0].page_content == "alpha page"
+    assert updated.retrieve("beta page, edited", k=1)[0].page_content == "beta page, edited"
+    # The live store is untouched for requests still searching it
+    assert live.index.ntotal == 3 and len(live.documents) == 3
+
+
+def test_from_documents_keeps_extra_metadata_as_columns():
+    store = ChunkStore.from_documents([Doc("x", {"id": "1", "source_key": "k"}), Doc("y", {"id": "2", "source_key": "k", "language": "en"})])
+    assert store.columns == ["language"]
+    assert store[0].metadata == {"id": "1", "source_key": "k", "language": None}
+    assert store[1].metadata["language"] == "en"
@@ -0,0 +1,33 @@
+import pytest
+
+from src.warmup import Warmup
+
+
+def test_failed_stage_fails_warmup():
+    warmup = Warmup()
+    with pytest.raises(RuntimeError):
+        with warmup.stage("index"):
+            raise RuntimeError("notion down")
+    report = warmup.report()
+    assert warmup.failed
+    assert report["stage"] == "index"
+    assert report["stages"]["index"]["status"] == "failed"
+    assert report["error"] == "index: notion down"
+
+
+def test_mark_failed_outside_a_stage():
+    warmup = Warmup()
+    with warmup.stage("index"):
+        pass
+    warmup.mark_failed(RuntimeError("swap failed"))
+    assert warmup.failed and not warmup.ready
+    assert warmup.report()["error"] == "swap failed"
+
+
+def test_mark_failed_keeps_the_stage_error():
+    warmup = Warmup()
+    with pytest.raises(ValueError):
+        with warmup.stage("crew_pool"):
+            raise ValueError("no LLM")
+    warmup.mark_failed(ValueError("no LLM"))
+    assert warmup.report()["error"] == "crew_pool: no LLM"
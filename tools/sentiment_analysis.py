@@ -1,5 +1,6 @@
-from textblob import TextBlob
+from typing import List
 from crewai.tools import BaseTool
+from tools.sentiment_engine import default_engine
 
 class SentimentAnalysisTool(BaseTool):
     name: str = "Sentiment Analysis Tool"
@@ -7,12 +8,9 @@ class SentimentAnalysisTool(BaseTool):
                        "to ensure positive and engaging communication.")
 
     def _run(self, text: str) -> str:
-        blob = TextBlob(text)
-        sentiment_polarity = blob.sentiment.polarity
+        # Same lexicon and labels as TextBlob's polarity, scored by the batched engine (cached per text)
+        return default_engine().labels([text])[0]
 
-        if sentiment_polarity > 0:
-            return "positive"
-        elif sentiment_polarity < 0:
-            return "negative"
-        else:
-            return "neutral"
\ No newline at end of file
+    def run_batch(self, texts: List[str]) -> List[str]:
+        """Labels many texts (e.g. every retrieved chunk) in one vectorized pass."""
+        return default_engine().labels(texts)
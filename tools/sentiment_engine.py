@@ -0,0 +1,274 @@
+"""
+Batched sentiment scoring with TextBlob's lexicon compiled into NumPy arrays.
+
+TextBlob builds a Blob, tokenizes and walks its lexicon in Python for every single text. The engine
+compiles the same lexicon (textblob.en.sentiment, the pattern.en polarity table) once per process
+into a word -> id map plus polarity / intensity / modifier arrays, tokenizes a whole batch into one
+flat id array and scores it with vectorized rules and a per-text mean (np.bincount):
+
+- known words count with their average polarity over all senses
+- a preceding modifier ("very good") scales the word by the modifier's intensity and is merged into it
+- a preceding negation ("not good", "not a good") multiplies by -0.5, "not very good" divides by the
+  modifier's intensity first, like pattern.en
+- "!" boosts the latest scored word of the text by 1.25
+- a negation right after an -ly modifier ("really not good") negates the modifier, which still
+  merges with the following word
+- emoticons (pattern.en's table, ":)", ":-(", "<3", ...) count with their mood polarity; they are
+  never negated or modified, but "!" boosts them
+
+Modifiers carried across several small words are not modelled; on text the labels
+(positive / negative / neutral) agree with TextBlob's in the vast majority of cases
+(benchmarks/sentiment.py reports the agreement rate). Scores are cached in an LRU keyed by a hash
+of the text (SENTIMENT_CACHE_SIZE entries).
+
+The lexicon is read with textblob's bundled pattern module (textblob/_text.py, standard library
+only) without importing the textblob package, whose __init__ pulls in NLTK (over a second of cold
+start) for tokenizers and taggers the engine does not use.
+"""
+
+import os
+import re
+import sys
+import hashlib
+import importlib.util
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", "10000"))
+NEGATIONS = ("no", "not", "never")
+MODIFIER_POS = "RB"
+EXCLAMATION_BOOST = 1.25
+NEGATION_FACTOR = -0.5
+
+# Lower-cased words (hyphenated ones kept whole) and exclamation marks; apostrophes split words
+# the way TextBlob's tokenizer does ("isn't" -> "isn", "t").
+WORD_PATTERN = r"[a-z0-9][a-z0-9-]*|!"
+TOKEN_RE = re.compile(WORD_PATTERN)
+
+
+def token_pattern(emoticons=()):
+    """
+    Token regex with the emoticons tried before words. An emoticon ends the text or is followed by
+    whitespace or punctuation, and is not preceded by a digit, ':' or '/' (times, URLs).
+    """
+    if not emoticons:
+        return TOKEN_RE
+    alternatives = "|".join(re.escape(e) for e in sorted(emoticons, key=len, reverse=True))
+    return re.compile(rf"(?<![0-9:/])(?:{alternatives})(?=$|\s|[!?.,])|{WORD_PATTERN}")
+
+
+class SentimentLexicon:
+    """The pattern.en sentiment table as arrays indexed by word id (id -1 = unknown word)."""
+
+    def __init__(self, words, polarity, intensity, is_modifier, emoticons=None):
+        # emoticons: {lower-cased emoticon: polarity}, appended after the words
+        emoticons = emoticons or {}
+        words = list(words) + list(emoticons)
+        self.ids = {word: i for i, word in enumerate(words)}
+        self.polarity = np.asarray(list(polarity) + list(emoticons.values()), dtype=np.float64)
+        self.intensity = np.asarray(list(intensity) + [1.0] * len(emoticons), dtype=np.float64)
+        self.is_modifier = np.asarray(list(is_modifier) + [False] * len(emoticons), dtype=bool)
+        self.is_ly_modifier = self.is_modifier & np.array([word.endswith("ly") for word in words], dtype=bool)
+        self.is_emoticon = np.arange(len(words)) >= len(words) - len(emoticons)
+        self.token_re = token_pattern(emoticons)
+
+    @classmethod
+    def from_textblob(cls):
+        sentiment, EMOTICONS = _textblob_sentiment()
+        words, polarity, intensity, is_modifier = [], [], [], []
+        for word, senses in dict.items(sentiment):
+            p, _, i = senses[None]  # averaged over all part-of-speech tags
+            words.append(word)
+            polarity.append(p)
+            intensity.append(i)
+            is_modifier.append(MODIFIER_POS in senses)
+        # pattern.en matches emoticons lower-cased and only as non-alphabetic tokens ("xD" is a word)
+        emoticons = {
+            emoticon.lower(): p for (_, p), group in EMOTICONS.items() for emoticon in group
+            if not emoticon.lower().isalpha() and emoticon.lower() not in sentiment
+        }
+        return cls(words, polarity, intensity, is_modifier, emoticons)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def _textblob_sentiment():
+    """(textblob.en.sentiment table, pattern's EMOTICONS), loaded without importing textblob itself when possible."""
+    if "textblob.en" in sys.modules:
+        from textblob._text import EMOTICONS
+        from textblob.en import sentiment
+
+        "good" in sentiment  # lazydict: loads en-sentiment.xml (and the derived -ly adverbs) on first access
+        return sentiment, EMOTICONS
+
+    package = importlib.util.find_spec("textblob")
+    if package is None:
+        raise ImportError("The sentiment lexicon needs textblob (pip install textblob).")
+    directory = package.submodule_search_locations[0]
+    spec = importlib.util.spec_from_file_location("_textblob_pattern_text", os.path.join(directory, "_text.py"))
+    pattern = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(pattern)
+
+    sentiment = pattern.Sentiment(
+        path=os.path.join(directory, "en", "en-sentiment.xml"),
+        synset="wordnet_id",
+        negations=("no", "not", "n't", "never"),
+        modifiers=(MODIFIER_POS,),
+        modifier=lambda word: word.endswith("ly"),
+        language="en",
+    )
+    sentiment.load()
+    # Like textblob.en.Sentiment.load: "terrible" -> adverb "terribly" (copied from the adjective)
+    for word, senses in list(dict.items(sentiment)):
+        if "JJ" in senses:
+            if word.endswith("y"):
+                word = word[:-1] + "i"
+            if word.endswith("le"):
+                word = word[:-2]
+            polarity, subjectivity, intensity = senses["JJ"]
+            sentiment.annotate(word + "ly", MODIFIER_POS, polarity, subjectivity, intensity)
+    return sentiment, pattern.EMOTICONS
+
+
+def _text_key(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class SentimentEngine:
+    def __init__(self, lexicon=None, cache_size=CACHE_SIZE):
+        self.lexicon = lexicon or SentimentLexicon.from_textblob()
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # text hash -> polarity
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _tokenize(self, texts):
+        """Flat token arrays for the batch: word ids, owning text, negation / exclamation / short-word flags."""
+        ids, owners, negation, bang, short = [], [], [], [], []
+        lookup = self.lexicon.ids.get
+        token_re = self.lexicon.token_re
+        for owner, text in enumerate(texts):
+            tokens = token_re.findall(text.lower())
+            ids.extend(lookup(token, -1) for token in tokens)
+            owners.extend([owner] * len(tokens))
+            negation.extend(token in NEGATIONS for token in tokens)
+            bang.extend(token == "!" for token in tokens)
+            short.extend(len(token) <= 1 for token in tokens)
+        return (np.asarray(ids, dtype=np.int64), np.asarray(owners, dtype=np.int64),
+                np.asarray(negation, dtype=bool), np.asarray(bang, dtype=bool), np.asarray(short, dtype=bool))
+
+    def _score(self, texts):
+        """Polarity in [-1, 1] of every text, computed without the cache."""
+        scores = np.zeros(len(texts), dtype=np.float64)
+        ids, owners, negation, bang, short = self._tokenize(texts)
+        if ids.size == 0:
+            return scores
+        lexicon = self.lexicon
+        known = ids >= 0
+        safe_ids = np.where(known, ids, 0)
+        polarity = np.where(known, lexicon.polarity[safe_ids], 0.0)
+        intensity = np.where(known, lexicon.intensity[safe_ids], 1.0)
+        modifier = known & lexicon.is_modifier[safe_ids]
+        emoticon = known & lexicon.is_emoticon[safe_ids]
+
+        def previous(values, fill, steps=1):
+            # values[i - steps] when that token belongs to the same text, else `fill`
+            shifted = np.full_like(values, fill)
+            shifted[steps:] = np.where(owners[steps:] == owners[:-steps], values[:-steps], fill)
+            return shifted
+
+        def following(values, fill):
+            shifted = np.full_like(values, fill)
+            shifted[:-1] = np.where(owners[:-1] == owners[1:], values[1:], fill)
+            return shifted
+
+        # "very good": the modifier's intensity scales the word, the modifier itself no longer counts
+        modified = known & previous(modifier, False) & ~emoticon
+        # "really not good": the negation attaches to the -ly modifier, which still merges with the next word
+        ly_negated = modifier & lexicon.is_ly_modifier[safe_ids] & following(negation, False)
+        modified_across = known & previous(negation, False) & previous(ly_negated, False, 2) & ~emoticon
+        counted = known.copy()
+        counted[:-1] &= ~modified[1:]
+        counted[:-2] &= ~modified_across[2:]
+        # "not good", "not a good" (negations carry across one short word); "not very good" via the modifier
+        negated = (previous(negation, False) | (previous(negation, False, 2) & previous(short & ~known, False))) & ~modified_across
+        negated_modifier = modified & previous(negated, False)
+        scale = np.where(negated_modifier, 1.0 / previous(intensity, 1.0), previous(intensity, 1.0))
+        scale = np.where(modified_across, previous(intensity, 1.0, 2), scale)
+        polarity = np.where(modified | modified_across, np.clip(polarity * scale, -1.0, 1.0), polarity)
+        negated = ((negated & ~modified) | negated_modifier | modified_across | ly_negated) & ~emoticon
+        # "good!": every exclamation mark boosts the latest scored word of its text
+        positions = np.arange(ids.size)
+        latest = np.maximum.accumulate(np.where(counted, positions, -1))
+        boosts = bang & (latest >= 0)
+        boosts[boosts] &= owners[latest[boosts]] == owners[boosts]
+        exclamations = np.bincount(latest[boosts], minlength=ids.size)
+        polarity = np.clip(polarity * EXCLAMATION_BOOST ** exclamations, -1.0, 1.0)
+        polarity = np.where(negated, polarity * NEGATION_FACTOR, polarity)
+
+        totals = np.bincount(owners, weights=np.where(counted, polarity, 0.0), minlength=len(texts))
+        counts = np.bincount(owners, weights=counted.astype(np.float64), minlength=len(texts))
+        np.divide(totals, counts, out=scores, where=counts > 0)
+        return scores
+
+    def polarities(self, texts):
+        """Polarity of every text (a list of floats in [-1, 1]); only uncached texts are scored, in one batch."""
+        keys = [_text_key(text) for text in texts]
+        results = [None] * len(texts)
+        missing = {}
+        with self._lock:
+            for position, key in enumerate(keys):
+                score = self._cache.get(key)
+                if score is None:
+                    missing.setdefault(key, []).append(position)
+                else:
+                    self._cache.move_to_end(key)
+                    results[position] = score
+            self.hits += len(texts) - sum(len(positions) for positions in missing.values())
+            self.misses += len(missing)
+        if missing:
+            scores = self._score([texts[positions[0]] for positions in missing.values()])
+            with self._lock:
+                for (key, positions), score in zip(missing.items(), scores.tolist()):
+                    for position in positions:
+                        results[position] = score
+                    self._cache[key] = score
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return results
+
+    def labels(self, texts):
+        return [label(score) for score in self.polarities(texts)]
+
+    def polarity(self, text):
+        return self.polarities([text])[0]
+
+    def stats(self):
+        return {"lexicon_words": len(self.lexicon), "cached": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+
+def label(polarity):
+    if polarity > 0:
+        return "positive"
+    elif polarity < 0:
+        return "negative"
+    else:
+        return "neutral"
+
+
+_default_engine = None
+_default_lock = threading.Lock()
+
+
+def default_engine():
+    """Process-wide engine, built (lexicon compiled) on first use."""
+    global _default_engine
+    if _default_engine is None:
+        with _default_lock:
+            if _default_engine is None:
+                _default_engine = SentimentEngine()
+    return _default_engine
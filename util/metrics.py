@@ -0,0 +1,148 @@
+"""
+Prometheus metrics for the backend, exposed by app.py at GET /metrics (prometheus_client).
+
+Metrics are prometheus_client Counters, Gauges and Histograms on the default registry (which also
+carries the client's process and Python runtime metrics). Values that other components already count
+(cache hits, index size, ...) are exported through collectors that read them at scrape time instead
+of being counted twice (`add_collector`).
+
+Usage:
+    from util import metrics
+    with metrics.CHAT_STAGE_SECONDS.labels(stage="faiss_search").time():
+        ...
+"""
+
+import os
+import math
+
+from prometheus_client import REGISTRY, CONTENT_TYPE_LATEST as CONTENT_TYPE, Counter, Histogram, generate_latest
+from prometheus_client import disable_created_metrics
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# No *_created series next to every counter and histogram
+disable_created_metrics()
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+_FAMILIES = {"counter": CounterMetricFamily, "gauge": GaugeMetricFamily}
+
+
+class _ScrapeCollector:
+    """Adapts a `collect()` generator of (name, kind, documentation, samples) to a prometheus_client collector."""
+
+    def __init__(self, collect):
+        self._collect = collect
+
+    def describe(self):
+        # No families up front: the registry must not call collect() at registration (it reads app state)
+        return []
+
+    def collect(self):
+        try:
+            families = list(self._collect())
+        except Exception as e:
+            # A failing collector must not break the whole scrape
+            print(f"Metrics collector failed: {e}")
+            return
+        for name, kind, documentation, samples in families:
+            samples = list(samples)
+            labelnames = sorted({name for labels, _ in samples for name in labels})
+            family = _FAMILIES[kind](name, documentation, labels=labelnames)
+            for labels, value in samples:
+                family.add_metric([str(labels.get(label, "")) for label in labelnames], math.nan if value is None else value)
+            yield family
+
+
+def add_collector(collect, registry=REGISTRY):
+    """
+    `collect()` is called on every scrape and returns an iterable of
+    (name, kind, documentation, [(labels_dict, value), ...]) with kind 'counter' or 'gauge'
+    (None values are exported as NaN).
+    """
+    collector = _ScrapeCollector(collect)
+    registry.register(collector)
+    return collector
+
+
+def render(registry=REGISTRY):
+    return generate_latest(registry).decode("utf-8")
+
+
+def resident_memory_bytes():
+    """Resident set size of this process (Linux /proc), None where unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+# --- TrueNotion metrics ------------------------------------------------------------------------
+
+# query_embedding, faiss_search, retrieval (retrievers that do not expose both steps),
+# context_assembly, crew_kickoff, agent_direct_llm (single-agent fast path), direct_llm
+CHAT_STAGE_SECONDS = Histogram(
+    "truenotion_chat_stage_seconds", "Duration of the /chat pipeline stages in seconds.", ["stage"], buckets=DEFAULT_BUCKETS,
+)
+CHAT_REQUEST_SECONDS = Histogram(
+    "truenotion_chat_request_seconds", "End-to-end /chat and /chat/stream latency in seconds.", ["endpoint"], buckets=DEFAULT_BUCKETS,
+)
+CHAT_REQUESTS = Counter(
+    "truenotion_chat_requests_total", "Chat requests by endpoint, mode and how they were answered.", ["endpoint", "mode", "result"]
+)
+EXTERNAL_CALL_SECONDS = Histogram(
+    "truenotion_external_call_seconds", "Upstash and Notion API call latency in seconds.", ["service", "operation"],
+    buckets=DEFAULT_BUCKETS,
+)
+# notion_sync, load_datasets, chunking, enrichment, vectorstore (embedding + FAISS), publish (shared index)
+INDEX_BUILD_SECONDS = Histogram(
+    "truenotion_index_build_seconds", "Duration of the index build stages in initialize_system in seconds.", ["stage"],
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0),
+)
+ENRICHMENT_CHUNKS = Counter(
+    "truenotion_enrichment_chunks_total", "Chunks enriched at ingest time per analyzer (analyzed, cached).", ["analyzer", "result"],
+)
+# Background data sync (src/sync_scheduler.py)
+SYNC_POLLS = Counter("truenotion_sync_polls_total", "Data source polls of the sync scheduler (changed, unchanged, error).", ["result"])
+SYNC_CHANGES = Counter(
+    "truenotion_sync_changes_total", "Changed items that triggered a re-index, per source and change (added, changed, removed).",
+    ["source", "change"],
+)
+SINGLE_FLIGHT_WAITERS = Histogram(
+    "truenotion_single_flight_waiters_per_flight", "Callers that shared one /chat computation, observed when it finished.",
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100),
+)
+EMBEDDING_CHUNKS = Counter(
+    "truenotion_embedding_chunks_total", "Chunks embedded for index builds per model (embedded, cached).", ["model", "result"],
+)
+# Admission control in front of the LLM calls (src/admission.py); queue depth is exported by a collector
+ADMISSION_QUEUE_WAIT_SECONDS = Histogram(
+    "truenotion_admission_queue_wait_seconds", "Time LLM-bound requests waited for admission in seconds.", ["priority"],
+    buckets=DEFAULT_BUCKETS,
+)
+ADMISSION_DECISIONS = Counter(
+    "truenotion_admission_decisions_total", "Admission decisions by priority class (admitted, queue_full, timeout, shed).",
+    ["priority", "result"],
+)
+LLM_RETRIES = Counter(
+    "truenotion_llm_retries_total", "Retried LLM API calls by provider and reason (429, 5xx, timeout, connection).",
+    ["provider", "reason"],
+)
+# LLM router (agents/llm_router.py): winners, cancelled hedges and failures per target
+LLM_FIRST_TOKEN_SECONDS = Histogram(
+    "truenotion_llm_first_token_seconds", "Time to first token of the winning LLM request in seconds.", ["provider", "model"],
+    buckets=DEFAULT_BUCKETS,
+)
+LLM_ROUTED_REQUESTS = Counter(
+    "truenotion_llm_routed_requests_total", "Routed LLM requests per target by outcome (won, lost, error).",
+    ["provider", "model", "result"],
+)
+LLM_HEDGES = Counter("truenotion_llm_hedges_total", "Hedged requests started because the first token was late.", ["role"])
+# Multi-tenant indexes (src/tenants.py); per-tenant resident bytes and load time are exported by a collector
+TENANT_INDEX_REQUESTS = Counter(
+    "truenotion_tenant_index_requests_total", "Tenant index lookups (resident, loaded from artifacts).", ["result"],
+)
+TENANT_INDEX_LOAD_SECONDS = Histogram(
+    "truenotion_tenant_index_load_seconds", "Time to load a tenant's index from its artifacts in seconds.",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+TENANT_INDEX_EVICTIONS = Counter("truenotion_tenant_index_evictions_total", "Tenant indexes evicted from memory.")
@@ -0,0 +1,220 @@
+"""
+Opt-in per-request profiling: a span tree of one request plus an optional sampling profile.
+
+Admins enable it per request with the header `X-Profile: 1` (or `?profile=1`) and an `X-Admin-Token`
+matching TRUENOTION_ADMIN_TOKEN; `X-Profile: sample` also samples the stacks of the threads the request
+ran on every PROFILE_SAMPLE_INTERVAL_MS. Profiling is unavailable while no admin token is configured.
+Finished traces are kept in a ring buffer (PROFILE_RING_SIZE entries) served by /debug/traces.
+
+Spans live in a ContextVar: `span()` is a no-op for requests that are not profiled, and the tree
+follows the request into asyncio.to_thread and executor threads that run with a copy of its context.
+"""
+
+import os
+import sys
+import hmac
+import time
+import uuid
+import threading
+import contextvars
+from collections import Counter, deque
+from contextlib import contextmanager
+
+ADMIN_TOKEN = os.getenv("TRUENOTION_ADMIN_TOKEN")
+RING_SIZE = int(os.getenv("PROFILE_RING_SIZE", "50"))
+SAMPLE_INTERVAL_S = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5")) / 1000
+MAX_STACK_DEPTH = 64
+
+_current_span = contextvars.ContextVar("truenotion_current_span", default=None)
+
+
+def authorized(token):
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+class Span:
+    __slots__ = ("name", "attrs", "start", "end", "thread", "children")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.end = None
+        self.thread = threading.current_thread().name
+        self.children = []
+
+    def to_dict(self, origin):
+        end = self.end if self.end is not None else time.perf_counter()
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round((end - self.start) * 1000, 3),
+            "thread": self.thread,
+            "attrs": self.attrs,
+            "children": [child.to_dict(origin) for child in list(self.children)],
+        }
+
+    def threads(self):
+        names = {self.thread}
+        for child in list(self.children):
+            names |= child.threads()
+        return names
+
+
+class StackSampler:
+    """Samples every thread's Python stack at a fixed interval and counts collapsed stacks per thread."""
+
+    def __init__(self, interval_s=SAMPLE_INTERVAL_S):
+        self.interval_s = interval_s
+        self.samples = 0
+        self._counts = Counter()  # (thread name, "outer;...;inner") -> count
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval_s):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self._counts[(names.get(ident, str(ident)), ";".join(reversed(stack)))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+
+    def report(self, threads=None, top=50):
+        """Most frequent stacks (folded format), restricted to `threads` when given."""
+        counts = Counter()
+        for (thread, stack), count in self._counts.items():
+            if threads is None or thread in threads:
+                counts[f"{thread};{stack}"] += count
+        return {
+            "interval_ms": round(self.interval_s * 1000, 3),
+            "samples": self.samples,
+            "stacks": [{"stack": stack, "count": count} for stack, count in counts.most_common(top)],
+        }
+
+
+class Trace:
+    def __init__(self, name, sample=False, **attrs):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.started_at = time.time()
+        self.root = Span(name, attrs)
+        self.sampler = StackSampler() if sample else None
+        self.previous_span = None
+
+    @property
+    def duration_ms(self):
+        end = self.root.end if self.root.end is not None else time.perf_counter()
+        return round((end - self.root.start) * 1000, 3)
+
+    def finish(self):
+        self.root.end = time.perf_counter()
+        if self.sampler is not None:
+            self.sampler.stop()
+
+    def to_dict(self):
+        data = {
+            "trace_id": self.trace_id,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "spans": self.root.to_dict(self.root.start),
+        }
+        if self.sampler is not None:
+            # Other requests may share these threads (e.g. the event loop); their frames are included too
+            data["samples"] = self.sampler.report(threads=self.root.threads())
+        return data
+
+
+class TraceBuffer:
+    """Ring buffer of the most recent finished traces."""
+
+    def __init__(self, size=RING_SIZE):
+        self._traces = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, trace):
+        with self._lock:
+            self._traces.append(trace)
+
+    def get(self, trace_id):
+        with self._lock:
+            for trace in self._traces:
+                if trace.trace_id == trace_id:
+                    return trace
+        return None
+
+    def list(self):
+        with self._lock:
+            traces = list(self._traces)
+        return [
+            {"trace_id": trace.trace_id, "name": trace.root.name, "attrs": trace.root.attrs,
+             "started_at": trace.started_at, "duration_ms": trace.duration_ms}
+            for trace in reversed(traces)
+        ]
+
+
+traces = TraceBuffer()
+
+
+def start(name, sample=False, **attrs):
+    """Starts profiling the current request context; pair with finish() (see also trace())."""
+    current = Trace(name, sample=sample, **attrs)
+    current.previous_span = _current_span.get()
+    _current_span.set(current.root)
+    return current
+
+
+def finish(current):
+    """Ends a trace started with start() and adds it to the ring buffer."""
+    current.finish()
+    # set() rather than reset(token): streamed responses finish the trace from the response generator
+    _current_span.set(current.previous_span)
+    traces.add(current)
+
+
+@contextmanager
+def trace(name, sample=False, **attrs):
+    """Profiles the enclosed block as one request; the finished trace is added to the ring buffer."""
+    current = start(name, sample=sample, **attrs)
+    try:
+        yield current
+    finally:
+        finish(current)
+
+
+@contextmanager
+def span(name, **attrs):
+    """Records a child span of the active request trace; does nothing when the request is not profiled."""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(name, attrs)
+    parent.children.append(child)
+    _current_span.set(child)
+    try:
+        yield child
+    finally:
+        child.end = time.perf_counter()
+        _current_span.set(parent)
+
+
+def traced(name, fn, **attrs):
+    """Wraps `fn` so it runs inside a span; use it for calls handed to worker threads, so the span
+    (and the sampling profile) is attributed to the thread that does the work."""
+
+    def run(*args, **kwargs):
+        with span(name, **attrs):
+            return fn(*args, **kwargs)
+
+    return run
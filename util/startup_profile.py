@@ -0,0 +1,105 @@
+"""
+Cold-start profiler: per-module import times and init-stage durations.
+
+CLI:     python main.py --profile-startup
+Server:  TRUENOTION_PROFILE_STARTUP=1 uvicorn app:app   (report is printed once warmup finishes)
+
+Import times are measured by wrapping builtins.__import__: the first import of a module is timed
+cumulatively (including everything it pulls in) and self time excludes nested first imports.
+"""
+
+import os
+import sys
+import time
+import builtins
+import threading
+from contextlib import contextmanager
+
+_original_import = builtins.__import__
+_enabled = False
+_local = threading.local()  # per-thread stack of [name, start, child_time] for imports in progress
+_imports = {}  # module -> {"cumulative_s", "self_s", "depth"}
+_stages = []  # (name, duration_s)
+_started_at = time.perf_counter()
+
+
+def requested(argv=None):
+    argv = sys.argv if argv is None else argv
+    return "--profile-startup" in argv or os.getenv("TRUENOTION_PROFILE_STARTUP", "").lower() in ("1", "true", "yes")
+
+
+def enabled():
+    return _enabled
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    frame = [name, time.perf_counter(), 0.0]
+    stack.append(frame)
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        stack.pop()
+        cumulative = time.perf_counter() - frame[1]
+        if name not in _imports:
+            _imports[name] = {
+                "cumulative_s": cumulative,
+                "self_s": cumulative - frame[2],
+                "depth": len(stack),
+            }
+        if stack:
+            stack[-1][2] += cumulative
+
+
+def enable():
+    """Starts recording imports. Call before the heavy imports you want to measure."""
+    global _enabled
+    if not _enabled:
+        builtins.__import__ = _timed_import
+        _enabled = True
+
+
+def disable():
+    global _enabled
+    builtins.__import__ = _original_import
+    _enabled = False
+
+
+@contextmanager
+def stage(name):
+    """Times an init stage. A no-op (apart from timing) when profiling is disabled."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if _enabled:
+            _stages.append((name, time.perf_counter() - start))
+
+
+def report(top=25):
+    return {
+        "total_s": round(time.perf_counter() - _started_at, 3),
+        "stages": [{"stage": name, "duration_s": round(duration, 3)} for name, duration in _stages],
+        "imports": [
+            {"module": name, **{key: round(value, 4) if key != "depth" else value for key, value in stats.items()}}
+            for name, stats in sorted(_imports.items(), key=lambda item: item[1]["cumulative_s"], reverse=True)[:top]
+        ],
+    }
+
+
+def print_report(top=25):
+    data = report(top)
+    print("\n=== Startup profile ===")
+    print(f"Total since profiler start: {data['total_s']:.3f}s\n")
+    print("Init stages:")
+    for entry in data["stages"]:
+        print(f"  {entry['duration_s']:8.3f}s  {entry['stage']}")
+    print(f"\nTop {top} imports (cumulative / self, seconds):")
+    for entry in data["imports"]:
+        indent = "  " * min(entry["depth"], 4)
+        print(f"  {entry['cumulative_s']:8.3f}  {entry['self_s']:8.3f}  {indent}{entry['module']}")
+    print()
@@ -1,13 +1,20 @@
+import sys
 import warnings
 
 def langchain_warnings():
-    try:
-        from langchain.schema import LangChainDeprecationWarning
-        warnings.filterwarnings("ignore", category=LangChainDeprecationWarning)
-    except ImportError:
-        # If LangChainDeprecationWarning not found, fallback to message filtering
-        warnings.filterwarnings("ignore", message=".*LangChainDeprecationWarning.*")
-        warnings.filterwarnings("ignore", message=".*deprecated.*")
+    # Only use the warning class if LangChain is already loaded; importing it here would add
+    # the whole LangChain import tree to cold start
+    if "langchain.schema" in sys.modules:
+        try:
+            from langchain.schema import LangChainDeprecationWarning
+            warnings.filterwarnings("ignore", category=LangChainDeprecationWarning)
+            return
+        except ImportError:
+            pass
+    # Fallback to message/module filtering
+    warnings.filterwarnings("ignore", message=".*LangChainDeprecationWarning.*")
+    warnings.filterwarnings("ignore", message=".*deprecated.*")
+    warnings.filterwarnings("ignore", module="langchain.*")
 
 def all():
-    warnings.filterwarnings("ignore")
\ No newline at end of file
+    warnings.filterwarnings("ignore")